@@ -1,28 +1,57 @@
 import os
+import argparse
+import asyncio
+from itertools import islice
 from dotenv import load_dotenv
-from typing import List, Dict, Any
-from components.logger import main_logger, LoggerMixin
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Callable
+from components.logger import main_logger, LoggerMixin, configure_logging
+from components.data_loader import ChatExportReader, ChatMessage, OffsetTracker, coalesce_messages
+from config import APP_CONFIG, DATA_CONFIG, COALESCE_CONFIG, COMPACTION_CONFIG, SNAPSHOT_CONFIG
 
 # Load environment variables
 load_dotenv()
 
 from langchain_core.messages import HumanMessage, SystemMessage
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.graph import StateGraph, MessagesState, END, START
-from langgraph.store.memory import InMemoryStore
+from langgraph.graph import StateGraph, END, START
 
-from components.nodes import task_mAIstro, update_todos, update_profile, update_instructions
-from components.conditional_edges import route_message, intermediate
+from components.cls import AgentState
+from components.nodes import (GraphNode, task_mAIstro_steps, update_todos_steps, update_profile_steps,
+                              update_instructions_steps, summarize_history_steps, quick_reply_steps)
+from components.conditional_edges import route_message, intermediate, should_summarize, pre_route
+from components.memory_cache import memory_context_cache
+from components.todo_index import todo_indexes
+from components.compaction import todo_compactor
+from components.snapshot import snapshotter
+from components.store_access import MEMORY_TYPES, read_memories, get_memories_for_users
+from components.registry import registry
+from components.stores import create_store
+from components.checkpoints import create_checkpointer
+from components.scheduler import node_retry_policy
+from components.context_window import token_usage
+from components.metrics import MESSAGES, RESPONSE_SECONDS, MeteredStore, create_exporter
+from components.sharding import ShardedRunner
+from components.jobs import BatchJob
+from components.service import ChatService
+from components.streaming import ReplyStream
 
 class RecommendationSystem(LoggerMixin):
     """Main class for the AI ReAct Agents Recommendation System."""
     
-    def __init__(self):
-        """Initialize the recommendation system."""
+    def __init__(self, standalone: bool = True):
+        """Initialize the recommendation system.
+        
+        With ``standalone=False`` only the graph and its memory are built: no
+        logging setup, environment check, export reader or metrics exporter.
+        Sharded workers, services and tests that bring their own use it.
+        """
         super().__init__()
-        self.setup_environment()
+        if standalone:
+            configure_logging()
+            self.setup_environment()
         self.setup_graph()
-        self.load_data()
+        if standalone:
+            self.setup_ingestion()
+            self.setup_monitoring()
     
     def setup_environment(self):
         """Setup environment variables and configuration."""
@@ -48,24 +77,36 @@ class RecommendationSystem(LoggerMixin):
     def setup_graph(self):
         """Setup the LangGraph components."""
         try:
-            builder = StateGraph(MessagesState)
+            builder = StateGraph(AgentState)
             
-            # Add nodes
-            builder.add_node(task_mAIstro)
-            builder.add_node(update_todos)
-            builder.add_node(update_profile)
-            builder.add_node(update_instructions)
+            # Add nodes; model calls that are throttled, time out or hit server errors are retried.
+            # Under ainvoke/astream the nodes await their model calls instead of taking executor threads
+            retry_policy = node_retry_policy()
+            builder.add_node("task_mAIstro", GraphNode(task_mAIstro_steps), retry_policy=retry_policy)
+            builder.add_node("update_todos", GraphNode(update_todos_steps), retry_policy=retry_policy)
+            builder.add_node("update_profile", GraphNode(update_profile_steps), retry_policy=retry_policy)
+            builder.add_node("update_instructions", GraphNode(update_instructions_steps), retry_policy=retry_policy)
+            builder.add_node("summarize_history", GraphNode(summarize_history_steps), retry_policy=retry_policy)
+            builder.add_node("quick_reply", GraphNode(quick_reply_steps), retry_policy=retry_policy)
             
             # Add edges
-            builder.add_edge(START, "task_mAIstro")
+            builder.add_conditional_edges(START, should_summarize, ["summarize_history", "task_mAIstro", "quick_reply"])
+            builder.add_conditional_edges("summarize_history", pre_route, ["task_mAIstro", "quick_reply"])
+            builder.add_edge("quick_reply", END)
             builder.add_conditional_edges("task_mAIstro", route_message, intermediate)
             builder.add_edge("update_todos", "task_mAIstro")
             builder.add_edge("update_profile", "task_mAIstro")
             builder.add_edge("update_instructions", "task_mAIstro")
             
             # Setup memory
-            self.across_thread_memory = InMemoryStore()
-            self.within_thread_memory = MemorySaver()
+            self.across_thread_memory = MeteredStore(create_store(on_sweep=self._on_store_sweep))
+            self.within_thread_memory = create_checkpointer()
+            memory_context_cache.clear()
+            todo_indexes.clear()
+            if SNAPSHOT_CONFIG["restore_on_start"] and os.path.exists(SNAPSHOT_CONFIG["path"]):
+                self.restore()
+            if COMPACTION_CONFIG["enabled"]:
+                todo_compactor.start(self.across_thread_memory)
             
             # Compile graph
             self.graph = builder.compile(
@@ -78,90 +119,369 @@ class RecommendationSystem(LoggerMixin):
             self.log_error("graph_setup_failed", str(e))
             raise
     
+    def _on_store_sweep(self, namespaces):
+        """Drop cached memory context of users whose items expired or were evicted."""
+        for namespace in namespaces:
+            memory_context_cache.invalidate(namespace[-1])
+            if namespace[0] == "todo":
+                todo_indexes.invalidate(namespace[-1])
+        self.log_event("memory_swept", {"namespaces": len(namespaces)})
+    
+    def setup_monitoring(self):
+        """Start the periodic metrics export described by MONITORING_CONFIG."""
+        self.metrics_exporter = create_exporter()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.start()
+            self.log_event("monitoring_setup", {
+                "path": self.metrics_exporter.path,
+                "format": self.metrics_exporter.format
+            })
+    
+    def setup_ingestion(self):
+        """Setup the streaming reader for the chat export."""
+        self.reader = ChatExportReader(
+            DATA_CONFIG["input_path"],
+            encoding=DATA_CONFIG["input_encoding"],
+            checkpoint_path=DATA_CONFIG["checkpoint_path"]
+        )
+    
+    def stream_messages(self, resume: bool = False) -> Iterator[ChatMessage]:
+        """Lazily yield parsed messages, from the saved checkpoint if ``resume`` is set."""
+        start_offset = self.reader.resume_offset() if resume else 0
+        self.log_event("data_streaming", {
+            "status": "started",
+            "source": self.reader.path,
+            "offset": start_offset
+        })
+        yield from self.reader.iter_messages(start_offset)
+        self.log_event("data_streaming", {
+            "status": "completed",
+            "skipped": self.reader.skipped
+        })
+    
     def load_data(self):
-        """Load and process input data."""
+        """Load every message of the chat export into ``self.messages``."""
         try:
-            import re
-            with open("./data/fifa2026.txt", encoding="utf8") as f:
-                fifa = f.readlines()
-                fifa = [item.strip() for item in fifa if item != '\n']
-                self.messages = []
-                
-                for i, text in enumerate(fifa):
-                    match = re.search(r'\[@([^\s]+)', text)
-                    if match:
-                        rest, post = text.rsplit(sep="M]")
-                        if post:
-                            self.messages.append({
-                                "user_id": match.group(1),
-                                "message": post
-                            })
-                    else:
-                        self.log_event("data_processing", {
-                            "status": "skipped",
-                            "line": i,
-                            "reason": "no_match"
-                        })
-                
-                self.log_event("data_loading", {
-                    "status": "completed",
-                    "messages_count": len(self.messages)
-                })
+            self.messages = list(self.stream_messages())
+            self.log_event("data_loading", {
+                "status": "completed",
+                "messages_count": len(self.messages)
+            })
         except Exception as e:
             self.log_error("data_loading_failed", str(e))
             raise
     
-    def process_messages(self, start_idx: int = 0, batch_size: int = 5) -> List[Dict[str, Any]]:
-        """Process a batch of messages through the recommendation system."""
+    def _select_messages(self,
+                         messages: Optional[Iterable[ChatMessage]],
+                         start_idx: int,
+                         batch_size: Optional[int],
+                         resume: bool) -> Iterable[ChatMessage]:
+        """Pick the explicit messages or slice the (possibly resumed) export stream."""
+        if messages is None:
+            messages = self.stream_messages(resume=resume)
+        end_idx = None if batch_size is None else start_idx + batch_size
+        return islice(messages, start_idx, end_idx)
+    
+    def _progress_tracker(self, resume: bool) -> Optional[OffsetTracker]:
+        """Tracker whose watermark is committed to the ingestion checkpoint, if resuming."""
+        return OffsetTracker(self.reader.resume_offset()) if resume else None
+    
+    def _work_units(self,
+                    messages: Iterable[ChatMessage],
+                    tracker: Optional[OffsetTracker],
+                    coalesce: bool) -> Iterator[List[ChatMessage]]:
+        """Yield the messages of each graph invocation, coalescing per-user bursts if asked.
+        
+        Messages are issued to ``tracker`` as they are read, so the resume
+        watermark stays in stream order even while a burst is held open.
+        """
+        def issued():
+            for msg in messages:
+                if tracker is not None:
+                    tracker.issue(msg)
+                yield msg
+        
+        if coalesce:
+            yield from coalesce_messages(issued(), COALESCE_CONFIG["window_ms"], COALESCE_CONFIG["max_messages"])
+        else:
+            for msg in issued():
+                yield [msg]
+    
+    @staticmethod
+    def _llm_calls() -> int:
+        return sum(totals["calls"] for totals in token_usage.snapshot().values())
+    
+    def _coalescing_report(self, results: List[Dict[str, Any]], llm_calls: int) -> Dict[str, Any]:
+        """Invocations and (estimated) LLM calls saved by coalescing.
+        
+        Each saved invocation is counted at the average LLM calls per
+        invocation of this batch.
+        """
+        messages_count = sum(r["messages_count"] for r in results)
+        invocations_saved = messages_count - len(results)
+        report = {
+            "messages_count": messages_count,
+            "invocations": len(results),
+            "invocations_saved": invocations_saved,
+            "llm_calls": llm_calls,
+            "llm_calls_saved": round(llm_calls / len(results) * invocations_saved) if results else 0
+        }
+        self.log_event("messages_coalesced", report)
+        return report
+    
+    @staticmethod
+    def thread_config(user_id: str) -> Dict[str, Any]:
+        """Build the graph config for a user; every user gets their own checkpoint thread."""
+        return {
+            "configurable": {
+                "thread_id": f"user-{user_id}",
+                "user_id": user_id
+            }
+        }
+    
+    def process_messages(self,
+                         start_idx: int = 0,
+                         batch_size: Optional[int] = 5,
+                         messages: Optional[Iterable[ChatMessage]] = None,
+                         resume: bool = False,
+                         coalesce: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """Process a batch of messages through the recommendation system.
+        
+        Messages are streamed from the chat export unless ``messages`` is given.
+        With ``resume`` set, reading starts at the saved checkpoint and the
+        checkpoint advances after every processed message. With ``coalesce``
+        (COALESCE_CONFIG by default), bursts from one user run as a single
+        invocation and produce a single result.
+        """
         try:
             results = []
-            end_idx = min(start_idx + batch_size, len(self.messages))
-            
-            for msg in self.messages[start_idx:end_idx]:
-                config = {
-                    "configurable": {
-                        "thread_id": "1",
-                        "user_id": msg["user_id"]
-                    }
-                }
+            tracker = self._progress_tracker(resume)
+            coalesce = COALESCE_CONFIG["enabled"] if coalesce is None else coalesce
+            llm_calls = self._llm_calls()
+            
+            selected = self._select_messages(messages, start_idx, batch_size, resume)
+            for batch in self._work_units(selected, tracker, coalesce):
+                user_id = batch[0].user_id
+                config = self.thread_config(user_id)
                 
-                input_messages = [HumanMessage(content=msg["message"])]
+                input_messages = [HumanMessage(content=msg.message) for msg in batch]
                 
                 try:
-                    result = self.graph.invoke({"messages": input_messages}, config)
+                    with RESPONSE_SECONDS.time():
+                        result = self.graph.invoke({"messages": input_messages}, config)
+                    MESSAGES.inc(len(batch), status="success")
                     results.append({
-                        "user_id": msg["user_id"],
+                        "user_id": user_id,
                         "status": "success",
+                        "messages_count": len(batch),
                         "result": result
                     })
                     
                     self.log_event("message_processed", {
-                        "user_id": msg["user_id"],
+                        "user_id": user_id,
                         "status": "success"
                     })
                 except Exception as e:
+                    MESSAGES.inc(len(batch), status="error")
                     results.append({
-                        "user_id": msg["user_id"],
+                        "user_id": user_id,
                         "status": "error",
+                        "messages_count": len(batch),
                         "error": str(e)
                     })
                     
                     self.log_error("message_processing_failed",
                                  str(e),
-                                 {"user_id": msg["user_id"]})
+                                 {"user_id": user_id})
+                
+                if tracker is not None:
+                    for msg in batch:
+                        tracker.complete(msg)
+                    self.reader.commit(tracker.watermark)
+            
+            if coalesce:
+                self._coalescing_report(results, self._llm_calls() - llm_calls)
+            return results
+        except Exception as e:
+            self.log_error("batch_processing_failed", str(e))
+            raise
+    
+    async def aprocess_messages(self,
+                                messages: Optional[Iterable[ChatMessage]] = None,
+                                start_idx: int = 0,
+                                batch_size: Optional[int] = None,
+                                max_concurrency: Optional[int] = None,
+                                resume: bool = False,
+                                coalesce: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """Process messages concurrently with ``graph.ainvoke``.
+        
+        Messages from different users run in parallel, at most ``max_concurrency``
+        graph runs at a time. Messages from the same user are processed strictly in
+        input order, since they share a checkpoint thread. ``messages`` may be any
+        iterable and is consumed lazily; it defaults to the chat export stream, so
+        the first graph run starts before the file has been read. With ``resume``
+        set, the ingestion checkpoint advances as the oldest in-flight messages
+        complete. Results are returned in input order. With ``coalesce``
+        (COALESCE_CONFIG by default), bursts from one user run as a single
+        invocation and produce a single result; a burst can close after later
+        users' messages, so each result carries the ``first_message`` it answers.
+        """
+        try:
+            tracker = self._progress_tracker(resume)
+            coalesce = COALESCE_CONFIG["enabled"] if coalesce is None else coalesce
+            llm_calls = self._llm_calls()
+            on_done = None
+            if tracker is not None:
+                def on_done(msg: ChatMessage) -> None:
+                    if tracker.complete(msg):
+                        self.reader.commit(tracker.watermark)
+            
+            limit = max_concurrency or APP_CONFIG["max_concurrency"]
+            slots = asyncio.Semaphore(limit)
+            # Bounds how far ahead we read; graph slots are only taken once a
+            # user's previous run has finished, so a burst from one user
+            # cannot hold them while other users wait
+            pending = asyncio.Semaphore(max(limit, APP_CONFIG["max_pending"]))
+            user_tails: Dict[str, asyncio.Task] = {}
+            tasks = []
+            
+            selected = self._select_messages(messages, start_idx, batch_size, resume)
+            for batch in self._work_units(selected, tracker, coalesce):
+                await pending.acquire()
+                user_id = batch[0].user_id
+                task = asyncio.create_task(
+                    self._aprocess_message(batch, user_tails.get(user_id), slots, pending, on_done)
+                )
+                user_tails[user_id] = task
+                task.add_done_callback(
+                    lambda t, u=user_id: user_tails.pop(u) if user_tails.get(u) is t else None
+                )
+                tasks.append(task)
             
+            results = list(await asyncio.gather(*tasks))
+            if coalesce:
+                self._coalescing_report(results, self._llm_calls() - llm_calls)
+            self.log_event("batch_processed", {
+                "messages_count": len(results),
+                "errors": sum(1 for r in results if r["status"] == "error"),
+                "max_concurrency": limit,
+                "prerouter": registry.get("prerouter").stats(),
+                "scheduler": registry.get("scheduler").stats()
+            })
             return results
         except Exception as e:
             self.log_error("batch_processing_failed", str(e))
             raise
     
+    def process_sharded(self,
+                        messages: Optional[Iterable[ChatMessage]] = None,
+                        start_idx: int = 0,
+                        batch_size: Optional[int] = None,
+                        workers: Optional[int] = None,
+                        max_concurrency: Optional[int] = None,
+                        resume: bool = False,
+                        coalesce: Optional[bool] = None,
+                        initializer: Optional[Callable[[], None]] = None) -> List[Dict[str, Any]]:
+        """Process messages on ``workers`` processes (SHARDING_CONFIG by default), sharded by user.
+        
+        Each worker runs its own graph with up to ``max_concurrency`` runs in
+        flight against the shared store, so this scales past the GIL for
+        backlog replays. Results are returned in input order without the graph
+        state (the last reply is under ``reply``); worker metrics and token
+        totals are merged into this process. ``resume`` advances the ingestion
+        checkpoint as chunks complete.
+        """
+        try:
+            tracker = self._progress_tracker(resume)
+            on_issue = on_done = None
+            if tracker is not None:
+                on_issue = tracker.issue
+                def on_done(msg: ChatMessage) -> None:
+                    if tracker.complete(msg):
+                        self.reader.commit(tracker.watermark)
+            
+            runner = ShardedRunner(workers, initializer=initializer)
+            selected = self._select_messages(messages, start_idx, batch_size, resume)
+            return runner.run(selected, max_concurrency=max_concurrency, coalesce=coalesce,
+                              on_issue=on_issue, on_done=on_done)
+        except Exception as e:
+            self.log_error("batch_processing_failed", str(e))
+            raise
+    
+    async def arespond(self, user_id: str, texts: List[str]) -> Dict[str, Any]:
+        """Run one graph invocation for ``texts`` from ``user_id`` and report how it went.
+        
+        Callers must not run two invocations for the same user at once, since
+        they would share a checkpoint thread.
+        """
+        config = self.thread_config(user_id)
+        input_messages = [HumanMessage(content=text) for text in texts]
+        
+        try:
+            with RESPONSE_SECONDS.time():
+                result = await self.graph.ainvoke({"messages": input_messages}, config)
+            MESSAGES.inc(len(texts), status="success")
+            self.log_event("message_processed", {
+                "user_id": user_id,
+                "status": "success"
+            })
+            return {
+                "user_id": user_id,
+                "status": "success",
+                "messages_count": len(texts),
+                "result": result
+            }
+        except Exception as e:
+            MESSAGES.inc(len(texts), status="error")
+            self.log_error("message_processing_failed",
+                         str(e),
+                         {"user_id": user_id})
+            return {
+                "user_id": user_id,
+                "status": "error",
+                "messages_count": len(texts),
+                "error": str(e)
+            }
+    
+    def astream_reply(self, user_id: str, texts: List[str]) -> ReplyStream:
+        """Stream the reply to ``texts`` from ``user_id`` token by token.
+        
+        Iterating the returned stream yields the reply text as the model
+        produces it and stops at the end of the reply; ``await
+        stream.finished()`` waits for the rest of the run. Must be called from
+        a running event loop, one stream per user at a time.
+        """
+        return ReplyStream(self.graph, user_id, texts, self.thread_config(user_id))
+    
+    async def _aprocess_message(self,
+                                batch: List[ChatMessage],
+                                previous: Optional[asyncio.Task],
+                                slots: asyncio.Semaphore,
+                                pending: asyncio.Semaphore,
+                                on_done: Optional[Callable[[ChatMessage], None]] = None) -> Dict[str, Any]:
+        """Run one user's messages once that user's previous invocation has finished.
+        
+        The graph slot is taken after that wait, so queued messages from one
+        user never occupy slots other users could run in.
+        """
+        user_id = batch[0].user_id
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+            
+            async with slots:
+                result = await self.arespond(user_id, [msg.message for msg in batch])
+            return {**result, "first_message": batch[0]}
+        finally:
+            pending.release()
+            if on_done is not None:
+                for msg in batch:
+                    on_done(msg)
+    
     def get_user_memories(self, user_id: str) -> Dict[str, List[Any]]:
         """Retrieve all memories for a specific user."""
         try:
-            memories = {}
-            for memory_type in ['profile', 'todo', 'instructions']:
-                namespace = (memory_type, user_id)
-                memories[memory_type] = self.across_thread_memory.search(namespace)
+            memories = read_memories(self.across_thread_memory, user_id)
             
             self.log_event("memories_retrieved", {
                 "user_id": user_id,
@@ -174,24 +494,106 @@ class RecommendationSystem(LoggerMixin):
                           str(e),
                           {"user_id": user_id})
             raise
+    
+    def snapshot(self, path: Optional[str] = None) -> Dict[str, Any]:
+        """Write the memory store and in-memory checkpoints to ``path`` (SNAPSHOT_CONFIG's by default)."""
+        try:
+            return snapshotter.write(path or SNAPSHOT_CONFIG["path"], self.across_thread_memory,
+                                     self.within_thread_memory)
+        except Exception as e:
+            self.log_error("snapshot_failed", str(e))
+            raise
+    
+    def restore(self, path: Optional[str] = None) -> Dict[str, Any]:
+        """Load a snapshot into the memory store and checkpointer, e.g. on a warm restart."""
+        try:
+            stats = snapshotter.load(path or SNAPSHOT_CONFIG["path"], self.across_thread_memory,
+                                     self.within_thread_memory)
+            memory_context_cache.clear()
+            todo_indexes.clear()
+            return stats
+        except Exception as e:
+            self.log_error("restore_failed", str(e))
+            raise
+    
+    def get_memories_for_users(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, List[Any]]]:
+        """Retrieve all memories for many users with a single store batch."""
+        try:
+            memories = get_memories_for_users(self.across_thread_memory, user_ids)
+            
+            self.log_event("memories_retrieved", {
+                "users_count": len(memories),
+                "memory_types": list(MEMORY_TYPES)
+            })
+            
+            return memories
+        except Exception as e:
+            self.log_error("memory_retrieval_failed", str(e))
+            raise
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="AI ReAct Agents Recommendation System")
+    parser.add_argument("--warmup", action="store_true",
+                        help="build models and extractors in the background during startup")
+    parser.add_argument("--workers", type=int,
+                        help="process the whole export on this many user-sharded worker processes")
+    parser.add_argument("--serve", action="store_true",
+                        help="serve message submission and memory lookups over HTTP (SERVICE_CONFIG)")
+    parser.add_argument("--job", action="store_true",
+                        help="process the whole export as a resumable batch job (JOB_CONFIG)")
+    parser.add_argument("--replay-dead-letters", action="store_true",
+                        help="retry the messages a batch job dead-lettered")
+    parser.add_argument("--restore", metavar="PATH",
+                        help="load a memory and checkpoint snapshot before processing")
+    parser.add_argument("--snapshot", metavar="PATH",
+                        help="write a memory and checkpoint snapshot after processing")
+    parser.add_argument("--compact", action="store_true",
+                        help="compact every user's todos into the cold namespace (COMPACTION_CONFIG)")
+    return parser.parse_args(argv)
 
-def main():
+def main(argv=None):
     """Main entry point for the application."""
+    args = parse_args(argv)
+    configure_logging()
     try:
         main_logger.info("Starting recommendation system")
+        if args.warmup:
+            registry.warmup()
         system = RecommendationSystem()
+        if args.restore:
+            print(system.restore(args.restore))
         
-        # Process first batch of messages
-        results = system.process_messages(start_idx=0, batch_size=5)
-        
-        # Print results for demonstration
-        for msg in system.messages[0:5]:
-            memories = system.get_user_memories(msg["user_id"])
-            print(f"\nUser: {msg['user_id']}")
-            for memory_type, memory_data in memories.items():
-                print(f"{memory_type}: {memory_data}")
-            print("*" * 40)
+        if args.serve:
+            asyncio.run(ChatService(system).serve_forever())
+        elif args.job or args.replay_dead_letters:
+            job = BatchJob(system)
+            stats = job.replay_dead_letters() if args.replay_dead_letters else job.run()
+            job.close()
+            print(stats)
+        elif args.compact:
+            print(todo_compactor.compact_all(system.across_thread_memory))
+        elif args.workers:
+            # Backlog replay: every message, sharded by user over worker processes
+            results = system.process_sharded(workers=args.workers, resume=True)
+            errors = sum(1 for r in results if r["status"] == "error")
+            print(f"Processed {sum(r['messages_count'] for r in results)} messages, {errors} errors")
+        else:
+            # Process first batch of messages
+            results = system.process_messages(start_idx=0, batch_size=APP_CONFIG["batch_size"])
+            
+            # Print results for demonstration
+            all_memories = system.get_memories_for_users(r["user_id"] for r in results)
+            for user_id, memories in all_memories.items():
+                print(f"\nUser: {user_id}")
+                for memory_type, memory_data in memories.items():
+                    print(f"{memory_type}: {memory_data}")
+                print("*" * 40)
         
+        if args.snapshot:
+            print(system.snapshot(args.snapshot))
+        if system.metrics_exporter is not None:
+            system.metrics_exporter.stop()
         main_logger.info("Recommendation system completed successfully")
     except Exception as e:
         main_logger.error(f"Recommendation system failed: {str(e)}")
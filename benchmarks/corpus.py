@@ -0,0 +1,79 @@
+"""
+Synthetic chat exports in the data/*.txt format.
+
+Users follow a long-tailed activity distribution, so a few chatty users post
+bursts while most post once or twice; ``update_ratio`` of the lines carry
+something worth remembering (a todo, a profile fact or an instruction) and
+the rest is fan chatter. Lines are written as they are generated, so
+million-message corpora take constant memory.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+CHATTER = [
+    "What a goal! The atmosphere is going to be insane!",
+    "Argentina, France or Brazil will win it again, no doubt.",
+    "The stadiums in the USA are massive, can't wait to see them full.",
+    "Hopefully ticket prices aren't through the roof this time.",
+    "This will be the most commercialized World Cup ever.",
+    "Imagine if the USMNT actually makes a deep run!",
+    "The European teams are going to dominate, mark my words.",
+    "Mexico, Canada and the USA co-hosting is a great idea.",
+]
+
+UPDATES = [
+    "Please add buying tickets for the {city} match to my todo list.",
+    "Remind me to renew my passport before the {city} trip.",
+    "I need to book a hotel in {city} for the quarter final.",
+    "I live in {city} and I'm planning to attend FIFA.",
+    "My name is {name}, I work as a nurse and love football.",
+    "I prefer short todos with a deadline whenever you add one.",
+]
+
+CITIES = ["Dallas", "Toronto", "Miami", "Vancouver", "Mexico City", "Seattle", "Atlanta", "Boston"]
+NAMES = ["Sam", "Alex", "Priya", "Diego", "Mei", "Omar", "Lena", "Jordan"]
+
+
+def format_timestamp(moment: datetime) -> str:
+    """``March 1, 2025, 10:05 AM``, as in the exports."""
+    return f"{moment:%B} {moment.day}, {moment.year}, {moment.hour % 12 or 12}:{moment:%M} {moment:%p}"
+
+
+def generate_corpus(path: str,
+                    messages: int = 10000,
+                    users: int = 1000,
+                    update_ratio: float = 0.2,
+                    seed: int = 0,
+                    start: datetime = datetime(2025, 3, 1, 10, 0)) -> str:
+    """Write a synthetic export of ``messages`` lines to ``path`` and return the path."""
+    rng = random.Random(seed)
+    user_ids = [f"fan{i:06d}" for i in range(users)]
+    cum_weights = list(accumulate(1.0 / (rank + 1) for rank in range(users)))
+    moment = start
+    with open(path, "w", encoding="utf8") as f:
+        for _ in range(messages):
+            user_id = rng.choices(user_ids, cum_weights=cum_weights)[0]
+            if rng.random() < update_ratio:
+                text = rng.choice(UPDATES).format(city=rng.choice(CITIES), name=rng.choice(NAMES))
+            else:
+                text = rng.choice(CHATTER)
+            f.write(f'[@{user_id} - {format_timestamp(moment)}]"{text}"\n\n')
+            moment += timedelta(seconds=rng.randint(0, 40))
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic chat export")
+    parser.add_argument("path")
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--update-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    generate_corpus(args.path, args.messages, args.users, args.update_ratio, args.seed)
+
+
+if __name__ == "__main__":
+    main()
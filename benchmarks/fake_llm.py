@@ -0,0 +1,168 @@
+"""
+Deterministic stand-in for the OpenAI chat model.
+
+Answers the same prompt with the same message every time, after a configurable
+latency, and emits the tool calls the real model would make for the synthetic
+corpus: ``UpdateMemory`` decisions for task_mAIstro, new ``ToDo``/``Profile``
+documents and ``PatchDoc`` updates for the trustcall extractors. Streamed
+calls emit the text word by word, ``token_ms`` apart, and the tool calls
+with the last chunk.
+"""
+import asyncio
+import json
+import random
+import re
+import time
+import zlib
+from typing import AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from components.context_window import last_human_turn
+
+# Cues matching the update templates of benchmarks.corpus
+TODO_CUES = re.compile(r"\b(add|remind me|need to|book|buy)\b", re.IGNORECASE)
+PROFILE_CUES = re.compile(r"\b(i live in|my name is|i work as)\b", re.IGNORECASE)
+INSTRUCTION_CUES = re.compile(r"\b(i prefer|whenever you)\b", re.IGNORECASE)
+
+_LOCATION = re.compile(r"i live in ([A-Z][\w ]+?)(?:[,.!\"]|$)", re.IGNORECASE)
+_EXISTING_DOC = re.compile(r'<instance id=(\S+) schema_type="(\w+)">')
+
+
+class FakeChatModel(BaseChatModel):
+    """Rule-based chat model with deterministic output and simulated latency."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0  # uniform extra latency, seeded by the prompt
+    token_ms: float = 0.0  # delay between streamed chunks
+
+    @property
+    def _llm_type(self) -> str:
+        return "nexusmind-fake"
+
+    def bind_tools(self, tools, tool_choice: Optional[str] = None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice, **kwargs)
+
+    def _delay(self, messages: List[BaseMessage]) -> float:
+        seed = zlib.crc32("".join(str(m.content) for m in messages).encode("utf8"))
+        return (self.latency_ms + random.Random(seed).uniform(0, self.jitter_ms)) / 1000.0
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self._delay(messages))
+        return self._respond(messages, **kwargs)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self._delay(messages))
+        return self._respond(messages, **kwargs)
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self._delay(messages))
+        for i, chunk in enumerate(_chunks(self._respond(messages, **kwargs).generations[0].message)):
+            if i and self.token_ms:
+                time.sleep(self.token_ms / 1000.0)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None,
+                       **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self._delay(messages))
+        for i, chunk in enumerate(_chunks(self._respond(messages, **kwargs).generations[0].message)):
+            if i and self.token_ms:
+                await asyncio.sleep(self.token_ms / 1000.0)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def _respond(self, messages: List[BaseMessage], tools=None, tool_choice=None, **kwargs) -> ChatResult:
+        names = [tool["function"]["name"] for tool in tools or []]
+        if "UpdateMemory" in names:
+            message = self._route(messages)
+        elif names:
+            message = self._extract(messages, names)
+        else:
+            message = AIMessage(content="Keep todos short and mention the match city.")
+        input_tokens = count_tokens_approximately(messages)
+        output_tokens = count_tokens_approximately([message])
+        message.usage_metadata = {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                                  "total_tokens": input_tokens + output_tokens}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _route(self, messages: List[BaseMessage]) -> AIMessage:
+        """task_mAIstro: decide which memories the latest user turn updates."""
+        if messages[-1].type == "tool":
+            return AIMessage(content="Got it, I've updated your memory.")
+        text = last_human_turn(messages)
+        update_types = [update_type for update_type, cues in (("todo", TODO_CUES),
+                                                              ("user", PROFILE_CUES),
+                                                              ("instructions", INSTRUCTION_CUES))
+                        if cues.search(text)]
+        if not update_types:
+            return AIMessage(content="Sounds exciting!")
+        return _tool_call_message([("UpdateMemory", {"update_type": update_type}, f"call_{update_type}_{_digest(text, len(messages))}")
+                                   for update_type in update_types])
+
+    def _extract(self, messages: List[BaseMessage], names: List[str]) -> AIMessage:
+        """trustcall: insert a new document, or patch an existing one."""
+        text = last_human_turn(messages) or str(messages[-1].content)
+        if "ToDo" in names:
+            name, args = "ToDo", {
+                "task": text.strip('"')[:80],
+                "time_to_complete": 30,
+                "solutions": ["Check the official FIFA ticketing site"],
+                "status": "not started"
+            }
+        elif "Profile" in names:
+            location = _LOCATION.search(text)
+            name, args = "Profile", {"location": location.group(1) if location else None,
+                                     "interests": ["football"]}
+        else:
+            existing = _EXISTING_DOC.search("\n".join(str(m.content) for m in messages))
+            name, args = "PatchDoc", {
+                "json_doc_id": existing.group(1) if existing else "0",
+                "planned_edits": "Append the new interest.",
+                "patches": [{"op": "add", "path": "/interests/-", "value": "world cup"}]
+            }
+        return _tool_call_message([(name, args, f"call_{name}_{_digest(text, len(messages))}")])
+
+
+def _tool_call_message(calls) -> AIMessage:
+    """An AIMessage shaped like ChatOpenAI's, with the raw calls in additional_kwargs too."""
+    return AIMessage(
+        content="",
+        tool_calls=[{"name": name, "args": args, "id": call_id} for name, args, call_id in calls],
+        additional_kwargs={"tool_calls": [
+            {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+            for name, args, call_id in calls
+        ]}
+    )
+
+
+def _chunks(message: AIMessage) -> List[ChatGenerationChunk]:
+    """``message`` as streamed: one chunk per word, then the tool calls and usage."""
+    words = re.findall(r"\S+\s*", str(message.content))
+    chunks = [AIMessageChunk(content=word) for word in words[:-1]]
+    chunks.append(AIMessageChunk(
+        content=words[-1] if words else "",
+        tool_call_chunks=[{"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                          for i, call in enumerate(message.tool_calls)],
+        additional_kwargs=message.additional_kwargs,
+        usage_metadata=message.usage_metadata
+    ))
+    return [ChatGenerationChunk(message=chunk) for chunk in chunks]
+
+
+def _digest(text: str, position: int) -> str:
+    """Stable tool call id suffix, distinct for repeated messages in one thread."""
+    return format(zlib.crc32(f"{position}:{text}".encode("utf8")), "08x")
+
+
+def install(latency_ms: float = 0.0, jitter_ms: float = 0.0) -> None:
+    """Register a FakeChatModel as the registry's chat model; a picklable worker initializer."""
+    from components.registry import registry
+
+    registry.set("chat", FakeChatModel(latency_ms=latency_ms, jitter_ms=jitter_ms))
@@ -0,0 +1,53 @@
+"""
+Prompt tokens of the memory blocks, dict repr versus the compact renderers.
+
+Renders a synthetic profile, todo list and instructions into the
+task_mAIstro system prompt both ways and reports the token counts, along with
+the size of the static prefix every user shares:
+
+    python -m benchmarks.prompt_tokens --todos 10
+"""
+import argparse
+import json
+from typing import Any, Dict
+
+from langchain_core.messages import SystemMessage
+
+from benchmarks.todo_prompt import make_todos
+from components.context_window import count_tokens
+from components.nodes import render_instructions, render_profile, render_todos
+from components.prompts import MODEL_SYSTEM_TEMPLATE
+
+PROFILE = {"name": "Sam", "location": "Miami", "job": None, "connections": [], "interests": ["football", "food"]}
+INSTRUCTIONS = {"memory": "Keep todos short and mention the match city."}
+
+
+def tokens(text: str) -> int:
+    return count_tokens([SystemMessage(content=text)])
+
+
+def measure(todo_count: int) -> Dict[str, Any]:
+    todos = list(make_todos(todo_count).values())
+    before = MODEL_SYSTEM_TEMPLATE.format(user_profile=f"{PROFILE}",
+                                          todo="\n".join(f"{value}" for value in todos),
+                                          instructions=f"{INSTRUCTIONS}")
+    after = MODEL_SYSTEM_TEMPLATE.format(user_profile=render_profile([PROFILE]),
+                                         todo=render_todos(todos),
+                                         instructions=render_instructions([INSTRUCTIONS]))
+    return {
+        "todos": todo_count,
+        "repr_prompt_tokens": tokens(before),
+        "compact_prompt_tokens": tokens(after),
+        "static_prefix_tokens": tokens(MODEL_SYSTEM_TEMPLATE.prefix)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory block prompt tokens before and after compact rendering")
+    parser.add_argument("--todos", type=int, nargs="+", default=[0, 10, 50])
+    args = parser.parse_args(argv)
+    print(json.dumps([measure(count) for count in args.todos], indent=2))
+
+
+if __name__ == "__main__":
+    main()
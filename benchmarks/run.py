@@ -0,0 +1,299 @@
+"""
+Offline benchmark of the whole RecommendationSystem pipeline.
+
+The registry's chat model is replaced by ``FakeChatModel``, so every
+task_mAIstro call and trustcall extraction runs for real against a
+deterministic model with simulated latency, and no API key is needed. Reports
+throughput, p50/p99 latency per graph node and per model call, store
+operations, token usage and peak memory, and writes them as JSON so runs can
+be compared:
+
+    python -m benchmarks.run --messages 10000 --output results.json
+    python -m benchmarks.run --messages 10000 --compare results.json
+
+``--workers N`` runs the sharded mode instead (components/sharding.py), on a
+sqlite store in a temporary directory; its latencies then come from the
+merged metrics histograms, at bucket resolution.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.store.base import BaseStore
+
+from app import RecommendationSystem
+from benchmarks.corpus import generate_corpus
+from benchmarks.fake_llm import FakeChatModel, install
+from components.context_window import token_usage
+from components.data_loader import ChatExportReader
+from components.metrics import MODEL_SECONDS, NODE_SECONDS, STORE_OPS, metrics, peak_rss_bytes
+from components.registry import registry
+from config import APP_CONFIG, MEMORY_CONFIG
+
+
+class CountingStore(BaseStore):
+    """Delegating store that counts round trips and operations by type."""
+
+    def __init__(self, store: BaseStore):
+        self.store = store
+        self.batches = 0
+        self.ops = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, ops: List[Any]) -> None:
+        with self._lock:
+            self.batches += 1
+            self.ops.update(type(op).__name__ for op in ops)
+
+    def batch(self, ops: Iterable[Any]) -> List[Any]:
+        ops = list(ops)
+        self._count(ops)
+        return self.store.batch(ops)
+
+    async def abatch(self, ops: Iterable[Any]) -> List[Any]:
+        ops = list(ops)
+        self._count(ops)
+        return await self.store.abatch(ops)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"batches": self.batches, **dict(self.ops)}
+
+
+class LatencyRecorder(BaseCallbackHandler):
+    """Times graph nodes and chat model calls from LangChain callbacks."""
+
+    def __init__(self, nodes: Iterable[str]):
+        self.nodes = set(nodes)
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self._starts: Dict[Any, tuple] = {}
+        self._lock = threading.Lock()
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        if node in self.nodes and kwargs.get("name") == node:
+            self._starts[run_id] = (node, time.perf_counter())
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._starts[run_id] = ("model_call", time.perf_counter())
+
+    def _stop(self, run_id) -> None:
+        started = self._starts.pop(run_id, None)
+        if started is not None:
+            name, start = started
+            with self._lock:
+                self.samples[name].append(time.perf_counter() - start)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._stop(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._stop(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._stop(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._stop(run_id)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: summarize(samples) for name, samples in sorted(self.samples.items())}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+        "total_s": sum(values)
+    }
+
+
+def build_system(corpus_path: str) -> RecommendationSystem:
+    """A non-standalone RecommendationSystem on ``corpus_path``, without the API-key checks."""
+    system = RecommendationSystem(standalone=False)
+    system.reader = ChatExportReader(corpus_path)
+    return system
+
+
+def histogram_report(histogram, label: str) -> Dict[str, Dict[str, float]]:
+    """``summarize``-shaped latencies from a metrics histogram (bucket upper bounds)."""
+    return {entry["labels"][label]: {"count": entry["count"], "p50_ms": entry["p50"] * 1000,
+                                     "p99_ms": entry["p99"] * 1000, "total_s": entry["sum"]}
+            for entry in histogram.snapshot() if entry["count"]}
+
+
+def run_sharded(corpus_path: str,
+                messages: Optional[int],
+                workers: int,
+                max_concurrency: Optional[int],
+                latency_ms: float,
+                jitter_ms: float,
+                coalesce: bool) -> Dict[str, Any]:
+    """The sharded counterpart of ``run_benchmark``, every worker on its own FakeChatModel."""
+    token_usage.reset()
+    metrics.reset()
+    system = build_system(corpus_path)
+    start = time.perf_counter()
+    results = system.process_sharded(batch_size=messages, workers=workers, max_concurrency=max_concurrency,
+                                      coalesce=coalesce, initializer=functools.partial(install, latency_ms, jitter_ms))
+    elapsed = time.perf_counter() - start
+    processed = sum(r["messages_count"] for r in results)
+    return {
+        "config": {
+            "corpus": os.path.abspath(corpus_path),
+            "mode": "sharded",
+            "workers": workers,
+            "max_concurrency": max_concurrency or APP_CONFIG["max_concurrency"],
+            "latency_ms": latency_ms,
+            "jitter_ms": jitter_ms,
+            "coalesce": coalesce
+        },
+        "messages": processed,
+        "invocations": len(results),
+        "errors": sum(1 for r in results if r["status"] == "error"),
+        "seconds": elapsed,
+        "throughput_msgs_per_s": processed / elapsed if elapsed else 0.0,
+        "latency": {**histogram_report(NODE_SECONDS, "node"),
+                    **{f"model_call:{node}": stats for node, stats in histogram_report(MODEL_SECONDS, "node").items()}},
+        "store_ops": {entry["labels"]["op"]: int(entry["value"]) for entry in STORE_OPS.snapshot()},
+        "token_usage": token_usage.snapshot()
+    }
+
+
+def run_benchmark(corpus_path: str,
+                  messages: Optional[int] = None,
+                  mode: str = "async",
+                  max_concurrency: Optional[int] = None,
+                  latency_ms: float = 50.0,
+                  jitter_ms: float = 0.0,
+                  coalesce: bool = False,
+                  trace_memory: bool = False) -> Dict[str, Any]:
+    """Process ``messages`` lines of ``corpus_path`` with the fake model and return the report."""
+    registry.set("chat", FakeChatModel(latency_ms=latency_ms, jitter_ms=jitter_ms))
+    token_usage.reset()
+    try:
+        system = build_system(corpus_path)
+        store = CountingStore(system.across_thread_memory)
+        system.graph.store = store
+        recorder = LatencyRecorder(name for name in system.graph.nodes if not name.startswith("__"))
+        system.graph = system.graph.with_config(callbacks=[recorder])
+
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        if mode == "async":
+            results = asyncio.run(system.aprocess_messages(batch_size=messages, max_concurrency=max_concurrency,
+                                                           coalesce=coalesce))
+        else:
+            results = system.process_messages(batch_size=messages, coalesce=coalesce)
+        elapsed = time.perf_counter() - start
+        traced_peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+    finally:
+        registry.reset()
+
+    processed = sum(r["messages_count"] for r in results)
+    report = {
+        "config": {
+            "corpus": os.path.abspath(corpus_path),
+            "mode": mode,
+            "max_concurrency": max_concurrency or APP_CONFIG["max_concurrency"],
+            "latency_ms": latency_ms,
+            "jitter_ms": jitter_ms,
+            "coalesce": coalesce
+        },
+        "messages": processed,
+        "invocations": len(results),
+        "errors": sum(1 for r in results if r["status"] == "error"),
+        "seconds": elapsed,
+        "throughput_msgs_per_s": processed / elapsed if elapsed else 0.0,
+        "latency": recorder.report(),
+        "store_ops": store.stats(),
+        "token_usage": token_usage.snapshot(),
+        "peak_rss_mb": (peak_rss_bytes() or 0) / (1024 * 1024)
+    }
+    if traced_peak is not None:
+        report["traced_peak_mb"] = traced_peak / (1024 * 1024)
+    return report
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.1) -> List[str]:
+    """Regressions of ``current`` against ``baseline`` beyond ``tolerance`` (relative)."""
+    regressions = []
+    if current["throughput_msgs_per_s"] < baseline["throughput_msgs_per_s"] * (1 - tolerance):
+        regressions.append(f"throughput {baseline['throughput_msgs_per_s']:.1f} -> "
+                           f"{current['throughput_msgs_per_s']:.1f} msgs/s")
+    for name, stats in current["latency"].items():
+        before = baseline["latency"].get(name)
+        if before and stats["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name} p99 {before['p99_ms']:.1f} -> {stats['p99_ms']:.1f} ms")
+    for op, count in current["store_ops"].items():
+        before = baseline["store_ops"].get(op)
+        if before and count > before * (1 + tolerance):
+            regressions.append(f"store {op} {before} -> {count}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline with a deterministic fake model")
+    parser.add_argument("--corpus", help="chat export to replay; generated if omitted")
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--mode", choices=("async", "sync"), default="async")
+    parser.add_argument("--max-concurrency", type=int)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--coalesce", action="store_true")
+    parser.add_argument("--workers", type=int, help="run sharded over this many worker processes")
+    parser.add_argument("--trace-memory", action="store_true", help="also report the tracemalloc peak (slower)")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.corpus or generate_corpus(os.path.join(tmp, "corpus.txt"), args.messages, args.users)
+        if args.workers:
+            # Workers must share one store, which a private in-memory store per process is not
+            MEMORY_CONFIG.update({"store_type": "sqlite", "sqlite_path": os.path.join(tmp, "memory.sqlite")})
+            report = run_sharded(corpus, args.messages, args.workers, args.max_concurrency,
+                                 args.latency_ms, args.jitter_ms, args.coalesce)
+        else:
+            report = run_benchmark(corpus, args.messages, args.mode, args.max_concurrency,
+                                   args.latency_ms, args.jitter_ms, args.coalesce, args.trace_memory)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            f.write(output)
+    print(output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf8") as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
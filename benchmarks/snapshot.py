@@ -0,0 +1,73 @@
+"""
+Snapshot write and warm restart times for a synthetic population.
+
+Fills an InMemoryStore with a profile, ``--todos`` todos and instructions per
+user, and a MemorySaver with one checkpoint of a short thread per user, then
+times writing the snapshot and loading it into empty backends:
+
+    python -m benchmarks.snapshot --users 1000000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.store.memory import InMemoryStore
+
+from benchmarks.todo_prompt import make_todos
+from components.snapshot import Snapshotter
+
+PROFILE = {"name": None, "location": "Miami", "job": None, "connections": [], "interests": ["football"]}
+INSTRUCTIONS = {"memory": "Keep todos short and mention the match city."}
+
+
+def populate(users: int, todos: int, threads: bool):
+    store, saver = InMemoryStore(), MemorySaver()
+    todo_values = list(make_todos(todos).items())
+    for i in range(users):
+        user_id = f"user_{i}"
+        store.put(("profile", user_id), "profile", PROFILE)
+        store.put(("instructions", user_id), "user_instructions", INSTRUCTIONS)
+        for key, value in todo_values:
+            store.put(("todo", user_id), key, value)
+        if threads:
+            checkpoint = empty_checkpoint()
+            checkpoint["channel_values"] = {"messages": [HumanMessage(content="Add a todo to book a hotel"),
+                                                         AIMessage(content="Got it, I've updated your memory.")]}
+            checkpoint["channel_versions"] = {"messages": 1}
+            saver.put({"configurable": {"thread_id": user_id, "checkpoint_ns": ""}}, checkpoint,
+                      {"source": "loop", "step": 1}, {"messages": 1})
+    return store, saver
+
+
+def measure(users: int, todos: int, threads: bool = True) -> Dict[str, Any]:
+    store, saver = populate(users, todos, threads)
+    snapshotter = Snapshotter()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "snapshot.bin")
+        written = snapshotter.write(path, store, saver)
+        del store, saver
+        started = time.perf_counter()
+        loaded = snapshotter.load(path, InMemoryStore(), MemorySaver())
+        restart = time.perf_counter() - started
+    return {"users": users, "items": written["items"], "checkpoints": written["checkpoints"],
+            "bytes": written["bytes"], "write_seconds": round(written["seconds"], 3),
+            "restore_seconds": round(restart, 3), "restored_items": loaded["items"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot write and restore times")
+    parser.add_argument("--users", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--todos", type=int, default=1, help="todos per user")
+    parser.add_argument("--no-threads", action="store_true", help="snapshot the store only")
+    args = parser.parse_args(argv)
+    print(json.dumps([measure(users, args.todos, not args.no_threads) for users in args.users], indent=2))
+
+
+if __name__ == "__main__":
+    main()
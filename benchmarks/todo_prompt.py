@@ -0,0 +1,96 @@
+"""
+task_mAIstro prompt size versus the number of todos a user has.
+
+For each todo count, fills an in-memory store with synthetic todos and
+reports the system prompt tokens with every todo rendered (the old behaviour)
+and with the top-k todos from the BM25 index, plus the index build and query
+times:
+
+    python -m benchmarks.todo_prompt --counts 10 100 1000 --output todos.json
+"""
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, List, Sequence
+
+from langchain_core.messages import SystemMessage
+from langgraph.store.memory import InMemoryStore
+
+from benchmarks.corpus import CITIES
+from components.context_window import count_tokens
+from components.memory_cache import MemoryContext
+from components.nodes import render_todos
+from components.store_access import write_memories
+from components.todo_index import TodoIndexCache
+from config import MEMORY_CONFIG
+
+TASKS = [
+    "Buy tickets for the {city} match",
+    "Book a hotel in {city} for the quarter final",
+    "Renew my passport before the {city} trip",
+    "Find a sports bar in {city} showing the group stage",
+    "Plan the train route to {city}",
+    "Order a jersey to wear in {city}",
+]
+STATUSES = ["not started", "in progress", "done", "archived"]
+
+
+def make_todos(count: int, seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    rng = random.Random(seed)
+    return {f"todo-{i:06d}": {
+        "task": rng.choice(TASKS).format(city=rng.choice(CITIES)),
+        "time_to_complete": rng.randint(5, 120),
+        "deadline": None,
+        "solutions": ["Check the official FIFA site", f"Ask a friend in {rng.choice(CITIES)}"],
+        "status": rng.choice(STATUSES)
+    } for i in range(count)}
+
+
+def prompt_tokens(todos: Sequence[Dict[str, Any]]) -> int:
+    context = MemoryContext({"profile": "None", "todo": render_todos(list(todos)), "instructions": ""})
+    return count_tokens([SystemMessage(content=context.system_message)])
+
+
+def measure(count: int, query: str, k: int) -> Dict[str, Any]:
+    todos = make_todos(count)
+    store = InMemoryStore()
+    write_memories(store, ("todo", "fan"), todos)
+    indexes = TodoIndexCache()
+
+    start = time.perf_counter()
+    index = indexes.get(store, "fan")
+    built = time.perf_counter()
+    top = [value for _, value in index.search(query, k)]
+    searched = time.perf_counter()
+
+    return {
+        "todos": count,
+        "full_prompt_tokens": prompt_tokens(todos.values()),
+        "indexed_prompt_tokens": prompt_tokens(top),
+        "index_build_ms": (built - start) * 1000,
+        "search_ms": (searched - built) * 1000
+    }
+
+
+def run(counts: Sequence[int], query: str, k: int) -> List[Dict[str, Any]]:
+    return [measure(count, query, k) for count in counts]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prompt tokens versus todo count, with and without the todo index")
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 50, 100, 500, 1000])
+    parser.add_argument("--query", default="Did I book the hotel in Miami yet?")
+    parser.add_argument("--top-k", type=int, default=MEMORY_CONFIG["todo_top_k"])
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    output = json.dumps(run(args.counts, args.query, args.top_k), indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
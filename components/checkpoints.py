@@ -0,0 +1,143 @@
+"""
+Within-thread checkpointers selected by CHECKPOINT_CONFIG.
+"""
+import asyncio
+import os
+import sqlite3
+from typing import Any, AsyncIterator, Dict, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver, CheckpointTuple
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from config import CHECKPOINT_CONFIG
+
+_PRUNE_CHECKPOINTS_SQL = """
+    DELETE FROM checkpoints
+    WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < (
+        SELECT MIN(checkpoint_id) FROM (
+            SELECT checkpoint_id FROM checkpoints
+            WHERE thread_id = ? AND checkpoint_ns = ?
+            ORDER BY checkpoint_id DESC LIMIT ?
+        )
+    )
+"""
+
+_PRUNE_WRITES_SQL = """
+    DELETE FROM writes
+    WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < (
+        SELECT MIN(checkpoint_id) FROM checkpoints
+        WHERE thread_id = ? AND checkpoint_ns = ?
+    )
+"""
+
+
+class RetainingSqliteSaver(SqliteSaver):
+    """SqliteSaver that keeps only the newest ``keep_last`` checkpoints of each thread.
+
+    Older checkpoints and their pending writes are deleted as new ones are put.
+    Every ``compact_every`` prunes, freed pages are handed back to the OS. Each
+    checkpoint stores the full channel values, so dropping ancestors never
+    breaks resuming from the newest one.
+    """
+
+    def __init__(self, path: str, keep_last: int = 5, compact_every: int = 1000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        # Has to be set before the tables exist for incremental_vacuum to work
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        super().__init__(conn)
+        self.path = path
+        self.keep_last = keep_last
+        self.compact_every = compact_every
+        self._prunes = 0
+
+    def put(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        self.prune(saved["configurable"]["thread_id"], saved["configurable"]["checkpoint_ns"])
+        return saved
+
+    def prune(self, thread_id: str, checkpoint_ns: str = "") -> None:
+        """Delete all but the newest ``keep_last`` checkpoints of one thread."""
+        args = (str(thread_id), checkpoint_ns)
+        with self.cursor() as cur:
+            cur.execute(_PRUNE_CHECKPOINTS_SQL, args + args + (self.keep_last,))
+            cur.execute(_PRUNE_WRITES_SQL, args + args)
+            self._prunes += 1
+            due = self._prunes % self.compact_every == 0
+        if due:
+            self.compact()
+
+    def compact(self) -> None:
+        """Return free pages to the OS and truncate the WAL."""
+        with self.cursor() as cur:
+            cur.execute("PRAGMA incremental_vacuum").fetchall()
+            cur.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+    def thread_bytes(self, thread_id: Optional[str] = None) -> Dict[str, int]:
+        """Bytes of checkpoint and pending-write data stored per thread."""
+        where, args = ("WHERE thread_id = ?", (str(thread_id),)) if thread_id is not None else ("", ())
+        sizes: Dict[str, int] = {}
+        with self.cursor(transaction=False) as cur:
+            for table, columns in (("checkpoints", "length(checkpoint) + length(metadata)"),
+                                   ("writes", "length(value)")):
+                for tid, size in cur.execute(
+                    f"SELECT thread_id, SUM({columns}) FROM {table} {where} GROUP BY thread_id", args
+                ):
+                    sizes[tid] = sizes.get(tid, 0) + (size or 0)
+        return sizes
+
+    # The graph calls the async API under ainvoke; run the sync one off the event loop
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_tuple, config)
+
+    async def alist(self,
+                    config: Optional[RunnableConfig],
+                    *,
+                    filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        tuples = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint_tuple in tuples:
+            yield checkpoint_tuple
+
+    async def aput(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(self,
+                          config: RunnableConfig,
+                          writes: Sequence[tuple],
+                          task_id: str,
+                          task_path: str = "") -> None:
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.put_writes, config, writes, task_id, task_path
+        )
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.delete_thread, thread_id)
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def create_checkpointer(config: Optional[Dict[str, Any]] = None) -> BaseCheckpointSaver:
+    """Build the checkpointer described by ``config`` (CHECKPOINT_CONFIG by default)."""
+    config = {**CHECKPOINT_CONFIG, **(config or {})}
+    saver_type = config["type"]
+    if saver_type == "memory":
+        return MemorySaver()
+    if saver_type == "sqlite":
+        return RetainingSqliteSaver(
+            config["sqlite_path"],
+            keep_last=config["keep_last"],
+            compact_every=config["compact_every"]
+        )
+    raise ValueError(f"Unknown checkpointer type: {saver_type}")
@@ -1,7 +1,8 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import TypedDict, Literal
+from typing import TypedDict, Literal, Annotated, Dict
 from typing import Optional
+from langgraph.graph import MessagesState
 
 class Memory(BaseModel):
     content: str = Field(description="The main content of the memory. For example: User expressed interest in learning about French.")
@@ -49,4 +50,14 @@ class ToDo(BaseModel):
     status: Literal["not started", "in progress", "done", "archived"] = Field(
         description="Current status of the task",
         default="not started"
-    )
\ No newline at end of file
+    )
+
+# Parallel update nodes each advance their own namespace's watermark
+def merge_watermarks(left: Dict[str, str], right: Dict[str, str]) -> Dict[str, str]:
+    return {**(left or {}), **(right or {})}
+
+# Graph state: the chat history, the rolling summary of turns windowed out of it,
+# and per namespace the id of the last message its extractor has processed
+class AgentState(MessagesState):
+    summary: str
+    extracted: Annotated[Dict[str, str], merge_watermarks]
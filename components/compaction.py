@@ -0,0 +1,248 @@
+"""
+Background compaction of todo memories.
+
+update_todos only inserts into and patches ``("todo", user_id)``, so finished
+todos and near-duplicates from repeated mentions pile up, and every one of
+them is read again by task_mAIstro and sent to the extractor as ``existing``.
+Compaction keeps the hot namespace to the open, distinct todos:
+
+* ``done`` and ``archived`` todos move to ``(cold_namespace, user_id)``;
+* open todos whose task texts reach a word Jaccard similarity of
+  ``similarity`` are merged into the most recently updated one, which gets
+  the union of their solutions, the earliest deadline and the furthest
+  status; the others move to the cold namespace with ``merged_into`` set.
+
+It is incremental: update_todos marks its user and a background thread
+compacts up to ``users_per_pass`` marked users every ``interval`` seconds, so
+users who have not written since their last compaction are never read.
+update_todos holds the user's lock from reading the todos to writing them
+back, and a compaction only runs under the same lock: a user being updated
+is marked again instead of waiting, so an extraction can never patch a todo
+that was moved away under it. A compaction whose todos were changed anyway,
+by a writer outside update_todos, is dropped and the user marked again.
+Every compaction reports the bytes and the prompt tokens it removed.
+"""
+import json
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Set, Tuple
+
+from langchain_core.messages import SystemMessage
+from langgraph.store.base import BaseStore, GetOp, Item
+
+from components.context_window import count_tokens
+from components.logger import LoggerMixin
+from components.memory_cache import memory_context_cache
+from components.memory_format import format_todo
+from components.metrics import COMPACTED_TODOS, COMPACTION_SAVED
+from components.store_access import move_memories, read_namespace
+from components.todo_index import todo_indexes, tokenize
+from config import COMPACTION_CONFIG
+
+CLOSED_STATUSES = ("done", "archived")
+_STATUS_RANK = {"not started": 0, "in progress": 1}
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    """Jaccard similarity of two token sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def merge_todos(kept: Mapping[str, Any], other: Mapping[str, Any]) -> Dict[str, Any]:
+    """``kept`` with the solutions, earliest deadline and furthest status of ``other`` folded in."""
+    merged = dict(kept)
+    merged["solutions"] = list(dict.fromkeys(list(kept.get("solutions") or []) + list(other.get("solutions") or [])))
+    deadlines = [value["deadline"] for value in (kept, other) if value.get("deadline")]
+    merged["deadline"] = min(deadlines) if deadlines else kept.get("deadline")
+    if merged.get("time_to_complete") is None:
+        merged["time_to_complete"] = other.get("time_to_complete")
+    if _STATUS_RANK.get(other.get("status"), 0) > _STATUS_RANK.get(kept.get("status"), 0):
+        merged["status"] = other["status"]
+    return merged
+
+
+def plan_compaction(items: List[Item], threshold: float) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """Hot todos to rewrite and todos to move to the cold namespace, both as ``key -> value``.
+
+    Open todos are visited newest first, so each group of near-duplicates is
+    merged into its most recently updated member. Only todos sharing a task
+    token are compared.
+    """
+    updates: Dict[str, Dict[str, Any]] = {}
+    moves: Dict[str, Dict[str, Any]] = {}
+    kept: Dict[str, Dict[str, Any]] = {}
+    kept_tokens: Dict[str, Set[str]] = {}
+    postings: Dict[str, List[str]] = {}  # token -> kept keys
+    for item in sorted(items, key=lambda item: item.updated_at, reverse=True):
+        if item.value.get("status") in CLOSED_STATUSES:
+            moves[item.key] = dict(item.value)
+            continue
+        tokens = set(tokenize(str(item.value.get("task") or "")))
+        candidates = {key for token in tokens for key in postings.get(token, ())}
+        best = max(candidates, key=lambda key: (similarity(tokens, kept_tokens[key]), key), default=None)
+        if best is not None and similarity(tokens, kept_tokens[best]) >= threshold:
+            kept[best] = updates[best] = merge_todos(kept[best], item.value)
+            moves[item.key] = {**item.value, "merged_into": best}
+            continue
+        kept[item.key] = dict(item.value)
+        kept_tokens[item.key] = tokens
+        for token in tokens:
+            postings.setdefault(token, []).append(item.key)
+    return updates, moves
+
+
+def _footprint(values: List[Mapping[str, Any]]) -> Tuple[int, int]:
+    """Stored bytes of ``values`` and the prompt tokens of their rendering."""
+    stored = sum(len(json.dumps(value).encode("utf8")) for value in values)
+    tokens = count_tokens([SystemMessage(content="\n".join(format_todo(value) for value in values))]) if values else 0
+    return stored, tokens
+
+
+class TodoCompactor(LoggerMixin):
+    """Incremental, per-user compaction of todo namespaces, optionally on a background thread."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        super().__init__()
+        self.config = {**COMPACTION_CONFIG, **(config or {})}
+        self.totals = {"users": 0, "archived": 0, "merged": 0, "bytes_saved": 0, "tokens_saved": 0}
+        self._dirty: Dict[str, None] = {}  # insertion ordered, oldest mark first
+        self._lock = threading.Lock()
+        self._user_locks: Dict[str, list] = {}  # user_id -> [lock, holders and waiters]
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @contextmanager
+    def locked(self, user_id: str, blocking: bool = True) -> Iterator[bool]:
+        """Hold ``user_id``'s todo lock; without ``blocking``, yields False instead of waiting.
+
+        Locks only exist while held or awaited, so idle users cost nothing.
+        """
+        with self._lock:
+            entry = self._user_locks.setdefault(user_id, [threading.Lock(), 0])
+            entry[1] += 1
+        acquired = entry[0].acquire(blocking)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                entry[0].release()
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._user_locks[user_id]
+
+    def mark(self, user_id: str) -> None:
+        """Queue ``user_id`` for the next pass."""
+        with self._lock:
+            self._dirty.setdefault(user_id, None)
+
+    def pending(self) -> List[str]:
+        with self._lock:
+            return list(self._dirty)
+
+    def compact_user(self, store: BaseStore, user_id: str) -> Dict[str, Any]:
+        """Compact one user's todos, unless update_todos holds them; returns what was moved and saved."""
+        with self.locked(user_id, blocking=False) as acquired:
+            if acquired:
+                return self._compact_user(store, user_id)
+        self.mark(user_id)
+        return {"user_id": user_id, "todos": 0, "archived": 0, "merged": 0,
+                "bytes_saved": 0, "tokens_saved": 0, "conflict": True}
+
+    def _compact_user(self, store: BaseStore, user_id: str) -> Dict[str, Any]:
+        hot = ("todo", user_id)
+        items = read_namespace(store, hot)
+        updates, moves = plan_compaction(items, self.config["similarity"])
+        stats = {"user_id": user_id, "todos": len(items), "archived": 0, "merged": 0,
+                 "bytes_saved": 0, "tokens_saved": 0, "conflict": False}
+        if not updates and not moves:
+            return stats
+
+        # Drop the plan if another writer changed any of these todos since they were read
+        touched = [item for item in items if item.key in updates or item.key in moves]
+        current = store.batch([GetOp(hot, item.key) for item in touched])
+        if any(now is None or now.updated_at != item.updated_at for item, now in zip(touched, current)):
+            self.mark(user_id)
+            stats["conflict"] = True
+            return stats
+
+        move_memories(store, hot, (self.config["cold_namespace"], user_id), moves, updates)
+        memory_context_cache.invalidate(user_id)
+        todo_indexes.invalidate(user_id)
+
+        before = _footprint([item.value for item in items])
+        after = _footprint([updates.get(item.key, item.value) for item in items if item.key not in moves])
+        stats["merged"] = sum(1 for value in moves.values() if "merged_into" in value)
+        stats["archived"] = len(moves) - stats["merged"]
+        stats["bytes_saved"] = before[0] - after[0]
+        stats["tokens_saved"] = before[1] - after[1]
+        COMPACTED_TODOS.inc(stats["archived"], reason="closed")
+        COMPACTED_TODOS.inc(stats["merged"], reason="duplicate")
+        COMPACTION_SAVED.inc(max(stats["bytes_saved"], 0), unit="bytes")
+        COMPACTION_SAVED.inc(max(stats["tokens_saved"], 0), unit="tokens")
+        return stats
+
+    def run_pending(self, store: BaseStore, limit: Optional[int] = None) -> Dict[str, int]:
+        """Compact up to ``limit`` (``users_per_pass``) marked users, oldest mark first."""
+        limit = limit or self.config["users_per_pass"]
+        with self._lock:
+            users = list(self._dirty)[:limit]
+            for user_id in users:
+                del self._dirty[user_id]
+        return self._compact(store, users)
+
+    def compact_all(self, store: BaseStore) -> Dict[str, int]:
+        """Compact every user with a todo namespace, marked or not."""
+        namespaces = []
+        while True:
+            page = store.list_namespaces(prefix=("todo",), max_depth=2, limit=100, offset=len(namespaces))
+            namespaces.extend(page)
+            if len(page) < 100:
+                break
+        users = [namespace[1] for namespace in namespaces if len(namespace) == 2]
+        with self._lock:
+            for user_id in users:
+                self._dirty.pop(user_id, None)
+        return self._compact(store, users)
+
+    def _compact(self, store: BaseStore, users: List[str]) -> Dict[str, int]:
+        stats = {"users": 0, "archived": 0, "merged": 0, "bytes_saved": 0, "tokens_saved": 0, "conflicts": 0}
+        for user_id in users:
+            try:
+                user_stats = self.compact_user(store, user_id)
+            except Exception as e:
+                self.mark(user_id)
+                self.log_error("todo_compaction_failed", str(e), {"user_id": user_id})
+                continue
+            stats["users"] += 1
+            stats["conflicts"] += user_stats["conflict"]
+            for name in ("archived", "merged", "bytes_saved", "tokens_saved"):
+                stats[name] += user_stats[name]
+        for name in self.totals:
+            self.totals[name] += stats[name]
+        if users:
+            self.log_event("todos_compacted", stats)
+        return stats
+
+    def start(self, store: BaseStore) -> None:
+        """Run ``run_pending`` on ``store`` every ``interval`` seconds from a daemon thread."""
+        self.stop()
+        self._stop.clear()
+
+        def _loop():
+            while not self._stop.wait(self.config["interval"]):
+                self.run_pending(store)
+
+        self._thread = threading.Thread(target=_loop, daemon=True, name="todo-compactor")
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 1.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+todo_compactor = TodoCompactor()
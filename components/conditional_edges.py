@@ -3,12 +3,25 @@ from langchain_core.runnables import RunnableConfig
 from langgraph.store.base import BaseStore
 from langgraph.store.memory import InMemoryStore
 from typing import Annotated, Sequence
+from components.context_window import count_tokens, last_human_turn
+from components.registry import registry
+from components.metrics import ROUTES, PRE_ROUTES
+from config import CONTEXT_CONFIG, COALESCE_CONFIG
 
 # Conditional edge
 def route_message(state: MessagesState, config: RunnableConfig, store: BaseStore) ->  Sequence[str]:
 
     """Reflect on the memories and chat history to decide whether to update the memory collection."""
-    message = state['messages'][-1]
+    routes = _route_tool_calls(state['messages'][-1])
+    for route in routes or ["none"]:
+        ROUTES.inc(route=route)
+
+    # Score the pre-router against the LLM's first decision on each user turn
+    if len(state['messages']) > 1 and state['messages'][-2].type == "human":
+        registry.get("prerouter").observe(last_human_turn(state['messages'][:-1], COALESCE_CONFIG["max_messages"]), routes != [END])
+    return routes
+
+def _route_tool_calls(message) -> Sequence[str]:
     if len(message.tool_calls) ==0:
         return [END]
     elif len(message.tool_calls) == 1:
@@ -31,4 +44,23 @@ def route_message(state: MessagesState, config: RunnableConfig, store: BaseStore
             return ["update_instructions","update_todos"]
     else:
         return ["update_profile","update_todos","update_instructions"]
-intermediate = ["update_profile","update_todos","update_instructions", END]
\ No newline at end of file
+intermediate = ["update_profile","update_todos","update_instructions", END]
+
+# Entry edge: summarize first once the thread outgrows the summary trigger
+def should_summarize(state: MessagesState) -> str:
+
+    """Send long threads through summarize_history before task_mAIstro."""
+    if CONTEXT_CONFIG["summarize"] and count_tokens(state["messages"]) > CONTEXT_CONFIG["summary_trigger_tokens"]:
+        return "summarize_history"
+    return pre_route(state)
+
+# Pre-routing edge: chatter the local classifier is confident about skips task_mAIstro
+def pre_route(state: MessagesState) -> str:
+
+    """Send messages that need no memory update down the quick_reply path."""
+    turn = last_human_turn(state["messages"], COALESCE_CONFIG["max_messages"])
+    if state["messages"][-1].type == "human" and registry.get("prerouter").should_skip(turn):
+        PRE_ROUTES.inc(path="quick_reply")
+        return "quick_reply"
+    PRE_ROUTES.inc(path="task_mAIstro")
+    return "task_mAIstro"
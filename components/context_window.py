@@ -0,0 +1,157 @@
+"""
+Token-budgeted conversation windowing and per-call token accounting.
+
+Every model and extractor call sends ``build_history(state)`` instead of the
+raw ``state["messages"]``: the newest messages that fit CONTEXT_CONFIG's
+budget, starting on a human turn so tool calls are never split from their
+results, preceded by the thread's rolling summary if one exists.
+
+Trustcall extractors instead get ``extraction_history``: only the turns added
+since their namespace's watermark, since the existing memories they are given
+already reflect everything before it.
+"""
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages
+
+from components.metrics import MODEL_TOKENS
+from config import CONTEXT_CONFIG
+
+
+def count_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Approximate prompt tokens of ``messages``; cheap enough for the hot path."""
+    return count_tokens_approximately(messages)
+
+
+def window_messages(messages: Sequence[BaseMessage], max_tokens: Optional[int] = None) -> List[BaseMessage]:
+    """Newest suffix of ``messages`` within ``max_tokens``, starting on a human message."""
+    max_tokens = max_tokens or CONTEXT_CONFIG["max_tokens"]
+    if count_tokens(messages) <= max_tokens:
+        return list(messages)
+    windowed = trim_messages(
+        messages,
+        max_tokens=max_tokens,
+        token_counter=count_tokens_approximately,
+        strategy="last",
+        start_on="human",
+    )
+    if windowed:
+        return windowed
+    # A single oversized turn: keep it whole rather than sending nothing
+    for i in range(len(messages) - 1, -1, -1):
+        if messages[i].type == "human":
+            return list(messages[i:])
+    return list(messages[-1:])
+
+
+def last_human_turn(messages: Sequence[BaseMessage], max_messages: Optional[int] = None) -> str:
+    """Text of the latest run of human messages, skipping any tool round trip after it.
+
+    ``max_messages`` keeps only the newest messages of the run, e.g. one
+    coalesced burst.
+    """
+    texts = []
+    for message in reversed(messages):
+        if message.type == "human":
+            if len(texts) == max_messages:
+                break
+            texts.append(str(message.content))
+        elif texts:
+            break
+    return "\n".join(reversed(texts))
+
+
+def build_history(state: Dict[str, Any], drop_last: bool = False, max_tokens: Optional[int] = None) -> List[BaseMessage]:
+    """Windowed history for a model call, prefixed by the rolling summary if any."""
+    messages = state["messages"][:-1] if drop_last else state["messages"]
+    history = window_messages(messages, max_tokens)
+    summary = state.get("summary")
+    if summary:
+        history = [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] + history
+    return history
+
+
+def extraction_history(state: Dict[str, Any],
+                       memory_type: str,
+                       max_tokens: Optional[int] = None):
+    """Messages the ``memory_type`` extractor has not processed yet, and the watermark to store after it succeeds.
+
+    The delta starts on the first human message after the watermark. Without a
+    watermark, or once it has been summarized away, the full windowed history
+    is used.
+    """
+    messages = state["messages"][:-1]
+    watermark = (state.get("extracted") or {}).get(memory_type)
+    new_watermark = messages[-1].id if messages else watermark
+    ids = [message.id for message in messages]
+    if watermark is None or watermark not in ids:
+        return build_history(state, drop_last=True, max_tokens=max_tokens), new_watermark
+
+    start = ids.index(watermark) + 1
+    for i in range(start, len(messages)):
+        if messages[i].type == "human":
+            return window_messages(messages[i:], max_tokens), new_watermark
+    # A second update in the same turn: re-read from the latest human message
+    for i in range(len(messages) - 1, -1, -1):
+        if messages[i].type == "human":
+            return window_messages(messages[i:], max_tokens), new_watermark
+    return [], new_watermark
+
+
+def split_for_summary(messages: Sequence[BaseMessage], max_tokens: Optional[int] = None):
+    """Split ``messages`` into (older messages to fold into the summary, messages to keep)."""
+    kept = window_messages(messages, max_tokens)
+    cut = len(messages) - len(kept)
+    return list(messages[:cut]), list(messages[cut:])
+
+
+class TokenAccountant:
+    """Per-call prompt/completion token records with running totals per call name."""
+
+    def __init__(self, history: int = 1000):
+        self.records = deque(maxlen=history)
+        self.totals: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, prompt_tokens: int, response: Any = None) -> None:
+        """Record one call; ``response`` may carry provider ``usage_metadata``."""
+        usage = getattr(response, "usage_metadata", None) or {}
+        entry = {
+            "name": name,
+            "prompt_tokens": prompt_tokens,
+            "input_tokens": usage.get("input_tokens"),
+            "output_tokens": usage.get("output_tokens")
+        }
+        MODEL_TOKENS.inc(prompt_tokens, call=name, direction="prompt")
+        if entry["output_tokens"]:
+            MODEL_TOKENS.inc(entry["output_tokens"], call=name, direction="output")
+        with self._lock:
+            self.records.append(entry)
+            totals = self.totals.setdefault(name, {"calls": 0, "prompt_tokens": 0, "max_prompt_tokens": 0})
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["max_prompt_tokens"] = max(totals["max_prompt_tokens"], prompt_tokens)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {name: dict(totals) for name, totals in self.totals.items()}
+
+    def merge(self, totals: Dict[str, Dict[str, int]]) -> None:
+        """Add another process's ``snapshot`` to the running totals."""
+        with self._lock:
+            for name, other in totals.items():
+                mine = self.totals.setdefault(name, {"calls": 0, "prompt_tokens": 0, "max_prompt_tokens": 0})
+                mine["calls"] += other["calls"]
+                mine["prompt_tokens"] += other["prompt_tokens"]
+                mine["max_prompt_tokens"] = max(mine["max_prompt_tokens"], other["max_prompt_tokens"])
+
+    def reset(self) -> None:
+        with self._lock:
+            self.records.clear()
+            self.totals.clear()
+
+
+token_usage = TokenAccountant()
@@ -1,15 +1,194 @@
+"""
+Streaming ingestion of chat exports for the AI ReAct Agents Recommendation System.
+
+Exports are read line by line in binary mode so memory stays bounded no matter how
+large the file is, and every parsed message carries the byte offset just past its
+line. Persisting that offset lets a restarted job resume where it stopped.
+"""
+import json
+import os
 import re
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+# [@author - March 1, 2025, 10:05 AM]"body"
+MESSAGE_PATTERN = re.compile(rb'^\[@([^\s\]]+)(?: - ([^\]]*))?\](.*)$')
+
+
+class ChatMessage(NamedTuple):
+    """A single parsed chat line."""
+    user_id: str
+    timestamp: str
+    message: str
+    offset: int  # byte offset just past this line, i.e. where to resume
+
+
+def parse_line(line: bytes, offset: int, encoding: str = "utf8") -> Optional[ChatMessage]:
+    """Parse one raw export line; returns None for lines that are not messages."""
+    match = MESSAGE_PATTERN.match(line.strip())
+    if not match:
+        return None
+    author, timestamp, body = match.groups()
+    body = body.strip()
+    if not body:
+        return None
+    return ChatMessage(
+        author.decode(encoding),
+        timestamp.decode(encoding) if timestamp else "",
+        body.decode(encoding),
+        offset
+    )
+
+
+def parse_timestamp(timestamp: str) -> Optional[datetime]:
+    """Parse an export timestamp such as ``March 1, 2025, 10:05 AM``."""
+    try:
+        return datetime.strptime(timestamp.strip(), "%B %d, %Y, %I:%M %p")
+    except ValueError:
+        return None
+
+
+def coalesce_messages(messages: Iterable[ChatMessage],
+                      window_ms: int,
+                      max_messages: int) -> Iterator[List[ChatMessage]]:
+    """Group bursts of messages from the same user into batches.
+
+    A user's message joins their open batch if it is stamped within
+    ``window_ms`` of the batch's first message and the batch has fewer than
+    ``max_messages``. Messages without a parseable timestamp only join a batch
+    they directly follow in the stream. Each user's messages stay in order;
+    batches are yielded as soon as a later message proves them closed, so the
+    input is consumed lazily.
+    """
+    window = timedelta(milliseconds=window_ms)
+    open_batches: "OrderedDict[str, tuple]" = OrderedDict()  # user_id -> (deadline, messages)
+    previous = None
+
+    for msg in messages:
+        sent_at = parse_timestamp(msg.timestamp)
+        for user_id, (deadline, batch) in list(open_batches.items()):
+            if user_id != msg.user_id and (deadline is None or sent_at is None or sent_at > deadline):
+                del open_batches[user_id]
+                yield batch
+
+        current = open_batches.get(msg.user_id)
+        if current is not None:
+            deadline, batch = current
+            if deadline is not None and sent_at is not None:
+                joins = sent_at <= deadline
+            else:
+                joins = previous is batch[-1]
+            if joins and len(batch) < max_messages:
+                batch.append(msg)
+            else:
+                del open_batches[msg.user_id]
+                yield batch
+                current = None
+        if current is None:
+            open_batches[msg.user_id] = (sent_at + window if sent_at is not None else None, [msg])
+
+        if len(open_batches[msg.user_id][1]) >= max_messages:
+            yield open_batches.pop(msg.user_id)[1]
+        previous = msg
+
+    for _, batch in open_batches.values():
+        yield batch
+
+
+class IngestCheckpoint:
+    """Byte-offset checkpoint for one export file, stored as a small JSON file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self, source: str) -> int:
+        """Return the saved offset for ``source``, or 0 if there is none."""
+        try:
+            with open(self.path, encoding="utf8") as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return 0
+        if state.get("source") != os.path.abspath(source):
+            return 0
+        return int(state.get("offset", 0))
+
+    def save(self, source: str, offset: int) -> None:
+        """Atomically persist ``offset`` for ``source``."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf8") as f:
+            json.dump({"source": os.path.abspath(source), "offset": offset}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        """Forget the saved offset."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class OffsetTracker:
+    """Turns out-of-order completions into a safe resume offset.
+
+    Messages are registered in stream order with ``issue`` and reported with
+    ``complete`` in any order; ``watermark`` only advances past a message once
+    it and every message before it have completed.
+    """
+
+    def __init__(self, start: int = 0):
+        self.watermark = start
+        self._issued = deque()
+        self._completed = set()
+
+    def issue(self, msg: ChatMessage) -> None:
+        self._issued.append(msg.offset)
+
+    def complete(self, msg: ChatMessage) -> bool:
+        """Mark ``msg`` done; returns True if the watermark moved."""
+        self._completed.add(msg.offset)
+        moved = False
+        while self._issued and self._issued[0] in self._completed:
+            self._completed.discard(self._issued[0])
+            self.watermark = self._issued.popleft()
+            moved = True
+        return moved
+
+
+class ChatExportReader:
+    """Lazily iterates the messages of a chat export, optionally resuming from a checkpoint."""
+
+    def __init__(self, path: str, encoding: str = "utf8", checkpoint_path: Optional[str] = None):
+        self.path = path
+        self.encoding = encoding
+        self.checkpoint = IngestCheckpoint(checkpoint_path) if checkpoint_path else None
+        self.skipped = 0
+
+    def resume_offset(self) -> int:
+        """Offset a resumed run starts from."""
+        return self.checkpoint.load(self.path) if self.checkpoint else 0
+
+    def iter_messages(self, start_offset: int = 0) -> Iterator[ChatMessage]:
+        """Yield messages starting at byte ``start_offset``."""
+        offset = start_offset
+        with open(self.path, "rb") as f:
+            f.seek(start_offset)
+            for line in f:
+                offset += len(line)
+                msg = parse_line(line, offset, self.encoding)
+                if msg is None:
+                    if line.strip():
+                        self.skipped += 1
+                    continue
+                yield msg
+
+    def __iter__(self) -> Iterator[ChatMessage]:
+        return self.iter_messages()
 
-def load_data():
-    with open("../data/fifa2026.txt") as f:
-        fifa = f.readlines()
-    fifa = [item.strip() for item in fifa if item != '\n']
-    msgs = []
-    for i, text in enumerate(fifa):
-        match = re.search(r'\[@([^\s]+)', text)
-        rest, post = text.rsplit(sep="M]")
-        if match and post:
-            msgs.append({"user_id":match.group(1), "message":post})
-        else:
-            print(f"{i}: Not found")
-load_data()
\ No newline at end of file
+    def commit(self, offset: int) -> None:
+        """Persist ``offset`` as the resume point."""
+        if self.checkpoint:
+            self.checkpoint.save(self.path, offset)
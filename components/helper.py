@@ -1,7 +1,4 @@
 
-from trustcall import create_extractor
-from langchain_openai import ChatOpenAI
-from components.cls import Memory, Profile
 # Inspect the tool calls made by Trustcall
 class Spy:
     def __init__(self):
@@ -19,23 +16,6 @@ class Spy:
                     r.outputs["generations"][0][0]["message"]["kwargs"]["tool_calls"]
                 )
 
-# Initialize the spy
-spy = Spy()
-
-# Initialize the model
-model = ChatOpenAI(model="gpt-4o", temperature=0)
-
-# Create the extractor
-trustcall_extractor = create_extractor(
-    model,
-    tools=[Memory],
-    tool_choice="Memory",
-    enable_inserts=True,
-)
-
-# Add the spy as a listener
-trustcall_extractor_see_all_tool_calls = trustcall_extractor.with_listeners(on_end=spy)
-
 
 def extract_tool_info(tool_calls, schema_name="Memory"):
     """Extract information from tool calls for both patches and new memories.
@@ -80,9 +60,17 @@ def extract_tool_info(tool_calls, schema_name="Memory"):
     
     return "\n\n".join(result_parts)
 
-# Create the Trustcall extractor for updating the user profile 
-profile_extractor = create_extractor(
-    model,
-    tools=[Profile],
-    tool_choice="Profile",
-)
\ No newline at end of file
+
+def reply_text(messages):
+    """Content of the AI reply to the latest human turn, or None when the turn got no reply.
+
+    Walks back from the end of the thread and stops at the human turn, so a
+    turn the graph finished without replying (quick_reply disabled) does not
+    pick up an earlier turn's reply or echo the user's own message.
+    """
+    for message in reversed(messages):
+        if message.type == "human":
+            return None
+        if message.type == "ai" and not message.tool_calls:
+            return message.content
+    return None
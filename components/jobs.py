@@ -0,0 +1,223 @@
+"""
+Resumable batch jobs over the whole ingestion stream.
+
+A job walks the chat export in chunks of ``chunk_size`` messages. After each
+chunk it records every message in an idempotency ledger and then commits the
+ingestion checkpoint, so a crashed backfill restarts at the last finished
+chunk, and a message that is already in the ledger (from this run, a previous
+one, or an overlapping export) is never sent to the model again.
+
+Messages are keyed by a hash of the user, the timestamp and the text: the
+same text sent again at another time is a new message. Failed messages go to
+a JSONL dead-letter file instead of being retried by the next run; they are
+retried only by ``replay_dead_letters``, which keeps the ones that fail again.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from components.data_loader import ChatMessage
+from components.logger import LoggerMixin
+from config import JOB_CONFIG
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed (
+    key TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    processed_at REAL NOT NULL
+)
+"""
+
+
+def message_key(msg: ChatMessage) -> str:
+    """Idempotency key of a message: its user, timestamp and text."""
+    return hashlib.sha256("\x1f".join((msg.user_id, msg.timestamp, msg.message)).encode("utf8")).hexdigest()[:32]
+
+
+def chunked(messages: Iterable[ChatMessage], size: int) -> Iterator[List[ChatMessage]]:
+    iterator = iter(messages)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class JobLedger:
+    """SQLite record of the messages a job has already handled, and how that went."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def seen(self, keys: Sequence[str], status: Optional[str] = None) -> Set[str]:
+        """The subset of ``keys`` already in the ledger, with ``status`` if given."""
+        found = set()
+        condition = "status = ? AND " if status else ""
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = list(keys[start:start + 500])
+                rows = self.conn.execute(
+                    f"SELECT key FROM processed WHERE {condition}key IN ({','.join('?' * len(chunk))})",
+                    ([status] if status else []) + chunk
+                ).fetchall()
+                found.update(row[0] for row in rows)
+        return found
+
+    def record(self, entries: Iterable[Tuple[str, str, str]]) -> None:
+        """Upsert ``(key, user_id, status)`` entries in one transaction."""
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT INTO processed (key, user_id, status, processed_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET status = excluded.status, processed_at = excluded.processed_at",
+                [(key, user_id, status, now) for key, user_id, status in entries]
+            )
+            self.conn.execute("COMMIT")
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM processed GROUP BY status").fetchall())
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class DeadLetterFile:
+    """Append-only JSONL file of failed messages."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def append(self, failures: Sequence[Tuple[ChatMessage, str]]) -> None:
+        if not failures:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf8") as f:
+            for msg, error in failures:
+                f.write(json.dumps({"key": message_key(msg), **msg._asdict(), "error": error,
+                                    "failed_at": time.time()}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read(self) -> List[Dict[str, Any]]:
+        """Entries of the file, the latest one per message."""
+        try:
+            with open(self.path, encoding="utf8") as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+        return list({entry["key"]: entry for entry in entries}.values())
+
+    def rewrite(self, entries: Sequence[Dict[str, Any]]) -> None:
+        """Atomically replace the file with ``entries``."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_path, self.path)
+
+
+class BatchJob(LoggerMixin):
+    """Chunked, resumable and idempotent processing of a RecommendationSystem's export."""
+
+    def __init__(self,
+                 system,
+                 chunk_size: Optional[int] = None,
+                 ledger_path: Optional[str] = None,
+                 dead_letter_path: Optional[str] = None,
+                 max_concurrency: Optional[int] = None):
+        super().__init__()
+        self.system = system
+        self.chunk_size = chunk_size or JOB_CONFIG["chunk_size"]
+        self.ledger = JobLedger(ledger_path or JOB_CONFIG["ledger_path"])
+        self.dead_letters = DeadLetterFile(dead_letter_path or JOB_CONFIG["dead_letter_path"])
+        self.max_concurrency = max_concurrency or JOB_CONFIG["max_concurrency"]
+
+    def run(self, resume: bool = True, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Process the export from the checkpoint (or the start), at most ``limit`` messages."""
+        return asyncio.run(self.arun(resume, limit))
+
+    async def arun(self, resume: bool = True, limit: Optional[int] = None) -> Dict[str, Any]:
+        reader = self.system.reader
+        start_offset = reader.resume_offset() if resume else 0
+        stats = {"chunks": 0, "processed": 0, "skipped": 0, "failed": 0, "start_offset": start_offset,
+                 "offset": start_offset}
+        started = time.perf_counter()
+        messages = islice(reader.iter_messages(start_offset), limit)
+        for chunk in chunked(messages, self.chunk_size):
+            chunk_stats = await self._run_chunk(chunk)
+            reader.commit(chunk[-1].offset)
+            stats["chunks"] += 1
+            stats["offset"] = chunk[-1].offset
+            for name in ("processed", "skipped", "failed"):
+                stats[name] += chunk_stats[name]
+            self.log_event("batch_job_chunk", {**chunk_stats, "offset": stats["offset"]})
+        stats["seconds"] = time.perf_counter() - started
+        self.log_event("batch_job_completed", stats)
+        return stats
+
+    async def _run_chunk(self, chunk: List[ChatMessage]) -> Dict[str, int]:
+        keys = [message_key(msg) for msg in chunk]
+        seen = self.ledger.seen(keys)
+        fresh, fresh_keys = [], set()
+        for key, msg in zip(keys, chunk):
+            if key not in seen and key not in fresh_keys:
+                fresh.append((key, msg))
+                fresh_keys.add(key)
+        results = await self._process([msg for _, msg in fresh])
+
+        failures = [(msg, result["error"]) for (_, msg), result in zip(fresh, results) if result["status"] == "error"]
+        # Dead letters are written before the ledger, so a crash in between replays rather than loses them
+        self.dead_letters.append(failures)
+        self.ledger.record((key, msg.user_id, result["status"]) for (key, msg), result in zip(fresh, results))
+        return {"processed": len(fresh) - len(failures), "skipped": len(chunk) - len(fresh), "failed": len(failures)}
+
+    async def _process(self, messages: List[ChatMessage]) -> List[Dict[str, Any]]:
+        """One result per message, in order; coalescing stays off so results line up with messages."""
+        if not messages:
+            return []
+        return await self.system.aprocess_messages(messages=messages, max_concurrency=self.max_concurrency,
+                                                   coalesce=False)
+
+    def replay_dead_letters(self) -> Dict[str, int]:
+        """Retry every dead-lettered message; the ones that fail again stay in the file."""
+        return asyncio.run(self.areplay_dead_letters())
+
+    async def areplay_dead_letters(self) -> Dict[str, int]:
+        entries = self.dead_letters.read()
+        # Entries whose message has since succeeded, e.g. through an earlier replay that crashed
+        done = self.ledger.seen([entry["key"] for entry in entries], status="success")
+        pending = [entry for entry in entries if entry["key"] not in done]
+        messages = [ChatMessage(entry["user_id"], entry["timestamp"], entry["message"], entry["offset"])
+                    for entry in pending]
+        results = await self._process(messages)
+
+        still_failing = [{**entry, "error": result["error"], "failed_at": time.time()}
+                         for entry, result in zip(pending, results) if result["status"] == "error"]
+        self.ledger.record((entry["key"], entry["user_id"], result["status"])
+                           for entry, result in zip(pending, results))
+        self.dead_letters.rewrite(still_failing)
+        stats = {"replayed": len(pending), "recovered": len(pending) - len(still_failing),
+                 "failed": len(still_failing), "already_done": len(entries) - len(pending)}
+        self.log_event("dead_letters_replayed", stats)
+        return stats
+
+    def close(self) -> None:
+        self.ledger.close()
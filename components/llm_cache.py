@@ -0,0 +1,147 @@
+"""
+Disk-backed cache of chat model responses.
+
+Plugged into the registry's chat model as a LangChain ``BaseCache``, so every
+``task_mAIstro`` call, trustcall extraction and instruction update is looked up
+before going to the provider. Keys are a hash of the model configuration
+(model name, temperature, bound tool schemas) and the normalized prompt:
+message ids, provider metadata and the ``System Time`` line of the trustcall
+instruction are dropped, so replaying an export hits the entries written by
+the previous run. Entries are evicted least-recently-used once the file
+outgrows ``max_bytes``.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+from config import LLM_CACHE_CONFIG
+
+_SYSTEM_TIME = re.compile(r"System Time: [^\s\"\\]+")
+
+# Serialized message fields that vary between identical calls
+_VOLATILE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Strip per-run noise from a serialized prompt."""
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return _SYSTEM_TIME.sub("System Time: <now>", prompt)
+    for message in messages if isinstance(messages, list) else []:
+        kwargs = message.get("kwargs", {}) if isinstance(message, dict) else {}
+        for field in _VOLATILE_FIELDS:
+            kwargs.pop(field, None)
+    return _SYSTEM_TIME.sub("System Time: <now>", json.dumps(messages, sort_keys=True))
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(llm_string.encode("utf8"))
+    digest.update(b"\0")
+    digest.update(normalize_prompt(prompt).encode("utf8"))
+    return digest.hexdigest()
+
+
+class ResponseCache(BaseCache):
+    """SQLite-backed response cache with size-bounded LRU eviction and hit metrics."""
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, bypass: bool = False):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.bypass = bypass  # skip lookups but keep writing fresh responses
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_idx ON responses (accessed)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        if self.bypass:
+            return None
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+        return [ChatGeneration(message=message) for message in messages_from_dict(json.loads(row[0]))]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        if not all(isinstance(generation, ChatGeneration) for generation in return_val):
+            return
+        value = json.dumps([message_to_dict(generation.message) for generation in return_val]).encode("utf8")
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time())
+            )
+            self._size += len(value) - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Drop the least recently used entries until back under 90% of the limit
+        target = self.max_bytes * 0.9
+        doomed = []
+        cursor = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed")
+        for key, size in cursor:
+            if self._size <= target:
+                break
+            doomed.append((key,))
+            self._size -= size
+        cursor.close()
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "bytes": self._size
+            }
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def create_response_cache(config: Optional[Dict[str, Any]] = None) -> Optional[ResponseCache]:
+    """Build the cache described by ``config`` (LLM_CACHE_CONFIG by default), or None if disabled."""
+    config = {**LLM_CACHE_CONFIG, **(config or {})}
+    if not config["enabled"]:
+        return None
+    bypass = config["bypass"] or os.getenv("NEXUSMIND_LLM_CACHE_BYPASS", "") not in ("", "0", "false")
+    return ResponseCache(config["path"], max_bytes=config["max_bytes"], bypass=bypass)
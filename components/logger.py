@@ -1,70 +1,161 @@
 """
 Logging configuration for the AI ReAct Agents Recommendation System.
+
+With LOGGING_CONFIG's ``queue`` on, loggers only put records on an in-memory
+queue and a background QueueListener thread formats and writes them, so file
+and console I/O stay off the message-processing path. Structured events are
+serialized lazily, in that writer thread, and only if the level is enabled;
+high-volume event types can be sampled with ``sample_rates``.
 """
+import atexit
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
-import json
-from datetime import datetime
+import queue
+import random
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from config import LOGGING_CONFIG
+
+LOG_FILES = {
+    'main': 'logs/main.log',
+    'agent': 'logs/agent.log',
+    'memory': 'logs/memory.log'
+}
+
+_configured = False
+_handlers = {}  # logger name -> handlers attached by setup_logger
+_listeners = []
+
+
+class StructuredRecord:
+    """A log payload that is only turned into JSON when a handler formats it."""
+
+    __slots__ = ('created', 'fields')
+
+    def __init__(self, fields):
+        self.created = time.time()
+        self.fields = fields
+
+    def __str__(self):
+        timestamp = datetime.fromtimestamp(self.created, timezone.utc).replace(tzinfo=None).isoformat()
+        return json.dumps({'timestamp': timestamp, **self.fields}, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock handler formats every record before queueing it, which is the
+    work we want off the hot path. The queue never leaves the process, so the
+    record (and any StructuredRecord in it) can be queued as is.
+    """
+
+    def prepare(self, record):
+        return record
 
-# Create logs directory if it doesn't exist
-os.makedirs('logs', exist_ok=True)
 
 # Configure logging
-def setup_logger(name, log_file, level=logging.INFO):
-    """Function to setup a custom logger."""
-    formatter = logging.Formatter(
-        '%(asctime)s %(levelname)s [%(name)s] %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
+def setup_logger(name, log_file, level=None, use_queue=None):
+    """Function to setup a custom logger; calling it again for ``name`` is a no-op."""
+    logger = logging.getLogger(name)
+    if name in _handlers:
+        return logger
+
+    # Create logs directory if it doesn't exist
+    os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+
+    formatter = logging.Formatter(LOGGING_CONFIG["format"], datefmt=LOGGING_CONFIG["date_format"])
+
     handler = RotatingFileHandler(
         log_file,
-        maxBytes=10000000,  # 10MB
-        backupCount=5
+        maxBytes=LOGGING_CONFIG["file_size_limit"],
+        backupCount=LOGGING_CONFIG["backup_count"]
     )
-    handler.setFormatter(formatter)
-    
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
-    logger.addHandler(handler)
-    
+    handlers = [handler]
+
     # Also log to console
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
+    if LOGGING_CONFIG.get("console", True):
+        handlers.append(logging.StreamHandler())
+    for h in handlers:
+        h.setFormatter(formatter)
+
+    if LOGGING_CONFIG.get("queue", False) if use_queue is None else use_queue:
+        records = queue.SimpleQueue()
+        listener = QueueListener(records, *handlers)
+        listener.start()
+        _listeners.append(listener)
+        attached = [DeferredQueueHandler(records)]
+    else:
+        attached = handlers
+
+    logger.setLevel(level or LOGGING_CONFIG["level"])
+    for h in attached:
+        logger.addHandler(h)
+    _handlers[name] = attached
+
     return logger
 
-# Create different loggers for different components
-main_logger = setup_logger('main', 'logs/main.log')
-agent_logger = setup_logger('agent', 'logs/agent.log')
-memory_logger = setup_logger('memory', 'logs/memory.log')
+def configure_logging():
+    """Attach file and console handlers to the component loggers, once.
+
+    Importing this module has no side effects; entry points call this before
+    they start logging.
+    """
+    global _configured
+    if _configured:
+        return
+    for name, log_file in LOG_FILES.items():
+        setup_logger(name, log_file)
+    atexit.register(shutdown_logging)
+    _configured = True
+
+def shutdown_logging():
+    """Drain the queues and stop the writer threads; records logged afterwards are dropped."""
+    while _listeners:
+        _listeners.pop().stop()
+
+# Different loggers for different components; handlers come from configure_logging()
+main_logger = logging.getLogger('main')
+agent_logger = logging.getLogger('agent')
+memory_logger = logging.getLogger('memory')
 
 class LoggerMixin:
-    """Mixin to add logging capabilities to classes."""
-    
+    """Mixin to add logging capabilities to classes.
+
+    Each class logs to ``main.<ClassName>``, a child of the configured
+    ``main`` logger, so its events take main's level and handlers.
+    """
+
     def __init__(self):
-        self.logger = logging.getLogger(self.__class__.__name__)
-    
+        self.logger = main_logger.getChild(self.__class__.__name__)
+
     def log_event(self, event_type, data):
-        """Log an event with structured data."""
-        log_entry = {
-            'timestamp': datetime.utcnow().isoformat(),
-            'event_type': event_type,
-            'data': data
-        }
-        self.logger.info(json.dumps(log_entry))
-    
+        """Log an event with structured data.
+
+        Costs one level check when INFO is off. ``data`` is serialized later,
+        by the writer, so it must not be mutated after the call.
+        """
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        fields = {'event_type': event_type, 'data': data}
+        rate = LOGGING_CONFIG["sample_rates"].get(event_type, 1.0)
+        if rate < 1.0:
+            if random.random() >= rate:
+                return
+            fields['sample_rate'] = rate  # each kept event stands for 1 / rate events
+        self.logger.info('%s', StructuredRecord(fields))
+
     def log_error(self, error_type, error_message, details=None):
-        """Log an error with details."""
-        error_entry = {
-            'timestamp': datetime.utcnow().isoformat(),
+        """Log an error with details; errors are never sampled."""
+        if not self.logger.isEnabledFor(logging.ERROR):
+            return
+        self.logger.error('%s', StructuredRecord({
             'error_type': error_type,
             'error_message': error_message,
             'details': details or {}
-        }
-        self.logger.error(json.dumps(error_entry))
+        }))
 
 # Example usage:
 # from components.logger import LoggerMixin, main_logger
@@ -77,4 +168,4 @@ class LoggerMixin:
 #             result = do_something(data)
 #             self.log_event('processing_completed', {'result': result})
 #         except Exception as e:
-#             self.log_error('processing_failed', str(e), {'input_data': data}) 
\ No newline at end of file
+#             self.log_error('processing_failed', str(e), {'input_data': data})
@@ -0,0 +1,119 @@
+"""
+Per-user cache of the rendered memory context used by task_mAIstro.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from components.prompts import MODEL_SYSTEM_TEMPLATE
+from config import MEMORY_CONFIG
+
+
+class MemoryContext:
+    """Immutable snapshot of a user's rendered profile, todo and instructions blocks."""
+
+    __slots__ = ("parts", "_system_message")
+
+    def __init__(self, parts: Dict[str, str]):
+        self.parts = parts
+        self._system_message = None
+
+    @property
+    def system_message(self) -> str:
+        """The task_mAIstro system prompt, formatted once per snapshot."""
+        if self._system_message is None:
+            self._system_message = MODEL_SYSTEM_TEMPLATE.format(
+                user_profile=self.parts["profile"],
+                todo=self.parts["todo"],
+                instructions=self.parts["instructions"]
+            )
+        return self._system_message
+
+    def replace(self, memory_type: str, rendered: str) -> "MemoryContext":
+        return MemoryContext({**self.parts, memory_type: rendered})
+
+
+class MemoryContextCache:
+    """Versioned LRU cache of MemoryContext snapshots keyed by user_id.
+
+    Readers take ``version(user_id)`` before reading the store and pass it to
+    ``put``; a put is dropped if a writer touched the user in between, so a slow
+    reader can never overwrite fresher data. Writers either push the new
+    rendering of their namespace with ``update`` (write-through) or drop the
+    snapshot with ``invalidate``.
+    """
+
+    def __init__(self, max_users: int = 10000):
+        self.max_users = max_users
+        self._entries = OrderedDict()  # user_id -> (version, MemoryContext or None)
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._floor = 0  # version reported for users that are not cached
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def version(self, user_id: str) -> int:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            return entry[0] if entry else self._floor
+
+    def get(self, user_id: str) -> Optional[MemoryContext]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[1] is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id: str, version: int, context: MemoryContext) -> bool:
+        """Store ``context`` if no write happened since ``version`` was taken."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if (entry[0] if entry else self._floor) != version:
+                return False
+            self._set(user_id, version, context)
+            return True
+
+    def update(self, user_id: str, memory_type: str, rendered: str) -> None:
+        """Write-through one namespace's new rendering into the user's snapshot."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            context = entry[1].replace(memory_type, rendered) if entry and entry[1] else None
+            self._counter += 1
+            self._set(user_id, self._counter, context)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop the user's snapshot so the next read goes to the store."""
+        with self._lock:
+            self._counter += 1
+            self._set(user_id, self._counter, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._counter += 1
+            self._floor = self._counter
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+    def _set(self, user_id, version, context):
+        self._entries[user_id] = (version, context)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+            # Any version handed out so far may belong to an evicted user
+            self._floor = self._counter
+            self.evictions += 1
+
+
+memory_context_cache = MemoryContextCache(MEMORY_CONFIG["context_cache_size"])
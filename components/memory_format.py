@@ -0,0 +1,67 @@
+"""
+Compact text rendering of stored memories for prompts.
+
+Memories are stored as ``model_dump(mode="json")`` dicts, whose repr spends
+tokens on quotes, braces, null fields, empty lists and microsecond
+timestamps. These renderers drop every field left at its schema default and
+use one terse line per document:
+
+    name: Sam; location: Miami; interests: football, food
+    Book a hotel in Miami [in progress] ~30min due 2026-06-01 -> booking.com; ask Omar
+"""
+from datetime import datetime
+from typing import Any, Mapping, Optional, Type
+
+from pydantic import BaseModel
+
+from components.cls import Profile, ToDo
+
+
+def _is_default(schema: Type[BaseModel], field: str, value: Any) -> bool:
+    if value is None or value == [] or value == "":
+        return True
+    info = schema.model_fields.get(field)
+    return info is not None and not info.is_required() and value == info.get_default(call_default_factory=True)
+
+
+def _join(value: Any) -> str:
+    return ", ".join(str(v) for v in value) if isinstance(value, list) else str(value)
+
+
+def format_when(value: Any) -> str:
+    """ISO datetimes to minutes, or to the day when the time is midnight."""
+    try:
+        moment = datetime.fromisoformat(str(value))
+    except ValueError:
+        return str(value)
+    if (moment.hour, moment.minute) == (0, 0):
+        return moment.strftime("%Y-%m-%d")
+    return moment.strftime("%Y-%m-%d %H:%M")
+
+
+def format_fields(value: Mapping[str, Any], schema: Type[BaseModel]) -> str:
+    """``key: value`` pairs of the non-default fields, in schema order."""
+    fields = [name for name in schema.model_fields if name in value] + \
+             [name for name in value if name not in schema.model_fields]
+    return "; ".join(f"{name}: {_join(value[name])}" for name in fields if not _is_default(schema, name, value[name]))
+
+
+def format_profile(value: Mapping[str, Any]) -> str:
+    return format_fields(value, Profile) or "None"
+
+
+def format_todo(value: Mapping[str, Any]) -> str:
+    parts = [str(value.get("task", ""))]
+    if not _is_default(ToDo, "status", value.get("status")):
+        parts.append(f"[{value['status']}]")
+    if value.get("time_to_complete") is not None:
+        parts.append(f"~{value['time_to_complete']}min")
+    if value.get("deadline"):
+        parts.append(f"due {format_when(value['deadline'])}")
+    if value.get("solutions"):
+        parts.append("-> " + "; ".join(str(s) for s in value["solutions"]))
+    return " ".join(parts)
+
+
+def format_instructions(value: Optional[Mapping[str, Any]]) -> str:
+    return str(value.get("memory", "")) if value else ""
@@ -0,0 +1,466 @@
+"""
+In-process metrics for the recommendation pipeline.
+
+Counters, latency histograms and gauges live in one ``MetricsRegistry``
+(module singleton ``metrics``) and are exported every MONITORING_CONFIG
+``interval`` seconds as Prometheus text or a JSON snapshot. Coverage:
+
+- graph nodes: ``instrument_node`` wraps each node function
+- model and extractor calls: ``ModelMetricsCallback`` on the shared chat model,
+  token counts from ``TokenAccountant.record``
+- store operations: ``MeteredStore`` wraps the long-term store
+- routing: ``route_message`` and ``pre_route`` outcomes
+- caches: hits and misses of the memory-context and LLM response caches,
+  read at export time
+- MONITORING_CONFIG's message_count, error_rate, response_time and
+  memory_usage: per-message counters, latency and the peak RSS of the process
+"""
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.store.base import BaseStore
+
+from components.logger import main_logger
+from components.memory_cache import memory_context_cache
+from components.registry import registry
+from config import MONITORING_CONFIG
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def _label_text(self, key: LabelValues, extra: str = "") -> str:
+        pairs = [f'{label}="{_escape(value)}"' for label, value in zip(self.labels, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            return [(self.name + self._label_text(key), value) for key, value in self._values.items()]
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"labels": dict(zip(self.labels, key)), "value": value} for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelValues, list] = {}  # key -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+
+    def time(self, **labels) -> "_Timer":
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return sum(state[:-1]) if state else 0
+
+    def _quantile(self, counts: List[int], q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the ``q`` quantile."""
+        total = sum(counts)
+        if not total:
+            return None
+        rank, seen = q * total, 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def samples(self) -> List[Tuple[str, float]]:
+        lines = []
+        with self._lock:
+            for key, state in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append((self.name + "_bucket" + self._label_text(key, f'le="{le}"'), cumulative))
+                lines.append((self.name + "_sum" + self._label_text(key), state[-1]))
+                lines.append((self.name + "_count" + self._label_text(key), cumulative))
+        return lines
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = []
+            for key, state in self._values.items():
+                counts = state[:-1]
+                total = sum(counts)
+                entries.append({
+                    "labels": dict(zip(self.labels, key)),
+                    "count": total,
+                    "sum": state[-1],
+                    "mean": state[-1] / total if total else None,
+                    "p50": self._quantile(counts, 0.5),
+                    "p99": self._quantile(counts, 0.99)
+                })
+            return entries
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, Any]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """Named metric families, rendered together for export."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def add_collector(self, collect: Callable[[], None]) -> None:
+        """Run ``collect`` before every export, e.g. to refresh gauges."""
+        self._collectors.append(collect)
+
+    def collect(self) -> None:
+        for collect in self._collectors:
+            collect()
+
+    def render_prometheus(self) -> str:
+        self.collect()
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{sample} {value}" for sample, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        self.collect()
+        return {
+            "timestamp": time.time(),
+            "metrics": {name: {"type": metric.kind, "values": metric.snapshot()}
+                        for name, metric in list(self._metrics.items())}
+        }
+
+    def dump(self) -> Dict[str, Dict[LabelValues, Any]]:
+        """Raw counter and histogram state, picklable, for ``merge`` in another process."""
+        state = {}
+        for name, metric in list(self._metrics.items()):
+            if metric.kind == "gauge":
+                continue
+            with metric._lock:
+                state[name] = {key: list(value) if isinstance(value, list) else value
+                               for key, value in metric._values.items()}
+        return state
+
+    def merge(self, state: Dict[str, Dict[LabelValues, Any]]) -> None:
+        """Add another process's ``dump`` to these metrics.
+
+        Gauges are not merged: they describe one process and are refreshed by
+        the collectors of the process that exports them.
+        """
+        for name, values in state.items():
+            metric = self._metrics.get(name)
+            if metric is None:
+                continue
+            with metric._lock:
+                for key, value in values.items():
+                    current = metric._values.get(key)
+                    if isinstance(value, list):
+                        metric._values[key] = [a + b for a, b in zip(current, value)] if current else list(value)
+                    else:
+                        metric._values[key] = (current or 0.0) + value
+
+    def reset(self) -> None:
+        """Clear recorded values, keeping the families."""
+        for metric in self._metrics.values():
+            with metric._lock:
+                metric._values.clear()
+
+
+metrics = MetricsRegistry()
+
+NODE_SECONDS = metrics.histogram("nexusmind_node_seconds", "Graph node latency", ("node",))
+NODE_ERRORS = metrics.counter("nexusmind_node_errors_total", "Graph node failures", ("node", "error"))
+MODEL_SECONDS = metrics.histogram("nexusmind_model_call_seconds", "Chat model call latency", ("node",))
+MODEL_ERRORS = metrics.counter("nexusmind_model_call_errors_total", "Failed chat model calls", ("node",))
+MODEL_TOKENS = metrics.counter("nexusmind_model_tokens_total", "Model tokens by call and direction",
+                               ("call", "direction"))
+STORE_SECONDS = metrics.histogram("nexusmind_store_batch_seconds", "Store batch latency", ("mode",))
+STORE_OPS = metrics.counter("nexusmind_store_ops_total", "Store operations by type", ("op",))
+ROUTES = metrics.counter("nexusmind_route_total", "route_message outcomes", ("route",))
+PRE_ROUTES = metrics.counter("nexusmind_preroute_total", "pre_route outcomes", ("path",))
+MESSAGES = metrics.counter("nexusmind_messages_total", "Processed messages by status", ("status",))
+RESPONSE_SECONDS = metrics.histogram("nexusmind_response_seconds", "Graph invocation latency per message batch")
+TTFT_SECONDS = metrics.histogram("nexusmind_stream_ttft_seconds", "Time to the first streamed reply token")
+REPLY_SECONDS = metrics.histogram("nexusmind_stream_reply_seconds", "Time to the end of a streamed reply")
+HTTP_REQUESTS = metrics.counter("nexusmind_http_requests_total", "Service requests by route and status",
+                                ("route", "status"))
+COMPACTED_TODOS = metrics.counter("nexusmind_compacted_todos_total", "Todos moved to the cold namespace",
+                                  ("reason",))
+COMPACTION_SAVED = metrics.counter("nexusmind_compaction_saved_total", "Bytes and prompt tokens removed from "
+                                   "hot todo namespaces", ("unit",))
+ERROR_RATE = metrics.gauge("nexusmind_error_rate", "Share of processed messages that failed")
+PEAK_MEMORY_BYTES = metrics.gauge("nexusmind_memory_peak_rss_bytes", "Peak resident set size of the process")
+CACHE_HITS = metrics.gauge("nexusmind_cache_hits", "Lookups answered by a cache", ("cache",))
+CACHE_MISSES = metrics.gauge("nexusmind_cache_misses", "Lookups a cache could not answer", ("cache",))
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, or None where ``resource`` is missing (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux and the BSDs
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _collect_process() -> None:
+    total = MESSAGES.value(status="success") + MESSAGES.value(status="error")
+    ERROR_RATE.set(MESSAGES.value(status="error") / total if total else 0.0)
+    peak = peak_rss_bytes()
+    if peak is not None:
+        PEAK_MEMORY_BYTES.set(peak)
+
+
+def _collect_caches() -> None:
+    caches = {"memory_context": memory_context_cache, "llm_response": registry.peek("llm_cache")}
+    for name, cache in caches.items():
+        # The response cache is absent when disabled and is not built just to be measured
+        if cache is not None:
+            stats = cache.stats()
+            CACHE_HITS.set(stats["hits"], cache=name)
+            CACHE_MISSES.set(stats["misses"], cache=name)
+
+
+metrics.add_collector(_collect_process)
+metrics.add_collector(_collect_caches)
+
+
+def instrument_node(node: Callable) -> Callable:
+    """Time a graph node, sync or async, and count its failures; the signature LangGraph inspects is kept."""
+    name = node.__name__
+
+    if inspect.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def awrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await node(*args, **kwargs)
+            except Exception as e:
+                NODE_ERRORS.inc(node=name, error=type(e).__name__)
+                raise
+            finally:
+                NODE_SECONDS.observe(time.perf_counter() - start, node=name)
+
+        return awrapper
+
+    @functools.wraps(node)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return node(*args, **kwargs)
+        except Exception as e:
+            NODE_ERRORS.inc(node=name, error=type(e).__name__)
+            raise
+        finally:
+            NODE_SECONDS.observe(time.perf_counter() - start, node=name)
+
+    return wrapper
+
+
+class ModelMetricsCallback(BaseCallbackHandler):
+    """Times every call of the model it is attached to, labelled with the calling graph node."""
+
+    def __init__(self):
+        self._starts: Dict[Any, Tuple[str, float]] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._starts[run_id] = ((metadata or {}).get("langgraph_node", "none"), time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._starts.pop(run_id, None)
+        if started is not None:
+            MODEL_SECONDS.observe(time.perf_counter() - started[1], node=started[0])
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        started = self._starts.pop(run_id, None)
+        if started is not None:
+            MODEL_SECONDS.observe(time.perf_counter() - started[1], node=started[0])
+            MODEL_ERRORS.inc(node=started[0])
+
+
+class MeteredStore(BaseStore):
+    """Store wrapper counting operations by type and timing each batch round trip."""
+
+    def __init__(self, store: BaseStore):
+        self.store = store
+        self.supports_ttl = store.supports_ttl
+        self.ttl_config = store.ttl_config
+
+    def __getattr__(self, name):
+        # sweep, close, setup, ... of the wrapped store
+        return getattr(self.store, name)
+
+    def _count(self, ops: List[Any]) -> None:
+        for op in ops:
+            STORE_OPS.inc(op=type(op).__name__)
+
+    def batch(self, ops: Iterable[Any]) -> List[Any]:
+        ops = list(ops)
+        self._count(ops)
+        with STORE_SECONDS.time(mode="sync"):
+            return self.store.batch(ops)
+
+    async def abatch(self, ops: Iterable[Any]) -> List[Any]:
+        ops = list(ops)
+        self._count(ops)
+        with STORE_SECONDS.time(mode="async"):
+            return await self.store.abatch(ops)
+
+
+class MetricsExporter:
+    """Writes the registry to ``path`` every ``interval`` seconds from a daemon thread."""
+
+    def __init__(self, registry: MetricsRegistry, path: str, interval: float = 60.0, format: str = "prometheus"):
+        if format not in ("prometheus", "json"):
+            raise ValueError(f"Unknown metrics format: {format}")
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self.format = format
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def export(self) -> None:
+        """Atomically replace the export file with the current values."""
+        if self.format == "json":
+            content = json.dumps(self.registry.snapshot())
+        else:
+            content = self.registry.render_prometheus()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf8") as f:
+            f.write(content)
+        os.replace(tmp_path, self.path)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        def _loop():
+            while not self._stop.wait(self.interval):
+                try:
+                    self.export()
+                except Exception:
+                    main_logger.exception("metrics export failed")
+
+        self._thread = threading.Thread(target=_loop, daemon=True, name="metrics-exporter")
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the thread and write a final export."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.export()
+
+
+def create_exporter(config: Optional[Dict[str, Any]] = None) -> Optional[MetricsExporter]:
+    """Build the exporter described by ``config`` (MONITORING_CONFIG by default), or None if disabled."""
+    config = {**MONITORING_CONFIG, **(config or {})}
+    if not config["enabled"]:
+        return None
+    return MetricsExporter(metrics, config["export_path"], config["interval"], config["format"])
@@ -1,61 +1,142 @@
-import os
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langgraph.graph import StateGraph, MessagesState, END, START
-from langchain_core.runnables import RunnableConfig
+from typing import Optional
+from langchain_core.runnables import Runnable, RunnableConfig, ensure_config
+from langgraph.config import get_store
 from langgraph.store.base import BaseStore
-from langgraph.store.memory import InMemoryStore
-from components.cls import UpdateMemory, ToDo 
-from components.prompts import MODEL_SYSTEM_MESSAGE, TRUSTCALL_INSTRUCTION, CREATE_INSTRUCTIONS
-from langchain_core.messages import merge_message_runs, HumanMessage, SystemMessage
+from components.cls import UpdateMemory, AgentState
+from components.prompts import TRUSTCALL_TEMPLATE, CREATE_INSTRUCTIONS_TEMPLATE, SUMMARY_TEMPLATE
+from components.memory_format import format_instructions, format_profile, format_todo
+from langchain_core.messages import merge_message_runs, HumanMessage, SystemMessage, RemoveMessage
 from datetime import datetime
-from components.helper import profile_extractor, Spy, extract_tool_info
-from trustcall import create_extractor
-import uuid
-load_dotenv()
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY") 
-model = ChatOpenAI(model="gpt-4o", temperature=0)
+from components.helper import extract_tool_info
+from components.registry import registry
+from components.memory_cache import MemoryContext, memory_context_cache
+from components.store_access import read_memories, get_memory, write_memories, new_memory_key
+from components.context_window import (build_history, count_tokens, extraction_history, last_human_turn,
+                                       split_for_summary, token_usage)
+from components.todo_index import relevant_todos, todo_indexes
+from components.compaction import todo_compactor
+from components.metrics import instrument_node
+from components.logger import agent_logger
+from config import MEMORY_CONFIG, PREROUTER_CONFIG
+
+# Memory rendering for the task_mAIstro system prompt
+def render_profile(values):
+    return format_profile(values[0]) if values else "None"
+
+def render_todos(values):
+    return "\n".join(format_todo(value) for value in values)
+
+def render_instructions(values):
+    return format_instructions(values[0]) if values else ""
+
+def load_memory_context(store: BaseStore, user_id: str) -> MemoryContext:
+    """Return the user's rendered memory context, reading the store only on a cache miss."""
+    context = memory_context_cache.get(user_id)
+    if context is not None:
+        return context
+
+    version = memory_context_cache.version(user_id)
+    memories = read_memories(store, user_id)
+    context = MemoryContext({
+        "profile": render_profile([mem.value for mem in memories["profile"]]),
+        "todo": render_todos([mem.value for mem in memories["todo"]]),
+        "instructions": render_instructions([mem.value for mem in memories["instructions"]])
+    })
+    memory_context_cache.put(user_id, version, context)
+    return context
 
 # Node definitions
-def task_mAIstro(state: MessagesState, config: RunnableConfig, store: BaseStore):
+#
+# Each node's body is a generator that yields ``(runnable, input)`` for every
+# model call and is sent the result back. The sync nodes below answer with
+# ``invoke``; ``GraphNode`` also gives the graph an async path answering with
+# ``ainvoke``, so runs on an event loop (the chat service, aprocess_messages)
+# await their model calls instead of each holding an executor thread. Store
+# access stays synchronous, as the sqlite store has no async API.
+
+def run_steps(steps):
+    """Drive a node body with ``invoke`` calls and return its update."""
+    try:
+        runnable, request = next(steps)
+        while True:
+            runnable, request = steps.send(runnable.invoke(request))
+    except StopIteration as done:
+        return done.value
+    finally:
+        steps.close()
+
+async def arun_steps(steps):
+    """Drive a node body with ``ainvoke`` calls and return its update."""
+    try:
+        runnable, request = next(steps)
+        while True:
+            runnable, request = steps.send(await runnable.ainvoke(request))
+    except StopIteration as done:
+        return done.value
+    finally:
+        steps.close()
+
+class GraphNode(Runnable):
+    """Graph node for the body ``steps`` (``<node>_steps``), with a sync and an async path.
+
+    Both paths are timed as the node and get the graph's store. Unlike a
+    RunnableLambda it adds no run of its own to the trace.
+    """
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.name = steps.__name__.removesuffix("_steps")
+
+        def node(state, config):
+            return run_steps(steps(state, config, get_store()))
+
+        async def anode(state, config):
+            return await arun_steps(steps(state, config, get_store()))
+
+        node.__name__ = anode.__name__ = self.name
+        self._node, self._anode = instrument_node(node), instrument_node(anode)
+
+    def invoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        return self._node(input, ensure_config(config))
+
+    async def ainvoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        return await self._anode(input, ensure_config(config))
+
+def tool_call_id(state: AgentState, update_type: str):
+    """Id of the task_mAIstro tool call asking for an ``update_type`` update."""
+    call_id = None
+    for i in range(len(state["messages"])):
+        if "tool_calls" in state["messages"][i].additional_kwargs:
+            for tool_call in state['messages'][i].tool_calls:
+                if tool_call["args"]["update_type"] == update_type:
+                    call_id = tool_call["id"]
+    return call_id
+
+def task_mAIstro_steps(state: AgentState, config: RunnableConfig, store: BaseStore):
 
     """Load memories from the store and use them to personalize the chatbot's response."""
     
     # Get the user ID from the config
     user_id = config["configurable"]["user_id"]
 
-    # Retrieve profile memory from the store
-    namespace = ("profile", user_id)
-    memories = store.search(namespace)
-    if memories:
-        user_profile = memories[0].value
-    else:
-        user_profile = None
-
-    # Retrieve task memory from the store
-    namespace = ("todo", user_id)
-    memories = store.search(namespace)
-    todo = "\n".join(f"{mem.value}" for mem in memories)
-
-    # Retrieve custom instructions
-    namespace = ("instructions", user_id)
-    memories = store.search(namespace)
-    if memories:
-        instructions = memories[0].value
-    else:
-        instructions = ""
-    
-    system_msg = MODEL_SYSTEM_MESSAGE.format(user_profile=user_profile, todo=todo, instructions=instructions)
+    # Profile, todo and custom instructions, cached until an update node writes
+    context = load_memory_context(store, user_id)
+    if MEMORY_CONFIG["todo_index"]:
+        # Only the todos relevant to this turn, from the user's local index
+        todos = relevant_todos(store, user_id, last_human_turn(state["messages"]))
+        context = context.replace("todo", render_todos(todos))
+    system_msg = context.system_message
 
-    # Respond using memory as well as the chat history
-    response = model.bind_tools([UpdateMemory], parallel_tool_calls=True).invoke([SystemMessage(content=system_msg)]+state["messages"])
+    # Respond using memory as well as the token-budgeted chat history
+    prompt = [SystemMessage(content=system_msg)] + build_history(state)
+    response = yield registry.get("chat").bind_tools([UpdateMemory], parallel_tool_calls=True), prompt
+    token_usage.record("task_mAIstro", count_tokens(prompt), response)
 
     return {"messages": [response]}
 
-def update_profile(state: MessagesState, config: RunnableConfig, store: BaseStore):
+def update_profile_steps(state: AgentState, config: RunnableConfig, store: BaseStore):
 
     """Reflect on the chat history and update the memory collection."""
-    print("Hello I am profile")    
     # Get the user ID from the config
     user_id = config["configurable"]["user_id"]
 
@@ -63,7 +144,7 @@ def update_profile(state: MessagesState, config: RunnableConfig, store: BaseStor
     namespace = ("profile", user_id)
 
     # Retrieve the most recent memories for context
-    existing_items = store.search(namespace)
+    existing_items = read_memories(store, user_id, ["profile"])["profile"]
 
     # Format the existing memories for the Trustcall extractor
     tool_name = "Profile"
@@ -73,30 +154,31 @@ def update_profile(state: MessagesState, config: RunnableConfig, store: BaseStor
                           else None
                         )
 
-    # Merge the chat history and the instruction
-    TRUSTCALL_INSTRUCTION_FORMATTED=TRUSTCALL_INSTRUCTION.format(time=datetime.now().isoformat())
-    updated_messages=list(merge_message_runs(messages=[SystemMessage(content=TRUSTCALL_INSTRUCTION_FORMATTED)] + state["messages"][:-1]))
+    # Merge the turns added since the last extraction and the instruction
+    new_messages, watermark = extraction_history(state, "profile")
+    TRUSTCALL_INSTRUCTION_FORMATTED=TRUSTCALL_TEMPLATE.format(time=datetime.now().isoformat(timespec="minutes"))
+    updated_messages=list(merge_message_runs(messages=[SystemMessage(content=TRUSTCALL_INSTRUCTION_FORMATTED)] + new_messages))
 
     # Invoke the extractor
-    result = profile_extractor.invoke({"messages": updated_messages, 
-                                         "existing": existing_memories})
+    result = yield registry.get("profile_extractor"), {"messages": updated_messages,
+                                                       "existing": existing_memories}
+    token_usage.record("update_profile", count_tokens(updated_messages), result["messages"][-1] if result["messages"] else None)
 
     # Save the memories from Trustcall to the store
+    new_values = {}
     for r, rmeta in zip(result["responses"], result["response_metadata"]):
-        store.put(namespace,
-                  rmeta.get("json_doc_id", str(uuid.uuid4())),
-                  r.model_dump(mode="json"),
-            )
+        value = r.model_dump(mode="json")
+        new_values[rmeta.get("json_doc_id") or new_memory_key(namespace, value)] = value
+    write_memories(store, namespace, new_values)
+    updated = {**{item.key: item.value for item in existing_items}, **new_values}
+    memory_context_cache.update(user_id, "profile", render_profile(list(updated.values())))
 
-    for i in range(len(state["messages"])):
-        if "tool_calls" in state["messages"][i].additional_kwargs:
-            for tool_call in state['messages'][i].tool_calls:
-                if tool_call["args"]["update_type"] ==  "user":
-                    tool_call_id = tool_call["id"]
-    print(tool_call_id)
-    return {"messages": [{"role": "tool", "content": "updated profile", "tool_call_id":tool_call_id}]}
+    call_id = tool_call_id(state, "user")
+    agent_logger.debug("tool call %s answered", call_id)
+    return {"messages": [{"role": "tool", "content": "updated profile", "tool_call_id": call_id}],
+            "extracted": {"profile": watermark}}
 
-def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore):
+def update_todos_steps(state: AgentState, config: RunnableConfig, store: BaseStore):
 
     """Reflect on the chat history and update the memory collection."""
     
@@ -106,56 +188,51 @@ def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore)
     # Define the namespace for the memories
     namespace = ("todo", user_id)
 
-    # Retrieve the most recent memories for context
-    existing_items = store.search(namespace)
+    # Compaction waits until the todos read here are written back; it holds the lock only for a few store operations
+    with todo_compactor.locked(user_id):
+        # Retrieve the most recent memories for context
+        existing_items = read_memories(store, user_id, ["todo"])["todo"]
 
-    # Format the existing memories for the Trustcall extractor
-    tool_name = "ToDo"
-    existing_memories = ([(existing_item.key, tool_name, existing_item.value)
-                          for existing_item in existing_items]
-                          if existing_items
-                          else None
-                        )
+        # Format the existing memories for the Trustcall extractor
+        tool_name = "ToDo"
+        existing_memories = ([(existing_item.key, tool_name, existing_item.value)
+                              for existing_item in existing_items]
+                              if existing_items
+                              else None
+                            )
 
-    # Merge the chat history and the instruction
-    TRUSTCALL_INSTRUCTION_FORMATTED=TRUSTCALL_INSTRUCTION.format(time=datetime.now().isoformat())
-    updated_messages=list(merge_message_runs(messages=[SystemMessage(content=TRUSTCALL_INSTRUCTION_FORMATTED)] + state["messages"][:-1]))
+        # Merge the turns added since the last extraction and the instruction
+        new_messages, watermark = extraction_history(state, "todo")
+        TRUSTCALL_INSTRUCTION_FORMATTED=TRUSTCALL_TEMPLATE.format(time=datetime.now().isoformat(timespec="minutes"))
+        updated_messages=list(merge_message_runs(messages=[SystemMessage(content=TRUSTCALL_INSTRUCTION_FORMATTED)] + new_messages))
 
-    # Initialize the spy for visibility into the tool calls made by Trustcall
-    spy = Spy()
-    
-    # Create the Trustcall extractor for updating the ToDo list 
-    todo_extractor = create_extractor(
-    model,
-    tools=[ToDo],
-    tool_choice=tool_name,
-    enable_inserts=True
-    ).with_listeners(on_end=spy)
+        # Shared ToDo extractor with a spy for visibility into the tool calls made by Trustcall
+        todo_extractor, spy = registry.with_spy("todo_extractor")
 
-    # Invoke the extractor
-    result = todo_extractor.invoke({"messages": updated_messages, 
-                                    "existing": existing_memories})
+        # Invoke the extractor
+        result = yield todo_extractor, {"messages": updated_messages,
+                                        "existing": existing_memories}
+        token_usage.record("update_todos", count_tokens(updated_messages), result["messages"][-1] if result["messages"] else None)
 
-    # Save the memories from Trustcall to the store
-    for r, rmeta in zip(result["responses"], result["response_metadata"]):
-        store.put(namespace,
-                  rmeta.get("json_doc_id", str(uuid.uuid4())),
-                  r.model_dump(mode="json"),
-            )
-        
-    # Respond to the tool call made in task_mAIstro, confirming the update
-    for i in range(len(state["messages"])):
-        if "tool_calls" in state["messages"][i].additional_kwargs:
-            for tool_call in state['messages'][i].tool_calls:
-                if tool_call["args"]["update_type"] ==  "todo":
-                    tool_call_id = tool_call["id"]
+        # Save the memories from Trustcall to the store
+        new_values = {}
+        for r, rmeta in zip(result["responses"], result["response_metadata"]):
+            value = r.model_dump(mode="json")
+            new_values[rmeta.get("json_doc_id") or new_memory_key(namespace, value)] = value
+        write_memories(store, namespace, new_values)
+        updated = {**{item.key: item.value for item in existing_items}, **new_values}
+        memory_context_cache.update(user_id, "todo", render_todos(list(updated.values())))
+        todo_indexes.update(user_id, new_values)
+        todo_compactor.mark(user_id)
 
     # Extract the changes made by Trustcall and add the the ToolMessage returned to task_mAIstro
+    call_id = tool_call_id(state, "todo")
     todo_update_msg = extract_tool_info(spy.called_tools, tool_name)
-    print(tool_call_id)
-    return {"messages": [{"role": "tool", "content": todo_update_msg, "tool_call_id":tool_call_id}]}
+    agent_logger.debug("tool call %s answered", call_id)
+    return {"messages": [{"role": "tool", "content": todo_update_msg, "tool_call_id": call_id}],
+            "extracted": {"todo": watermark}}
 
-def update_instructions(state: MessagesState, config: RunnableConfig, store: BaseStore):
+def update_instructions_steps(state: AgentState, config: RunnableConfig, store: BaseStore):
 
     """Reflect on the chat history and update the memory collection."""
     
@@ -164,20 +241,81 @@ def update_instructions(state: MessagesState, config: RunnableConfig, store: Bas
     
     namespace = ("instructions", user_id)
 
-    existing_memory = store.get(namespace, "user_instructions")
+    existing_memory = get_memory(store, namespace, "user_instructions")
         
     # Format the memory in the system prompt
-    system_msg = CREATE_INSTRUCTIONS.format(current_instructions=existing_memory.value if existing_memory else None)
-    new_memory = model.invoke([SystemMessage(content=system_msg)]+state['messages'][:-1] + [HumanMessage(content="Please update the instructions based on the conversation")])
+    system_msg = CREATE_INSTRUCTIONS_TEMPLATE.format(
+        current_instructions=format_instructions(existing_memory.value) if existing_memory else None)
+    prompt = [SystemMessage(content=system_msg)] + build_history(state, drop_last=True) + [HumanMessage(content="Please update the instructions based on the conversation")]
+    new_memory = yield registry.get("chat"), prompt
+    token_usage.record("update_instructions", count_tokens(prompt), new_memory)
 
     # Overwrite the existing memory in the store 
     key = "user_instructions"
-    store.put(namespace, key, {"memory": new_memory.content})
-    for i in range(len(state["messages"])):
-        if "tool_calls" in state["messages"][i].additional_kwargs:
-            for tool_call in state['messages'][i].tool_calls:
-                if tool_call["args"]["update_type"] ==  "instructions":
-                    tool_call_id = tool_call["id"]
-    
-    print(tool_call_id)
-    return {"messages": [{"role": "tool", "content": "updated instructions", "tool_call_id":tool_call_id}]}
\ No newline at end of file
+    write_memories(store, namespace, {key: {"memory": new_memory.content}})
+    memory_context_cache.update(user_id, "instructions", render_instructions([{"memory": new_memory.content}]))
+
+    call_id = tool_call_id(state, "instructions")
+    agent_logger.debug("tool call %s answered", call_id)
+    return {"messages": [{"role": "tool", "content": "updated instructions", "tool_call_id": call_id}]}
+
+def summarize_history_steps(state: AgentState, config: RunnableConfig, store: BaseStore):
+
+    """Fold the turns that no longer fit the context budget into the rolling summary."""
+
+    older, _ = split_for_summary(state["messages"])
+    if not older:
+        return {}
+
+    # Extend the existing summary with the turns being dropped from the thread
+    system_msg = SUMMARY_TEMPLATE.format(summary=state.get("summary") or "None")
+    prompt = [SystemMessage(content=system_msg)] + older + [HumanMessage(content="Update the summary with the conversation above")]
+    response = yield registry.get("chat"), prompt
+    token_usage.record("summarize_history", count_tokens(prompt), response)
+
+    return {"summary": response.content,
+            "messages": [RemoveMessage(id=message.id) for message in older]}
+
+def quick_reply_steps(state: AgentState, config: RunnableConfig, store: BaseStore):
+
+    """Lightweight path for messages the pre-router skips: no memory lookup and no tools."""
+
+    if not PREROUTER_CONFIG["reply"]:
+        return {}
+
+    prompt = build_history(state)
+    response = yield registry.get("chat"), prompt
+    token_usage.record("quick_reply", count_tokens(prompt), response)
+
+    return {"messages": [response]}
+
+# The nodes as plain functions, with sync model calls
+@instrument_node
+def task_mAIstro(state: AgentState, config: RunnableConfig, store: BaseStore):
+    """Load memories from the store and use them to personalize the chatbot's response."""
+    return run_steps(task_mAIstro_steps(state, config, store))
+
+@instrument_node
+def update_profile(state: AgentState, config: RunnableConfig, store: BaseStore):
+    """Reflect on the chat history and update the profile."""
+    return run_steps(update_profile_steps(state, config, store))
+
+@instrument_node
+def update_todos(state: AgentState, config: RunnableConfig, store: BaseStore):
+    """Reflect on the chat history and update the todo list."""
+    return run_steps(update_todos_steps(state, config, store))
+
+@instrument_node
+def update_instructions(state: AgentState, config: RunnableConfig, store: BaseStore):
+    """Reflect on the chat history and update the instructions."""
+    return run_steps(update_instructions_steps(state, config, store))
+
+@instrument_node
+def summarize_history(state: AgentState, config: RunnableConfig, store: BaseStore):
+    """Fold the turns that no longer fit the context budget into the rolling summary."""
+    return run_steps(summarize_history_steps(state, config, store))
+
+@instrument_node
+def quick_reply(state: AgentState, config: RunnableConfig, store: BaseStore):
+    """Lightweight path for messages the pre-router skips: no memory lookup and no tools."""
+    return run_steps(quick_reply_steps(state, config, store))
@@ -0,0 +1,252 @@
+"""
+Local pre-router in front of task_mAIstro.
+
+Most lines of a chat export are chatter with nothing to remember, yet each one
+pays a full ``task_mAIstro`` call with ``UpdateMemory`` bound just so
+``route_message`` can return END. The pre-router scores the incoming message
+locally: memory cue patterns (todos, reminders, personal facts, preferences)
+always go to the LLM, everything else is scored by a hashed-feature logistic
+model trained on the routing decisions ``route_message`` logs. Messages the
+router is confident need no memory update take the ``quick_reply`` path.
+
+Every decision the LLM makes is compared with what the pre-router would have
+done, so precision/recall of the skip path are known before (``enabled`` off)
+and after it is switched on. A ``shadow_rate`` share of skips still goes to
+the LLM to keep measuring precision once enabled.
+"""
+import json
+import math
+import os
+import random
+import re
+import threading
+import zlib
+from array import array
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from config import PREROUTER_CONFIG
+
+# Phrases that signal something worth remembering; these always reach the LLM
+MEMORY_CUES = re.compile(
+    r"\b(?:remind(?:er)?|to-?do|to do list|add (?:it|this|that)|schedule|book(?:ing)?|buy|"
+    r"need to|have to|plan(?:ning)? to|don'?t forget|remember|deadline|due|"
+    r"my name|call me|i live|i work|i'?m from|i am from|my (?:wife|husband|son|daughter|friend|job)|"
+    r"prefer|instructions?|whenever you)\b",
+    re.IGNORECASE,
+)
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+
+def features(text: str, n_features: int) -> List[int]:
+    """Hashed unigram and bigram indices of ``text`` (stable across processes)."""
+    tokens = _TOKEN.findall(text.lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return [zlib.crc32(gram.encode("utf8")) % n_features for gram in grams]
+
+
+def _sigmoid(z: float) -> float:
+    if z < -35:
+        return 0.0
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+class HashedLogisticModel:
+    """Logistic regression over hashed n-gram features; predicts P(memory update)."""
+
+    def __init__(self, n_features: int = 2 ** 18):
+        self.n_features = n_features
+        self.weights = array("d", bytes(8 * n_features))
+        self.bias = 0.0
+
+    def predict_proba(self, text: str) -> float:
+        indices = features(text, self.n_features)
+        return _sigmoid(self.bias + sum(self.weights[i] for i in indices))
+
+    def fit(self,
+            samples: Sequence[Tuple[str, bool]],
+            epochs: int = 5,
+            learning_rate: float = 0.5,
+            l2: float = 1e-6,
+            seed: int = 0) -> "HashedLogisticModel":
+        """Plain SGD over ``(text, needs_update)`` samples."""
+        rng = random.Random(seed)
+        encoded = [(features(text, self.n_features), 1.0 if label else 0.0) for text, label in samples]
+        for _ in range(epochs):
+            rng.shuffle(encoded)
+            for indices, label in encoded:
+                error = _sigmoid(self.bias + sum(self.weights[i] for i in indices)) - label
+                step = learning_rate * error / max(len(indices), 1)
+                for i in indices:
+                    self.weights[i] -= step + learning_rate * l2 * self.weights[i]
+                self.bias -= learning_rate * error
+        return self
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        nonzero = {i: w for i, w in enumerate(self.weights) if w}
+        with open(path, "w", encoding="utf8") as f:
+            json.dump({"n_features": self.n_features, "bias": self.bias, "weights": nonzero}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "HashedLogisticModel":
+        with open(path, encoding="utf8") as f:
+            data = json.load(f)
+        model = cls(data["n_features"])
+        model.bias = data["bias"]
+        for i, w in data["weights"].items():
+            model.weights[int(i)] = w
+        return model
+
+
+class PreRouteDecision(NamedTuple):
+    skip: bool
+    score: float  # estimated probability that the message needs a memory update
+    reason: str  # "cue", "model" or "no_model"
+
+
+class PreRouter:
+    """Decides which messages can skip task_mAIstro and tracks how often it agrees with the LLM.
+
+    ``threshold`` is the confidence required to skip: a message skips when
+    ``1 - score >= threshold``. Without a trained model nothing is skipped:
+    the decisions are still observed, so the routing log fills up for training.
+
+    Once enabled, only the ``shadow_rate`` share of would-be skips reaches the
+    LLM router, so ``observe`` counts each of them ``1 / shadow_rate`` times;
+    ``tp`` and ``fp`` are then estimates of what every skip would have scored.
+    """
+
+    def __init__(self,
+                 model: Optional[HashedLogisticModel] = None,
+                 threshold: float = 0.9,
+                 enabled: bool = False,
+                 shadow_rate: float = 0.0,
+                 log_path: Optional[str] = None,
+                 seed: Optional[int] = None):
+        self.model = model
+        self.threshold = threshold
+        self.enabled = enabled
+        self.shadow_rate = shadow_rate
+        self.log_path = log_path
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {"routed": 0, "skipped": 0, "shadowed": 0, "tp": 0, "fp": 0, "fn": 0, "tn": 0}
+
+    def decide(self, text: str) -> PreRouteDecision:
+        if MEMORY_CUES.search(text):
+            return PreRouteDecision(False, 1.0, "cue")
+        if self.model is None:
+            return PreRouteDecision(False, 0.0, "no_model")
+        score = self.model.predict_proba(text)
+        return PreRouteDecision(1.0 - score >= self.threshold, score, "model")
+
+    def should_skip(self, text: str) -> bool:
+        """Whether this message takes the quick path; always False unless enabled."""
+        decision = self.decide(text)
+        with self._lock:
+            self.counts["routed"] += 1
+            if not (self.enabled and decision.skip):
+                return False
+            if self.shadow_rate and self._rng.random() < self.shadow_rate:
+                self.counts["shadowed"] += 1
+                return False
+            self.counts["skipped"] += 1
+            return True
+
+    def observe(self, text: str, needs_update: bool) -> None:
+        """Record the LLM router's decision for ``text`` and score our own against it."""
+        skip = self.decide(text).skip
+        key = ("fp" if needs_update else "tp") if skip else ("tn" if needs_update else "fn")
+        # Skips only reach the LLM router when shadowed; weight them to stand for the unshadowed ones
+        weight = 1 / self.shadow_rate if skip and self.enabled and self.shadow_rate else 1
+        with self._lock:
+            self.counts[key] += weight
+            if self.log_path:
+                directory = os.path.dirname(self.log_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.log_path, "a", encoding="utf8") as f:
+                    f.write(json.dumps({"text": text, "update": needs_update}) + "\n")
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus precision/recall of the skip path against the LLM router.
+
+        Precision: share of would-be skips the LLM also sent to END. Recall:
+        share of the LLM's END decisions the pre-router would have skipped.
+        """
+        with self._lock:
+            counts = dict(self.counts)
+        return {**counts, **_precision_recall(counts["tp"], counts["fp"], counts["fn"])}
+
+
+def _precision_recall(tp: int, fp: int, fn: int) -> Dict[str, Optional[float]]:
+    return {
+        "precision": tp / (tp + fp) if tp + fp else None,
+        "recall": tp / (tp + fn) if tp + fn else None
+    }
+
+
+def read_decisions(path: str) -> List[Tuple[str, bool]]:
+    """``(text, needs_update)`` samples from a routing log written by ``observe``."""
+    with open(path, encoding="utf8") as f:
+        return [(record["text"], record["update"]) for record in map(json.loads, filter(str.strip, f))]
+
+
+def evaluate(router: PreRouter,
+             samples: Iterable[Tuple[str, bool]],
+             thresholds: Sequence[float] = (0.5, 0.7, 0.8, 0.9, 0.95, 0.99)) -> Dict[float, Dict[str, Any]]:
+    """Precision, recall and skip rate of ``router`` on labelled samples, per threshold."""
+    scored = [(router.decide(text).score, needs_update) for text, needs_update in samples]
+    report = {}
+    for threshold in thresholds:
+        tp = fp = fn = 0
+        for score, needs_update in scored:
+            skip = 1.0 - score >= threshold
+            tp += skip and not needs_update
+            fp += skip and needs_update
+            fn += not skip and not needs_update
+        report[threshold] = {
+            **_precision_recall(tp, fp, fn),
+            "skip_rate": (tp + fp) / len(scored) if scored else 0.0
+        }
+    return report
+
+
+def create_prerouter(config: Optional[Dict[str, Any]] = None) -> PreRouter:
+    """Build the pre-router described by ``config`` (PREROUTER_CONFIG by default)."""
+    config = {**PREROUTER_CONFIG, **(config or {})}
+    model_path = config["model_path"]
+    model = HashedLogisticModel.load(model_path) if model_path and os.path.exists(model_path) else None
+    return PreRouter(
+        model=model,
+        threshold=config["threshold"],
+        enabled=config["enabled"],
+        shadow_rate=config["shadow_rate"],
+        log_path=config["log_path"] if config["collect"] else None
+    )
+
+
+def main(argv=None):
+    """Train the model from the routing log and print a threshold sweep on a holdout."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Train the local pre-router from logged routing decisions")
+    parser.add_argument("--log", default=PREROUTER_CONFIG["log_path"])
+    parser.add_argument("--model", default=PREROUTER_CONFIG["model_path"])
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--holdout", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    samples = read_decisions(args.log)
+    random.Random(0).shuffle(samples)
+    cut = int(len(samples) * (1 - args.holdout))
+    model = HashedLogisticModel().fit(samples[:cut], epochs=args.epochs)
+    model.save(args.model)
+    for threshold, metrics in evaluate(PreRouter(model), samples[cut:]).items():
+        print(json.dumps({"threshold": threshold, **metrics}))
+
+
+if __name__ == "__main__":
+    main()
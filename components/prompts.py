@@ -1,3 +1,24 @@
+from string import Formatter
+
+
+class PromptTemplate:
+    """A ``str.format`` template parsed once at import.
+
+    ``prefix`` is the text before the first field: it is the same for every
+    user, so templates keep their per-user fields at the end and providers
+    can reuse the cached prefix across calls.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        self._parts = [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+        self.fields = tuple(field for _, field in self._parts if field is not None)
+        self.prefix = self._parts[0][0] if self._parts else ""
+
+    def format(self, **values) -> str:
+        return "".join(literal + ("" if field is None else str(values[field])) for literal, field in self._parts)
+
+
 # Chatbot instruction for choosing what to update and what tools to call 
 MODEL_SYSTEM_MESSAGE = """You are a helpful chatbot. 
 
@@ -8,21 +29,6 @@ You have a long term memory which keeps track of three things:
 2. The user's ToDo list
 3. General instructions for updating the ToDo list
 
-Here is the current User Profile (may be empty if no information has been collected yet):
-<user_profile>
-{user_profile}
-</user_profile>
-
-Here is the current ToDo List (may be empty if no tasks have been added yet):
-<todo>
-{todo}
-</todo>
-
-Here are the current user-specified preferences for updating the ToDo list (may be empty if no preferences have been specified yet):
-<instructions>
-{instructions}
-</instructions>
-
 Here are your instructions for reasoning about the user's messages:
 
 1. Reason carefully about the user's messages as presented below. 
@@ -39,7 +45,22 @@ Here are your instructions for reasoning about the user's messages:
 
 4. Err on the side of updating the todo list. No need to ask for explicit permission.
 
-5. Respond naturally to user user after a tool call was made to save memories, or if no tool call was made."""
+5. Respond naturally to user user after a tool call was made to save memories, or if no tool call was made.
+
+Here is the current User Profile (may be empty if no information has been collected yet):
+<user_profile>
+{user_profile}
+</user_profile>
+
+Here is the current ToDo List (may be empty if no tasks have been added yet):
+<todo>
+{todo}
+</todo>
+
+Here are the current user-specified preferences for updating the ToDo list (may be empty if no preferences have been specified yet):
+<instructions>
+{instructions}
+</instructions>"""
 
 # Trustcall instruction
 TRUSTCALL_INSTRUCTION = """Reflect on following interaction. 
@@ -62,3 +83,22 @@ Your current instructions are:
 <current_instructions>
 {current_instructions}
 </current_instructions>"""
+
+# Instructions for folding old turns into the rolling conversation summary
+SUMMARY_INSTRUCTION = """Reflect on the following interaction.
+
+Extend the running summary of this conversation with anything new it contains. Keep facts, tasks and user preferences; drop small talk.
+
+Answer with the updated summary only.
+
+The current summary is:
+
+<summary>
+{summary}
+</summary>"""
+
+# Compiled once; user data only appears after each template's static prefix
+MODEL_SYSTEM_TEMPLATE = PromptTemplate(MODEL_SYSTEM_MESSAGE)
+TRUSTCALL_TEMPLATE = PromptTemplate(TRUSTCALL_INSTRUCTION)
+CREATE_INSTRUCTIONS_TEMPLATE = PromptTemplate(CREATE_INSTRUCTIONS)
+SUMMARY_TEMPLATE = PromptTemplate(SUMMARY_INSTRUCTION)
@@ -0,0 +1,145 @@
+"""
+Shared registry of chat models and trustcall extractors.
+
+Each component is built once, on first use, from a registered factory, and
+every model shares one pooled HTTP client. Nodes look components up by name;
+per-request listeners such as ``Spy`` are attached with ``with_listeners``,
+which only wraps the shared runnable instead of rebuilding it.
+"""
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+from components.cls import Memory, Profile, ToDo
+from components.helper import Spy
+from config import APP_CONFIG
+
+# Connection pool shared by every model client
+HTTP_POOL_LIMITS = {"max_connections": 100, "max_keepalive_connections": 20}
+
+
+class ModelRegistry:
+    """Lazily builds named components once and shares them across nodes."""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[["ModelRegistry"], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._overrides: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[["ModelRegistry"], Any]) -> None:
+        """Register ``factory(registry)`` as the builder for ``name``."""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """Return the shared component, building it on first use."""
+        if name in self._overrides:
+            return self._overrides[name]
+        if name in self._instances:
+            return self._instances[name]
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f"No component registered as {name!r}")
+                self._instances[name] = self._factories[name](self)
+            return self._instances[name]
+
+    def peek(self, name: str) -> Any:
+        """The component if it has been set or built, else None; never builds it."""
+        return self._overrides.get(name, self._instances.get(name))
+
+    def with_spy(self, name: str) -> Tuple[Any, Spy]:
+        """The shared component with a fresh ``Spy`` listening to this call only."""
+        spy = Spy()
+        return self.get(name).with_listeners(on_end=spy), spy
+
+    def set(self, name: str, instance: Any) -> None:
+        """Replace a component (e.g. with a fake model); dependents are rebuilt."""
+        with self._lock:
+            self._overrides[name] = instance
+            self._instances.clear()
+
+    def warmup(self, names=None) -> threading.Thread:
+        """Build components in a background thread so the first request finds them ready."""
+        names = list(names or self._factories)
+
+        def _build():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception:
+                    # The request that needs it will raise the real error
+                    pass
+
+        thread = threading.Thread(target=_build, daemon=True, name="registry-warmup")
+        thread.start()
+        return thread
+
+    def reset(self) -> None:
+        """Drop overrides and built components."""
+        with self._lock:
+            self._overrides.clear()
+            self._instances.clear()
+
+
+def _scheduler(registry: ModelRegistry):
+    from components.scheduler import create_scheduler
+    return create_scheduler()
+
+
+def _http_clients(registry: ModelRegistry):
+    import httpx
+    from components.scheduler import AsyncScheduledTransport, ScheduledTransport
+    limits = httpx.Limits(**HTTP_POOL_LIMITS)
+    timeout = httpx.Timeout(APP_CONFIG["timeout"])
+    scheduler = registry.get("scheduler")
+    return (
+        httpx.Client(timeout=timeout,
+                     transport=ScheduledTransport(httpx.HTTPTransport(limits=limits), scheduler)),
+        httpx.AsyncClient(timeout=timeout,
+                          transport=AsyncScheduledTransport(httpx.AsyncHTTPTransport(limits=limits), scheduler))
+    )
+
+
+def _chat_model(registry: ModelRegistry):
+    from langchain_openai import ChatOpenAI
+    from components.metrics import ModelMetricsCallback
+    http_client, http_async_client = registry.get("http_clients")
+    # Retries happen per node (components.scheduler.node_retry_policy), not in the SDK
+    return ChatOpenAI(model="gpt-4o", temperature=0, cache=registry.get("llm_cache"),
+                      timeout=APP_CONFIG["timeout"], max_retries=0, callbacks=[ModelMetricsCallback()],
+                      http_client=http_client, http_async_client=http_async_client)
+
+
+def _response_cache(registry: ModelRegistry):
+    from components.llm_cache import create_response_cache
+    return create_response_cache()
+
+
+def _prerouter(registry: ModelRegistry):
+    from components.prerouter import create_prerouter
+    return create_prerouter()
+
+
+def _extractor(tool, enable_inserts: bool):
+    def factory(registry: ModelRegistry):
+        from trustcall import create_extractor
+        return create_extractor(
+            registry.get("chat"),
+            tools=[tool],
+            tool_choice=tool.__name__,
+            enable_inserts=enable_inserts,
+        )
+    return factory
+
+
+registry = ModelRegistry()
+registry.register("scheduler", _scheduler)
+registry.register("http_clients", _http_clients)
+registry.register("llm_cache", _response_cache)
+registry.register("chat", _chat_model)
+registry.register("prerouter", _prerouter)
+registry.register("memory_extractor", _extractor(Memory, enable_inserts=True))
+registry.register("profile_extractor", _extractor(Profile, enable_inserts=False))
+registry.register("todo_extractor", _extractor(ToDo, enable_inserts=True))
@@ -0,0 +1,353 @@
+"""
+Client-side scheduling of model and extractor calls.
+
+Every chat model and trustcall extractor shares the registry's pooled HTTP
+client, so scheduling happens in its transport: each provider request first
+takes a slot from an AIMD concurrency limit, then a request and a token from
+per-minute token buckets. A 429 or a timeout halves the concurrency limit
+(at most once per cooldown) and, with a ``Retry-After``, pauses new requests;
+every success grows the limit again by about one slot per window, server
+errors leave it as it is. The slot is held until the response body is
+closed, so streamed completions count against the limit while they stream.
+
+Failed calls are not retried in the transport. Nodes are retried as a whole
+by LangGraph with ``node_retry_policy()``, with jittered exponential backoff
+from APP_CONFIG's ``retry_delay`` for up to ``max_retries`` retries.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from langgraph.types import RetryPolicy
+
+from config import APP_CONFIG
+
+# Status codes worth another attempt
+RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504)
+
+# Provider SDK errors (matched by name so the SDK is never imported here)
+_RETRYABLE_ERRORS = {"APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError"}
+
+
+class TokenBucket:
+    """Token bucket refilled at ``rate_per_minute``, holding at most one minute's worth.
+
+    ``reserve`` never blocks: it takes the tokens, possibly into debt, and
+    returns how long the caller must wait before using them. Reservations are
+    therefore served in arrival order.
+    """
+
+    def __init__(self, rate_per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(rate_per_minute)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        with self._lock:
+            now = self._clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.tokens -= amount
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class AIMDLimiter:
+    """Concurrency limit with additive increase and multiplicative decrease."""
+
+    def __init__(self,
+                 initial: int,
+                 minimum: int = 1,
+                 maximum: int = 64,
+                 decrease: float = 0.5,
+                 cooldown: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.cooldown = cooldown  # one back-off per burst of failures
+        self.in_flight = 0
+        self._clock = clock
+        self._last_decrease = float("-inf")
+        self._cond = threading.Condition()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    async def aacquire(self) -> None:
+        """Wait without blocking the loop; ``release`` wakes the waiter from any thread."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            try:
+                await waiter
+            finally:
+                with self._cond:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
+
+    def release(self, outcome: str = "ok") -> None:
+        """``outcome`` is "ok" (grow the limit), "throttled" (shrink it) or "error" (keep it)."""
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == "throttled":
+                now = self._clock()
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._last_decrease = now
+            elif outcome == "ok":
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+            # Like notify_all, every async waiter checks again; a cancelled one cannot swallow the wakeup
+            waiters, self._waiters = self._waiters, []
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:  # the waiter's loop is closed
+                pass
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class CallScheduler:
+    """Rate and concurrency limits shared by every model call."""
+
+    def __init__(self,
+                 requests_per_minute: float,
+                 tokens_per_minute: float,
+                 concurrency: int,
+                 max_concurrency: int,
+                 clock: Callable[[], float] = time.monotonic):
+        self.requests = TokenBucket(requests_per_minute, clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock)
+        self.limiter = AIMDLimiter(concurrency, maximum=max_concurrency, clock=clock)
+        self._clock = clock
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.counts = {"calls": 0, "throttled": 0, "errors": 0, "waited": 0.0}
+
+    def _delay(self, tokens: int) -> float:
+        delay = max(self.requests.reserve(1), self.tokens.reserve(tokens),
+                    self._paused_until - self._clock())
+        with self._lock:
+            self.counts["calls"] += 1
+            self.counts["waited"] += max(delay, 0.0)
+        return delay
+
+    def acquire(self, tokens: int) -> None:
+        self.limiter.acquire()
+        try:
+            delay = self._delay(tokens)
+            if delay > 0:
+                time.sleep(delay)
+        except BaseException:
+            # No request was sent, so hand the slot back without adapting the limit
+            self.limiter.release("error")
+            raise
+
+    async def aacquire(self, tokens: int) -> None:
+        await self.limiter.aacquire()
+        try:
+            delay = self._delay(tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        except BaseException:
+            # Cancelled while waiting for the quota: no request was sent
+            self.limiter.release("error")
+            raise
+
+    def release(self, outcome: str, retry_after: Optional[float] = None) -> None:
+        """``outcome`` is "ok", "throttled" (429 or timeout) or "error"."""
+        with self._lock:
+            if outcome == "throttled":
+                self.counts["throttled"] += 1
+                if retry_after:
+                    self._paused_until = max(self._paused_until, self._clock() + retry_after)
+            elif outcome == "error":
+                self.counts["errors"] += 1
+        self.limiter.release(outcome)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counts, "concurrency_limit": int(self.limiter.limit),
+                    "in_flight": self.limiter.in_flight}
+
+
+def estimate_tokens(request: httpx.Request) -> int:
+    """Rough prompt size of a provider request, from its JSON body (~4 bytes per token)."""
+    return max(1, len(request.content) // 4)
+
+
+def retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _outcome(response: httpx.Response) -> str:
+    if response.status_code == 429:
+        return "throttled"
+    return "error" if response.status_code >= 500 else "ok"
+
+
+class _SlotRelease:
+    """Gives a response's scheduler slot back, once, when its body is closed.
+
+    A timeout while the body is read counts as throttling.
+    """
+
+    def __init__(self, stream, scheduler: CallScheduler, outcome: str, wait: Optional[float]):
+        self.stream = stream
+        self.scheduler = scheduler
+        self.outcome = outcome
+        self.wait = wait
+        self._released = False
+
+    def _release(self) -> None:
+        if not self._released:
+            self._released = True
+            self.scheduler.release(self.outcome, self.wait)
+
+
+class _ReleasingStream(_SlotRelease, httpx.SyncByteStream):
+    def __iter__(self):
+        try:
+            for chunk in self.stream:
+                yield chunk
+        except httpx.TimeoutException:
+            self.outcome = "throttled"
+            raise
+
+    def close(self) -> None:
+        try:
+            self.stream.close()
+        finally:
+            self._release()
+
+
+class _AsyncReleasingStream(_SlotRelease, httpx.AsyncByteStream):
+    async def __aiter__(self):
+        try:
+            async for chunk in self.stream:
+                yield chunk
+        except httpx.TimeoutException:
+            self.outcome = "throttled"
+            raise
+
+    async def aclose(self) -> None:
+        try:
+            await self.stream.aclose()
+        finally:
+            self._release()
+
+
+class ScheduledTransport(httpx.BaseTransport):
+    """httpx transport that runs every request through a CallScheduler."""
+
+    def __init__(self, transport: httpx.BaseTransport, scheduler: CallScheduler):
+        self.transport = transport
+        self.scheduler = scheduler
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.scheduler.acquire(estimate_tokens(request))
+        try:
+            response = self.transport.handle_request(request)
+        except httpx.TimeoutException:
+            self.scheduler.release("throttled")
+            raise
+        except BaseException:
+            self.scheduler.release("error")
+            raise
+        if isinstance(response.stream, httpx.ByteStream):  # body already in memory
+            self.scheduler.release(_outcome(response), retry_after(response))
+        else:
+            response.stream = _ReleasingStream(response.stream, self.scheduler, _outcome(response),
+                                               retry_after(response))
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncScheduledTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of ScheduledTransport, sharing the same scheduler."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, scheduler: CallScheduler):
+        self.transport = transport
+        self.scheduler = scheduler
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self.scheduler.aacquire(estimate_tokens(request))
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.TimeoutException:
+            self.scheduler.release("throttled")
+            raise
+        except BaseException:
+            self.scheduler.release("error")
+            raise
+        if isinstance(response.stream, httpx.ByteStream):  # body already in memory
+            self.scheduler.release(_outcome(response), retry_after(response))
+        else:
+            response.stream = _AsyncReleasingStream(response.stream, self.scheduler, _outcome(response),
+                                                    retry_after(response))
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def is_transient(exc: Exception) -> bool:
+    """Whether a failed node is worth retrying: throttling, timeouts and server errors."""
+    if isinstance(exc, (httpx.TimeoutException, httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in _RETRYABLE_ERRORS for cls in type(exc).__mro__):
+        return True
+    return getattr(exc, "status_code", None) in RETRYABLE_STATUS
+
+
+def node_retry_policy(config: Optional[Dict[str, Any]] = None) -> RetryPolicy:
+    """Jittered exponential backoff for graph nodes, from APP_CONFIG."""
+    config = {**APP_CONFIG, **(config or {})}
+    return RetryPolicy(
+        initial_interval=config["retry_delay"],
+        max_attempts=config["max_retries"] + 1,
+        jitter=True,
+        retry_on=is_transient
+    )
+
+
+def create_scheduler(config: Optional[Dict[str, Any]] = None) -> CallScheduler:
+    """Build the scheduler described by ``config`` (APP_CONFIG by default)."""
+    config = {**APP_CONFIG, **(config or {})}
+    return CallScheduler(
+        requests_per_minute=config["requests_per_minute"],
+        tokens_per_minute=config["tokens_per_minute"],
+        concurrency=config["model_concurrency"],
+        max_concurrency=config["max_model_concurrency"]
+    )
@@ -0,0 +1,291 @@
+"""
+Asyncio HTTP service in front of a RecommendationSystem.
+
+A small HTTP/1.1 server on ``asyncio`` streams, so no web framework is needed
+and every connection is a coroutine rather than a thread:
+
+    POST /messages                  {"user_id": "...", "message": "..."}
+    POST /messages/stream           same body; NDJSON reply tokens, chunked
+    GET  /users/{user_id}/memories
+    GET  /health
+    GET  /metrics                   Prometheus text
+
+Submissions run on ``graph.ainvoke``. Admission control happens before any
+work: at most ``max_pending`` submissions are admitted (running or waiting)
+and at most ``per_user_in_flight`` per user; anything beyond is answered
+``429`` with ``Retry-After`` straight away instead of queueing without bound.
+Admitted submissions of one user run one at a time, since they share a
+checkpoint thread, and at most ``max_concurrency`` graph runs are in flight.
+
+Streamed submissions answer with one ``{"token": ...}`` line per reply token
+and a last line with the status and latencies, sent as soon as the reply
+ends. Their memory updates finish after the response, still holding the
+submission's admission slot and user turn.
+"""
+import asyncio
+import json
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import unquote
+
+from components.helper import reply_text
+from components.logger import LoggerMixin
+from components.metrics import HTTP_REQUESTS, metrics
+from components.streaming import ReplyStream
+from config import SERVICE_CONFIG
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+            429: "Too Many Requests", 500: "Internal Server Error", 504: "Gateway Timeout"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class AdmissionController:
+    """Counts admitted submissions globally and per user, refusing those over the limits."""
+
+    def __init__(self, max_pending: int, per_user: int):
+        self.max_pending = max_pending
+        self.per_user = per_user
+        self.pending = 0
+        self.by_user: Dict[str, int] = defaultdict(int)
+        self.shed = 0
+
+    def admit(self, user_id: str) -> None:
+        if self.pending >= self.max_pending:
+            self.shed += 1
+            raise HTTPError(429, "service saturated", {"Retry-After": "1"})
+        if self.by_user[user_id] >= self.per_user:
+            self.shed += 1
+            raise HTTPError(429, "too many requests in flight for this user", {"Retry-After": "1"})
+        self.pending += 1
+        self.by_user[user_id] += 1
+
+    def release(self, user_id: str) -> None:
+        self.pending -= 1
+        self.by_user[user_id] -= 1
+        if not self.by_user[user_id]:
+            del self.by_user[user_id]
+
+    def stats(self) -> Dict[str, int]:
+        return {"pending": self.pending, "users": len(self.by_user), "shed": self.shed,
+                "max_pending": self.max_pending}
+
+
+class ChatService(LoggerMixin):
+    """HTTP front end for message submission and memory lookups."""
+
+    def __init__(self, system, config: Optional[Dict[str, Any]] = None):
+        super().__init__()
+        self.system = system
+        self.config = {**SERVICE_CONFIG, **(config or {})}
+        self.admission = AdmissionController(self.config["max_pending"], self.config["per_user_in_flight"])
+        self._slots = asyncio.Semaphore(self.config["max_concurrency"])
+        self._user_locks: Dict[str, asyncio.Lock] = {}
+        self._server: Optional[asyncio.base_events.Server] = None
+        self.port: Optional[int] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_connection, self.config["host"], self.config["port"])
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.log_event("service_started", {"host": self.config["host"], "port": self.port})
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def submit(self, user_id: str, texts) -> Dict[str, Any]:
+        """Admit, queue and run one submission; raises HTTPError when it is shed or times out."""
+        self.admission.admit(user_id)
+        task = asyncio.create_task(self._run(user_id, texts))
+        try:
+            # The run outlives a timeout: it holds its admission slot until the graph finishes
+            return await asyncio.wait_for(asyncio.shield(task), self.config["request_timeout"])
+        except asyncio.TimeoutError:
+            raise HTTPError(504, "timed out waiting for the reply")
+
+    async def _run(self, user_id: str, texts) -> Dict[str, Any]:
+        lock = self._user_locks.setdefault(user_id, asyncio.Lock())
+        try:
+            async with lock, self._slots:
+                return await self.system.arespond(user_id, texts)
+        finally:
+            self.admission.release(user_id)
+            if user_id not in self.admission.by_user:
+                self._user_locks.pop(user_id, None)
+
+    async def open_stream(self, user_id: str, texts) -> ReplyStream:
+        """Admit one submission and start streaming its reply once it is its user's turn."""
+        self.admission.admit(user_id)
+        opened = asyncio.get_running_loop().create_future()
+        asyncio.create_task(self._run_stream(user_id, texts, opened))
+        try:
+            return await asyncio.wait_for(asyncio.shield(opened), self.config["request_timeout"])
+        except asyncio.TimeoutError:
+            raise HTTPError(504, "timed out waiting for the reply")
+
+    async def _run_stream(self, user_id: str, texts, opened: asyncio.Future) -> None:
+        lock = self._user_locks.setdefault(user_id, asyncio.Lock())
+        try:
+            async with lock, self._slots:
+                stream = self.system.astream_reply(user_id, texts)
+                opened.set_result(stream)
+                try:
+                    await stream.finished()
+                except Exception:
+                    pass  # logged and counted by the stream
+        except Exception as e:
+            if not opened.done():
+                opened.set_exception(e)
+        finally:
+            self.admission.release(user_id)
+            if user_id not in self.admission.by_user:
+                self._user_locks.pop(user_id, None)
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[str, int, Any]:
+        """Route one request; returns the route name, status and JSON payload (or text for /metrics)."""
+        parts = [part for part in path.split("?", 1)[0].split("/") if part]
+        if parts == ["messages", "stream"]:
+            user_id, texts = self._submission(method, body)
+            return "messages_stream", 200, await self.open_stream(user_id, texts)
+        if parts == ["messages"]:
+            user_id, texts = self._submission(method, body)
+            result = await self.submit(user_id, texts)
+            if result["status"] == "error":
+                return "messages", 500, {"user_id": user_id, "status": "error", "error": result["error"]}
+            return "messages", 200, {"user_id": user_id, "status": "success",
+                                     "reply": reply_text(result["result"]["messages"])}
+        if len(parts) == 3 and parts[0] == "users" and parts[2] == "memories":
+            if method != "GET":
+                raise HTTPError(405, "use GET")
+            memories = await asyncio.get_running_loop().run_in_executor(
+                None, self.system.get_user_memories, unquote(parts[1]))
+            return "memories", 200, {memory_type: [item.value for item in items]
+                                     for memory_type, items in memories.items()}
+        if parts == ["health"]:
+            return "health", 200, {"status": "ok", **self.admission.stats()}
+        if parts == ["metrics"]:
+            return "metrics", 200, metrics.render_prometheus()
+        raise HTTPError(404, "no such route")
+
+    @staticmethod
+    def _submission(method: str, body: bytes) -> Tuple[str, list]:
+        if method != "POST":
+            raise HTTPError(405, "use POST")
+        try:
+            request = json.loads(body or b"{}")
+            user_id = request["user_id"]
+            texts = request["messages"] if "messages" in request else [request["message"]]
+        except (ValueError, KeyError, TypeError):
+            raise HTTPError(400, 'expected {"user_id": ..., "message": ...}')
+        if not isinstance(user_id, str) or not texts or not all(isinstance(t, str) for t in texts):
+            raise HTTPError(400, "user_id and message must be strings")
+        return user_id, texts
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self.config["keepalive_timeout"])
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except HTTPError as e:
+                    await self._respond(writer, e.status, {"error": str(e)}, e.headers, keep_alive=False)
+                    return
+                if request is None:
+                    return
+                method, path, headers, body = request
+                route, extra = "unknown", {}
+                try:
+                    route, status, payload = await self._dispatch(method, path, body)
+                except HTTPError as e:
+                    status, payload, extra = e.status, {"error": str(e)}, e.headers
+                except Exception as e:
+                    self.log_error("service_request_failed", str(e), {"path": path})
+                    status, payload = 500, {"error": "internal error"}
+                HTTP_REQUESTS.inc(route=route, status=status)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                if isinstance(payload, ReplyStream):
+                    await self._respond_stream(writer, payload, keep_alive)
+                else:
+                    await self._respond(writer, status, payload, extra, keep_alive)
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, path, _ = line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(400, "malformed request line")
+        headers = {}
+        while True:
+            header = await reader.readline()
+            if header in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = header.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(400, "bad content-length")
+        if length > self.config["max_body_bytes"]:
+            raise HTTPError(413, "request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), path, headers, body
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: Any,
+                       headers: Optional[Dict[str, str]] = None, keep_alive: bool = True) -> None:
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf8"), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload, default=str).encode("utf8"), "application/json"
+        head = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                f"Content-Type: {content_type}",
+                f"Content-Length: {len(body)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        head += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    @staticmethod
+    async def _respond_stream(writer: asyncio.StreamWriter, stream: ReplyStream, keep_alive: bool = True) -> None:
+        """Chunked NDJSON response: a line per reply token, then the status and latencies."""
+        def chunk(line: Dict[str, Any]) -> bytes:
+            data = json.dumps(line).encode("utf8") + b"\n"
+            return f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n"
+
+        head = ["HTTP/1.1 200 OK",
+                "Content-Type: application/x-ndjson",
+                "Transfer-Encoding: chunked",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+        try:
+            async for token in stream:
+                writer.write(chunk({"token": token}))
+                await writer.drain()
+            last = {"status": "success"}
+        except ConnectionError:
+            raise
+        except Exception as e:
+            last = {"status": "error", "error": str(e)}
+        last.update({"ttft_ms": None if stream.ttft is None else stream.ttft * 1000,
+                     "reply_ms": stream.reply_seconds * 1000})
+        writer.write(chunk(last) + b"0\r\n\r\n")
+        await writer.drain()
@@ -0,0 +1,230 @@
+"""
+Sharded multi-process execution of the recommendation graph.
+
+The coordinator reads the ingestion stream and hashes each ``user_id`` to one
+of N worker processes, so every user is always served by the same worker and
+their checkpoint thread is never touched by two processes. Each worker
+compiles its own graph, runs the chunks it receives with
+``aprocess_messages`` and sends back slim results; when the stream ends it
+sends its metrics and token totals, which the coordinator merges into its
+own ``metrics`` registry and ``token_usage``.
+
+Workers share the persistent store and checkpointer of the coordinator's
+MEMORY_CONFIG and CHECKPOINT_CONFIG, which are sent to them with their
+shard. The store must be sqlite: with ``in_memory`` every worker would keep
+a private store that is lost when it exits, so ``run`` refuses it. The
+provider quota of APP_CONFIG is split evenly between workers.
+
+The coordinator only talks to workers through queues. Locally they are
+``multiprocessing`` queues; to spread workers over hosts, pass a
+``queue_factory`` returning network-backed queues (for instance proxies from
+a ``multiprocessing.managers.BaseManager``), set ``start_workers=False`` and
+start ``run_worker`` for each shard on the remote hosts.
+"""
+import asyncio
+import itertools
+import multiprocessing
+import queue
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from components.data_loader import ChatMessage
+from components.helper import reply_text
+from components.logger import LoggerMixin
+from config import APP_CONFIG, CHECKPOINT_CONFIG, MEMORY_CONFIG, SHARDING_CONFIG
+
+
+def shard_for(user_id: str, shards: int) -> int:
+    """Stable shard of ``user_id``; unlike ``hash`` it is the same in every process."""
+    return zlib.crc32(user_id.encode("utf8")) % shards
+
+
+def _slim(result: Dict[str, Any]) -> Dict[str, Any]:
+    """A worker result without the graph state, which is large and not needed by the coordinator."""
+    slim = {key: value for key, value in result.items() if key not in ("result", "first_message")}
+    if "result" in result:
+        slim["reply"] = reply_text(result["result"]["messages"])
+    return slim
+
+
+async def _serve(shard: int, inbox, outbox, max_concurrency: Optional[int], coalesce: Optional[bool]) -> None:
+    from app import RecommendationSystem
+    from components.context_window import token_usage
+    from components.metrics import metrics
+    from components.registry import registry
+
+    system = RecommendationSystem(standalone=False)
+    loop = asyncio.get_running_loop()
+    while True:
+        chunk = await loop.run_in_executor(None, inbox.get)
+        if chunk is None:
+            break
+        chunk_id, items = chunk
+        seqs = {id(msg): seq for seq, msg in items}
+        try:
+            results = await system.aprocess_messages(messages=[msg for _, msg in items],
+                                                     max_concurrency=max_concurrency,
+                                                     coalesce=coalesce)
+        except Exception as e:
+            results = [{"user_id": msg.user_id, "status": "error", "messages_count": 1, "error": str(e),
+                        "first_message": msg} for _, msg in items]
+        # Each result is placed at the sequence number of its first message; coalesced
+        # bursts can close after later users' messages, so count positions would drift
+        slim = [{**_slim(result), "seq": seqs[id(result["first_message"])], "shard": shard} for result in results]
+        outbox.put(("results", shard, chunk_id, slim))
+    outbox.put(("done", shard, {
+        "metrics": metrics.dump(),
+        "token_usage": token_usage.snapshot(),
+        "scheduler": registry.get("scheduler").stats()
+    }))
+
+
+def run_worker(shard: int,
+               shards: int,
+               inbox,
+               outbox,
+               initializer: Optional[Callable[[], None]] = None,
+               max_concurrency: Optional[int] = None,
+               coalesce: Optional[bool] = None,
+               memory_config: Optional[Dict[str, Any]] = None,
+               checkpoint_config: Optional[Dict[str, Any]] = None) -> None:
+    """Serve one shard until a ``None`` arrives on ``inbox``, on the coordinator's store and checkpointer."""
+    for key in ("requests_per_minute", "tokens_per_minute"):
+        APP_CONFIG[key] = APP_CONFIG[key] / shards
+    MEMORY_CONFIG.update(memory_config or {})
+    CHECKPOINT_CONFIG.update(checkpoint_config or {})
+    if initializer is not None:
+        initializer()
+    asyncio.run(_serve(shard, inbox, outbox, max_concurrency, coalesce))
+
+
+class ShardedRunner(LoggerMixin):
+    """Coordinator that feeds user-sharded chunks to worker processes and merges what they return."""
+
+    def __init__(self,
+                 workers: Optional[int] = None,
+                 chunk_size: Optional[int] = None,
+                 queue_size: Optional[int] = None,
+                 start_method: Optional[str] = None,
+                 initializer: Optional[Callable[[], None]] = None,
+                 queue_factory: Optional[Callable[[int], Any]] = None,
+                 start_workers: bool = True):
+        super().__init__()
+        self.workers = workers or SHARDING_CONFIG["workers"]
+        self.chunk_size = chunk_size or SHARDING_CONFIG["chunk_size"]
+        self.queue_size = queue_size or SHARDING_CONFIG["queue_size"]
+        self.initializer = initializer  # runs first in every worker; must be picklable
+        self.start_workers = start_workers
+        self._context = multiprocessing.get_context(start_method or SHARDING_CONFIG["start_method"])
+        self._queue_factory = queue_factory or (lambda size: self._context.Queue(size))
+        self.worker_stats: Dict[int, Dict[str, Any]] = {}
+
+    def run(self,
+            messages: Iterable[ChatMessage],
+            max_concurrency: Optional[int] = None,
+            coalesce: Optional[bool] = None,
+            on_issue: Optional[Callable[[ChatMessage], None]] = None,
+            on_done: Optional[Callable[[ChatMessage], None]] = None) -> List[Dict[str, Any]]:
+        """Process ``messages`` on the workers; results come back in input order.
+
+        ``on_issue`` is called for every message as it is read and ``on_done``
+        once its chunk has been processed, so callers can track a resume offset.
+        """
+        from components.context_window import token_usage
+        from components.metrics import metrics
+
+        if MEMORY_CONFIG["store_type"] != "sqlite":
+            raise ValueError(f"Sharded runs need a store shared by the workers; "
+                             f"set MEMORY_CONFIG['store_type'] to 'sqlite', not {MEMORY_CONFIG['store_type']!r}")
+        inboxes = [self._queue_factory(self.queue_size) for _ in range(self.workers)]
+        outbox = self._queue_factory(0)
+        processes = []
+        if self.start_workers:
+            processes = [self._context.Process(target=run_worker, name=f"nexusmind-shard-{shard}", daemon=True,
+                                               args=(shard, self.workers, inboxes[shard], outbox, self.initializer,
+                                                     max_concurrency, coalesce, dict(MEMORY_CONFIG),
+                                                     dict(CHECKPOINT_CONFIG)))
+                         for shard in range(self.workers)]
+            for process in processes:
+                process.start()
+
+        results: List[Dict[str, Any]] = []
+        pending: Dict[int, List[Tuple[int, ChatMessage]]] = {}
+        done: set = set()
+        start = time.perf_counter()
+
+        def handle(message) -> None:
+            if message[0] == "results":
+                _, shard, chunk_id, chunk_results = message
+                results.extend(chunk_results)
+                for _, msg in pending.pop(chunk_id):
+                    if on_done is not None:
+                        on_done(msg)
+            else:
+                _, shard, stats = message
+                metrics.merge(stats["metrics"])
+                token_usage.merge(stats["token_usage"])
+                self.worker_stats[shard] = {"scheduler": stats["scheduler"]}
+                done.add(shard)
+
+        def drain(block: bool) -> None:
+            while True:
+                try:
+                    handle(outbox.get(timeout=1.0) if block else outbox.get_nowait())
+                    return
+                except queue.Empty:
+                    if not block:
+                        return
+                    lost = [p.name for p in processes if not p.is_alive() and p.exitcode]
+                    if lost:
+                        raise RuntimeError(f"sharded workers exited unexpectedly: {', '.join(lost)}")
+
+        def send(shard: int, chunk: List[Tuple[int, ChatMessage]]) -> None:
+            chunk_id = next(chunk_ids)
+            pending[chunk_id] = chunk
+            while True:
+                try:
+                    inboxes[shard].put((chunk_id, chunk), timeout=1.0)
+                    return
+                except queue.Full:
+                    # Keep results flowing while this shard's inbox is full
+                    drain(block=False)
+
+        chunk_ids = itertools.count()
+        buffers: List[List[Tuple[int, ChatMessage]]] = [[] for _ in range(self.workers)]
+        try:
+            for seq, msg in enumerate(messages):
+                if on_issue is not None:
+                    on_issue(msg)
+                shard = shard_for(msg.user_id, self.workers)
+                buffers[shard].append((seq, msg))
+                if len(buffers[shard]) >= self.chunk_size:
+                    send(shard, buffers[shard])
+                    buffers[shard] = []
+                drain(block=False)
+            for shard, buffer in enumerate(buffers):
+                if buffer:
+                    send(shard, buffer)
+            for inbox in inboxes:
+                inbox.put(None)
+            while len(done) < self.workers:
+                drain(block=True)
+        finally:
+            for process in processes:
+                process.join(timeout=5.0)
+                if process.is_alive():
+                    process.terminate()
+
+        results.sort(key=lambda result: result["seq"])
+        elapsed = time.perf_counter() - start
+        messages_count = sum(r["messages_count"] for r in results)
+        self.log_event("sharded_run", {
+            "workers": self.workers,
+            "messages_count": messages_count,
+            "errors": sum(1 for r in results if r["status"] == "error"),
+            "seconds": elapsed,
+            "throughput_msgs_per_s": messages_count / elapsed if elapsed else 0.0,
+            "workers_stats": self.worker_stats
+        })
+        return results
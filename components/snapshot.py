@@ -0,0 +1,321 @@
+"""
+Snapshot and restore of long-term memories and thread checkpoints.
+
+``InMemoryStore`` and ``MemorySaver`` lose everything on restart, and
+rebuilding them by replaying the chat history pays for every model call
+again. A snapshot writes both to one binary file of length-prefixed frames:
+
+    header   b"NXSNAP" + format version (u16)
+    frame    kind (u8), payload length (u32), msgpack payload
+    ...
+    end      kind 0 with the counts, so a truncated file is refused
+
+An items frame holds about ``frame_items`` items, grouped by namespace, with
+their timestamps. A checkpoints frame holds up to ``frame_items`` threads of
+a ``MemorySaver``: their checkpoints, channel blobs and pending writes, still
+serialized by the saver's serde, so they are copied as bytes rather than
+decoded. Other checkpointers (sqlite) already survive restarts and are left
+out.
+
+Frames are written as they are read, so the snapshot never holds a copy of
+the store. Restoring maps the file and decodes one frame at a time; into an
+``InMemoryStore`` the items are placed directly, other stores get batched
+puts. A restore adds to what is already there and replaces items and
+checkpoints with the same keys.
+
+The fast paths read and fill the dicts behind ``InMemoryStore`` and
+``MemorySaver``. They are only taken while those attributes exist; otherwise
+the store is read with ``list_namespaces``/``search`` and written with
+batched puts, and the saver is read with ``list`` and filled with ``put`` and
+``put_writes``. Both paths write and read the same frames.
+"""
+import gc
+import mmap
+import os
+import struct
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import ormsgpack
+from langgraph.checkpoint.base import WRITES_IDX_MAP, BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.store.base import BaseStore, Item
+from langgraph.store.memory import InMemoryStore
+
+from components.logger import LoggerMixin
+from components.metrics import MeteredStore
+from components.store_access import read_namespace, write_memories
+from config import SNAPSHOT_CONFIG
+
+MAGIC = b"NXSNAP"
+VERSION = 1
+_HEADER = struct.Struct("<6sH")
+_FRAME = struct.Struct("<BI")
+
+END, ITEMS, CHECKPOINTS = 0, 1, 2
+
+
+def _unwrap(store: BaseStore) -> BaseStore:
+    while isinstance(store, MeteredStore):
+        store = store.store
+    return store
+
+
+def _raw_store(store: BaseStore) -> bool:
+    """Whether ``store`` is an InMemoryStore whose item dict can be used directly."""
+    return isinstance(store, InMemoryStore) and isinstance(getattr(store, "_data", None), dict)
+
+
+def _raw_saver(saver: InMemorySaver) -> bool:
+    """Whether ``saver`` still keeps its checkpoints, blobs and writes in the dicts read below."""
+    return all(isinstance(getattr(saver, name, None), dict) for name in ("storage", "blobs", "writes"))
+
+
+def _namespaces(store: BaseStore) -> List[Tuple[str, ...]]:
+    if _raw_store(store):
+        return list(store._data)
+    namespaces: List[Tuple[str, ...]] = []
+    while True:
+        page = store.list_namespaces(limit=1000, offset=len(namespaces))
+        namespaces.extend(page)
+        if len(page) < 1000:
+            return namespaces
+
+
+def _items(store: BaseStore, namespace: Tuple[str, ...]) -> List[Item]:
+    if _raw_store(store):
+        return list(store._data.get(namespace, {}).values())
+    return read_namespace(store, namespace)
+
+
+def _thread_frames(saver: InMemorySaver) -> Iterator[list]:
+    """One ``[thread_id, checkpoints, blobs, writes]`` payload per thread, bytes as stored."""
+    if not _raw_saver(saver):
+        yield from _listed_thread_frames(saver)
+        return
+    blob_keys: Dict[str, list] = defaultdict(list)
+    for key in list(saver.blobs):
+        blob_keys[key[0]].append(key)
+    write_keys: Dict[str, list] = defaultdict(list)
+    for key in list(saver.writes):
+        write_keys[key[0]].append(key)
+    for thread_id in list(saver.storage):
+        checkpoints = [[ns, checkpoint_id, *checkpoint, *metadata, parent]
+                       for ns, saved in list(saver.storage[thread_id].items())
+                       for checkpoint_id, (checkpoint, metadata, parent) in list(saved.items())]
+        blobs = [[ns, channel, version, *saver.blobs[key]]
+                 for key in blob_keys.pop(thread_id, ()) for _, ns, channel, version in [key]]
+        writes = [[ns, checkpoint_id, task_id, idx, channel, *value, task_path]
+                  for key in write_keys.pop(thread_id, ()) for _, ns, checkpoint_id in [key]
+                  for (_, idx), (task_id, channel, value, task_path) in list(saver.writes[key].items())]
+        yield [thread_id, checkpoints, blobs, writes]
+
+
+def _listed_thread_frames(saver: InMemorySaver) -> Iterator[list]:
+    """The payloads of ``_thread_frames`` built from ``saver.list``, serialized again with its serde.
+
+    Only the thread ids are gathered up front; each thread is then listed on
+    its own, so one thread's checkpoints are held at a time.
+    """
+    thread_ids = dict.fromkeys(saved.config["configurable"]["thread_id"] for saved in saver.list(None))
+    for thread_id in thread_ids:
+        checkpoints, blobs, writes = [], {}, []
+        for saved in saver.list({"configurable": {"thread_id": thread_id}}):
+            configurable = saved.config["configurable"]
+            checkpoint_id, ns = configurable["checkpoint_id"], configurable.get("checkpoint_ns", "")
+            checkpoint = dict(saved.checkpoint)
+            values = checkpoint.pop("channel_values", {})
+            parent = saved.parent_config["configurable"]["checkpoint_id"] if saved.parent_config else None
+            checkpoints.append([ns, checkpoint_id, *saver.serde.dumps_typed(checkpoint),
+                                *saver.serde.dumps_typed(saved.metadata), parent])
+            for channel, version in checkpoint["channel_versions"].items():
+                if (ns, channel, version) not in blobs:
+                    blobs[(ns, channel, version)] = (saver.serde.dumps_typed(values[channel]) if channel in values
+                                                     else ("empty", b""))
+            positions: Dict[str, int] = defaultdict(int)
+            for task_id, channel, value in saved.pending_writes or ():
+                idx = WRITES_IDX_MAP.get(channel, positions[task_id])
+                positions[task_id] += 1
+                writes.append([ns, checkpoint_id, task_id, idx, channel, *saver.serde.dumps_typed(value), ""])
+        yield [thread_id, checkpoints, [[*key, *blob] for key, blob in blobs.items()], writes]
+
+
+def _restore_thread(saver: InMemorySaver, payload: list) -> int:
+    if not _raw_saver(saver):
+        return _put_thread(saver, payload)
+    thread_id, checkpoints, blobs, writes = payload
+    for ns, checkpoint_id, ctype, cbytes, mtype, mbytes, parent in checkpoints:
+        saver.storage[thread_id][ns][checkpoint_id] = ((ctype, cbytes), (mtype, mbytes), parent)
+    for ns, channel, version, btype, bbytes in blobs:
+        saver.blobs[(thread_id, ns, channel, version)] = (btype, bbytes)
+    for ns, checkpoint_id, task_id, idx, channel, wtype, wbytes, task_path in writes:
+        saver.writes[(thread_id, ns, checkpoint_id)][(task_id, idx)] = (task_id, channel, (wtype, wbytes), task_path)
+    return len(checkpoints)
+
+
+def _put_thread(saver: InMemorySaver, payload: list) -> int:
+    """``_restore_thread`` through ``put`` and ``put_writes``, decoding what the raw path copies."""
+    thread_id, checkpoints, blobs, writes = payload
+    values = {(ns, channel, version): (btype, bbytes) for ns, channel, version, btype, bbytes in blobs}
+    # Parents first, so each put finds the checkpoint it extends
+    for ns, checkpoint_id, ctype, cbytes, mtype, mbytes, parent in sorted(checkpoints, key=lambda row: row[1]):
+        checkpoint = saver.serde.loads_typed((ctype, cbytes))
+        versions = checkpoint["channel_versions"]
+        checkpoint["channel_values"] = {
+            channel: saver.serde.loads_typed(values[(ns, channel, version)])
+            for channel, version in versions.items()
+            if values.get((ns, channel, version), ("empty",))[0] != "empty"}
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": parent}}
+        saver.put(config, checkpoint, saver.serde.loads_typed((mtype, mbytes)), versions)
+    tasks: Dict[tuple, list] = defaultdict(list)
+    for ns, checkpoint_id, task_id, idx, channel, wtype, wbytes, task_path in writes:
+        tasks[(ns, checkpoint_id, task_id, task_path)].append((idx, channel, saver.serde.loads_typed((wtype, wbytes))))
+    for (ns, checkpoint_id, task_id, task_path), task_writes in tasks.items():
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint_id}}
+        # put_writes numbers regular writes by position; the special channels keep their fixed slots
+        ordered = sorted(task_writes, key=lambda write: (write[0] < 0, write[0]))
+        saver.put_writes(config, [(channel, value) for _, channel, value in ordered], task_id, task_path)
+    return len(checkpoints)
+
+
+class Snapshotter(LoggerMixin):
+    """Writes and loads snapshots of a store and a checkpointer."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        super().__init__()
+        self.config = {**SNAPSHOT_CONFIG, **(config or {})}
+
+    def write(self, path: str, store: BaseStore, checkpointer: Optional[BaseCheckpointSaver] = None) -> Dict[str, Any]:
+        """Stream ``store`` and an in-memory ``checkpointer`` to ``path``, replacing it atomically."""
+        started = time.perf_counter()
+        store = _unwrap(store)
+        stats = {"namespaces": 0, "items": 0, "threads": 0, "checkpoints": 0}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb", buffering=1 << 20) as f:
+            def frame(kind: int, payload: Any) -> None:
+                data = ormsgpack.packb(payload)
+                f.write(_FRAME.pack(kind, len(data)))
+                f.write(data)
+
+            f.write(_HEADER.pack(MAGIC, VERSION))
+            step = self.config["frame_items"]
+            groups, rows = [], 0
+            for namespace in _namespaces(store):
+                items = _items(store, namespace)
+                if not items:
+                    continue
+                stats["namespaces"] += 1
+                stats["items"] += len(items)
+                for start in range(0, len(items), step):
+                    chunk = items[start:start + step]
+                    groups.append([list(namespace), [[item.key, item.value, item.created_at, item.updated_at]
+                                                     for item in chunk]])
+                    rows += len(chunk)
+                    if rows >= step:
+                        frame(ITEMS, groups)
+                        groups, rows = [], 0
+            if groups:
+                frame(ITEMS, groups)
+            if isinstance(checkpointer, InMemorySaver):
+                threads = []
+                for payload in _thread_frames(checkpointer):
+                    stats["threads"] += 1
+                    stats["checkpoints"] += len(payload[1])
+                    threads.append(payload)
+                    if len(threads) >= step:
+                        frame(CHECKPOINTS, threads)
+                        threads = []
+                if threads:
+                    frame(CHECKPOINTS, threads)
+            elif checkpointer is not None:
+                self.log_event("snapshot_checkpoints_skipped", {"checkpointer": type(checkpointer).__name__})
+            frame(END, stats)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        stats.update({"bytes": os.path.getsize(path), "seconds": time.perf_counter() - started})
+        self.log_event("snapshot_written", {"path": path, **stats})
+        return stats
+
+    def load(self, path: str, store: BaseStore, checkpointer: Optional[BaseCheckpointSaver] = None) -> Dict[str, Any]:
+        """Restore the snapshot at ``path`` into ``store`` and an in-memory ``checkpointer``."""
+        started = time.perf_counter()
+        store = _unwrap(store)
+        stats = {"frames": 0, "items": 0, "threads": 0, "checkpoints": 0}
+        # Millions of new objects, none of them garbage: collections would only rescan them
+        collecting = gc.isenabled()
+        gc.disable()
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                frames = self._frames(view, path)
+                restore_items = self._item_loader(store)
+                for kind, payload in frames:
+                    stats["frames"] += 1
+                    if kind == ITEMS:
+                        for namespace, rows in payload:
+                            stats["items"] += restore_items(tuple(namespace), rows)
+                    elif kind == CHECKPOINTS and isinstance(checkpointer, InMemorySaver):
+                        for thread in payload:
+                            stats["threads"] += 1
+                            stats["checkpoints"] += _restore_thread(checkpointer, thread)
+            finally:
+                view.release()
+                if collecting:
+                    gc.enable()
+        stats["seconds"] = time.perf_counter() - started
+        self.log_event("snapshot_restored", {"path": path, **stats})
+        return stats
+
+    @staticmethod
+    def _frames(view: memoryview, path: str) -> Iterator[Tuple[int, Any]]:
+        """Check the header and the end frame, then decode the frames one at a time."""
+        if len(view) < _HEADER.size or _HEADER.unpack_from(view)[0] != MAGIC:
+            raise ValueError(f"{path} is not a snapshot")
+        version = _HEADER.unpack_from(view)[1]
+        if version != VERSION:
+            raise ValueError(f"{path} has snapshot format {version}, expected {VERSION}")
+        # Walk the frame headers first, so a truncated file is refused before anything is loaded
+        offsets, offset = [], _HEADER.size
+        while True:
+            if offset + _FRAME.size > len(view):
+                raise ValueError(f"{path} is truncated")
+            kind, length = _FRAME.unpack_from(view, offset)
+            offset += _FRAME.size
+            if offset + length > len(view):
+                raise ValueError(f"{path} is truncated")
+            if kind == END:
+                break
+            offsets.append((kind, offset, length))
+            offset += length
+
+        def decode() -> Iterator[Tuple[int, Any]]:
+            for kind, start, length in offsets:
+                yield kind, ormsgpack.unpackb(view[start:start + length])
+        return decode()
+
+    @staticmethod
+    def _item_loader(store: BaseStore):
+        """Function putting one frame of ``[key, value, created, updated]`` rows into ``store``."""
+        if _raw_store(store):
+            def place(namespace: Tuple[str, ...], rows: list) -> int:
+                items = store._data[namespace]
+                for key, value, created, updated in rows:
+                    # Item parses the ISO timestamps msgpack wrote for the datetimes
+                    items[key] = Item(value=value, key=key, namespace=namespace, created_at=created,
+                                      updated_at=updated)
+                return len(rows)
+            return place
+
+        def put(namespace: Tuple[str, ...], rows: list) -> int:
+            # Timestamps are set by the store; rows keep their order, so recency does too
+            write_memories(store, namespace, {key: value for key, value, _, _ in rows})
+            return len(rows)
+        return put
+
+
+snapshotter = Snapshotter()
@@ -0,0 +1,91 @@
+"""
+Batched access to the long-term memory store.
+
+Every helper here turns a group of reads or writes into a single
+``BaseStore.batch`` call, so a node costs one round trip for its reads and one
+for its writes regardless of how many namespaces or documents it touches.
+"""
+import json
+import uuid
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from langgraph.store.base import BaseStore, GetOp, Item, PutOp, SearchOp
+
+MEMORY_TYPES = ("profile", "todo", "instructions")
+SEARCH_LIMIT = 10  # BaseStore.search default, kept so prompts see the same items
+
+
+def _default_ttl(store: BaseStore) -> Optional[float]:
+    """TTL that ``store.put`` would apply when none is given."""
+    ttl_config = getattr(store, "ttl_config", None)
+    return ttl_config.get("default_ttl") if ttl_config else None
+
+
+def new_memory_key(namespace: tuple, value: Mapping[str, Any]) -> str:
+    """Deterministic key for a newly extracted memory.
+
+    Replaying the same export yields the same keys, so the prompts that quote
+    them (and the response cache entries keyed on those prompts) match.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, json.dumps([list(namespace), value], sort_keys=True)))
+
+
+def read_memories(store: BaseStore,
+                  user_id: str,
+                  memory_types: Sequence[str] = MEMORY_TYPES,
+                  limit: int = SEARCH_LIMIT) -> Dict[str, List[Item]]:
+    """Search several of a user's namespaces in one batch."""
+    results = store.batch([SearchOp((memory_type, user_id), limit=limit) for memory_type in memory_types])
+    return dict(zip(memory_types, results))
+
+
+def get_memories_for_users(store: BaseStore,
+                           user_ids: Iterable[str],
+                           memory_types: Sequence[str] = MEMORY_TYPES,
+                           limit: int = SEARCH_LIMIT) -> Dict[str, Dict[str, List[Item]]]:
+    """Search the namespaces of many users in one batch."""
+    user_ids = list(dict.fromkeys(user_ids))
+    ops = [SearchOp((memory_type, user_id), limit=limit)
+           for user_id in user_ids
+           for memory_type in memory_types]
+    results = iter(store.batch(ops))
+    return {user_id: {memory_type: next(results) for memory_type in memory_types}
+            for user_id in user_ids}
+
+
+def read_namespace(store: BaseStore, namespace: tuple, page_size: int = 100) -> List[Item]:
+    """Every item of ``namespace``, one batch per ``page_size`` items."""
+    items = []
+    while True:
+        page = store.batch([SearchOp(namespace, limit=page_size, offset=len(items))])[0]
+        items.extend(page)
+        if len(page) < page_size:
+            return items
+
+
+def get_memory(store: BaseStore, namespace: tuple, key: str) -> Optional[Item]:
+    """Fetch a single item; a batch of one, for symmetry with the other readers."""
+    return store.batch([GetOp(namespace, key)])[0]
+
+
+def write_memories(store: BaseStore, namespace: tuple, values: Mapping[str, Mapping[str, Any]]) -> None:
+    """Put every ``key -> value`` of ``values`` into ``namespace`` in one batch."""
+    if not values:
+        return
+    ttl = _default_ttl(store)
+    store.batch([PutOp(namespace, key, value, ttl=ttl) for key, value in values.items()])
+
+
+def move_memories(store: BaseStore,
+                  source: tuple,
+                  target: tuple,
+                  moved: Mapping[str, Mapping[str, Any]],
+                  updated: Optional[Mapping[str, Mapping[str, Any]]] = None) -> None:
+    """Move ``moved`` from ``source`` to ``target`` and put ``updated`` into ``source``, in one batch."""
+    updated = updated or {}
+    if not moved and not updated:
+        return
+    ttl = _default_ttl(store)
+    store.batch([PutOp(target, key, value, ttl=ttl) for key, value in moved.items()] +
+                [PutOp(source, key, None) for key in moved] +
+                [PutOp(source, key, value, ttl=ttl) for key, value in updated.items()])
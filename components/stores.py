@@ -0,0 +1,135 @@
+"""
+Long-term memory store backends selected by MEMORY_CONFIG.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from langgraph.store.base import BaseStore, Op, Result
+from langgraph.store.memory import InMemoryStore
+from langgraph.store.sqlite import SqliteStore
+
+from components.logger import memory_logger
+from config import MEMORY_CONFIG
+
+# Rows past the newest ``max_items`` of their namespace, newest by updated_at
+_OVER_LIMIT_SQL = """
+    SELECT rowid, prefix FROM (
+        SELECT rowid, prefix,
+               ROW_NUMBER() OVER (PARTITION BY prefix ORDER BY updated_at DESC, rowid DESC) AS rn
+        FROM store
+    ) WHERE rn > ?
+"""
+
+_EXPIRED_SQL = """
+    SELECT rowid, prefix FROM store
+    WHERE expires_at IS NOT NULL AND expires_at < CURRENT_TIMESTAMP
+"""
+
+
+class SqliteMemoryStore(SqliteStore):
+    """SQLite store with WAL journaling, TTL expiry and a per-namespace item cap.
+
+    Expired items and items beyond ``max_items`` in a namespace (oldest
+    ``updated_at`` first) are deleted by ``sweep``, which a background thread
+    runs every ``sweep_interval`` seconds once ``start_sweeper`` is called.
+    ``on_sweep`` is told which namespaces lost items, so caches can drop them.
+    """
+
+    def __init__(self,
+                 path: str,
+                 ttl: Optional[float] = None,
+                 max_items: Optional[int] = None,
+                 sweep_interval: float = 60.0,
+                 on_sweep: Optional[Callable[[Set[tuple]], None]] = None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        ttl_config = {"default_ttl": ttl / 60, "refresh_on_read": True} if ttl else None
+        super().__init__(conn, ttl=ttl_config)
+        self.path = path
+        self.max_items = max_items
+        self.sweep_interval = sweep_interval
+        self.on_sweep = on_sweep
+        self._sweeper: Optional[threading.Thread] = None
+        self._sweeper_stop = threading.Event()
+
+    def setup(self) -> None:
+        super().setup()
+        with self.lock:
+            # (prefix, key) is the primary key; this one serves the max_items sweep
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS store_prefix_updated_idx ON store (prefix, updated_at)"
+            )
+
+    async def abatch(self, ops: Iterable[Op]) -> List[Result]:
+        """Run the batch on a worker thread so graph.ainvoke can use this store."""
+        return await asyncio.get_running_loop().run_in_executor(None, self.batch, list(ops))
+
+    def sweep(self) -> int:
+        """Delete expired and over-limit items; returns the number deleted."""
+        with self._cursor() as cur:
+            rows = cur.execute(_EXPIRED_SQL).fetchall() if self.ttl_config else []
+            if self.max_items:
+                rows += cur.execute(_OVER_LIMIT_SQL, (self.max_items,)).fetchall()
+            rowids = list({rowid for rowid, _ in rows})
+            for start in range(0, len(rowids), 500):
+                chunk = rowids[start:start + 500]
+                cur.execute(f"DELETE FROM store WHERE rowid IN ({','.join('?' * len(chunk))})", chunk)
+        namespaces = {tuple(prefix.split(".", 1)) for _, prefix in rows}
+        if namespaces and self.on_sweep:
+            self.on_sweep(namespaces)
+        return len(rowids)
+
+    def start_sweeper(self) -> None:
+        """Start the background sweep thread if it is not running."""
+        if self._sweeper and self._sweeper.is_alive():
+            return
+        self._sweeper_stop.clear()
+
+        def _loop():
+            while not self._sweeper_stop.wait(self.sweep_interval):
+                try:
+                    self.sweep()
+                except Exception:
+                    memory_logger.exception("Memory store sweep failed")
+
+        self._sweeper = threading.Thread(target=_loop, daemon=True, name="memory-store-sweeper")
+        self._sweeper.start()
+
+    def stop_sweeper(self, timeout: Optional[float] = None) -> None:
+        self._sweeper_stop.set()
+        if self._sweeper:
+            self._sweeper.join(timeout)
+            self._sweeper = None
+
+    def close(self) -> None:
+        self.stop_sweeper(timeout=1.0)
+        self.conn.close()
+
+
+def create_store(config: Optional[Dict[str, Any]] = None,
+                 on_sweep: Optional[Callable[[Set[tuple]], None]] = None) -> BaseStore:
+    """Build the long-term memory store described by ``config`` (MEMORY_CONFIG by default)."""
+    config = {**MEMORY_CONFIG, **(config or {})}
+    store_type = config["store_type"]
+    if store_type == "in_memory":
+        return InMemoryStore()
+    if store_type == "sqlite":
+        store = SqliteMemoryStore(
+            config["sqlite_path"],
+            ttl=config.get("ttl"),
+            max_items=config.get("max_items"),
+            sweep_interval=config.get("sweep_interval", 60.0),
+            on_sweep=on_sweep
+        )
+        store.setup()
+        store.start_sweeper()
+        return store
+    raise ValueError(f"Unknown store_type: {store_type}; use 'in_memory' or 'sqlite'")
@@ -0,0 +1,139 @@
+"""
+Token streaming of replies.
+
+``graph.astream`` in ``messages`` mode hands out the chunks of every chat
+model call as the model produces them. ReplyStream keeps the text of the
+reply nodes, task_mAIstro and quick_reply, and drops everything else: tool
+call chunks, trustcall extractions and history summaries. Iteration ends with
+the final reply, the reply node message without tool calls; the graph run
+goes on in a background task until its last checkpoint is written, and
+``finished`` waits for it:
+
+    stream = system.astream_reply("user_1", ["Add a todo to book the hotel"])
+    async for token in stream:
+        print(token, end="", flush=True)
+    result = await stream.finished()
+    print(stream.ttft, stream.total)
+
+Only one stream per user may run at a time, as with ``arespond``.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from components.logger import LoggerMixin
+from components.metrics import MESSAGES, REPLY_SECONDS, RESPONSE_SECONDS, TTFT_SECONDS
+
+REPLY_NODES = ("task_mAIstro", "quick_reply")
+
+
+def _text(content: Any) -> str:
+    """Text of a message chunk's content, which is a string or a list of content blocks."""
+    if isinstance(content, str):
+        return content
+    return "".join(block if isinstance(block, str) else block.get("text", "")
+                   for block in content if isinstance(block, str) or block.get("type") == "text")
+
+
+class ReplyStream(LoggerMixin):
+    """Async iterator over the reply tokens of one graph run, with its latencies.
+
+    ``ttft`` is the time to the first token, ``reply_seconds`` the time to the
+    end of the reply and ``total`` the time to the end of the graph run; all
+    stay ``None`` until reached.
+    """
+
+    def __init__(self, graph, user_id: str, texts: List[str], config: Dict[str, Any]):
+        super().__init__()
+        self.user_id = user_id
+        self.messages_count = len(texts)
+        self.ttft: Optional[float] = None
+        self.reply_seconds: Optional[float] = None
+        self.total: Optional[float] = None
+        self.tokens = 0
+        self.reply: Optional[AIMessage] = None
+        self.error: Optional[BaseException] = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._closed = False
+        self._started = time.perf_counter()
+        self._task = asyncio.create_task(
+            self._run(graph, {"messages": [HumanMessage(content=text) for text in texts]}, config))
+
+    def __aiter__(self) -> "ReplyStream":
+        return self
+
+    async def __anext__(self) -> str:
+        if self._closed:
+            raise StopAsyncIteration
+        kind, value = await self._queue.get()
+        if kind == "token":
+            return value
+        self._closed = True
+        if kind == "error":
+            raise value
+        raise StopAsyncIteration
+
+    async def finished(self) -> Dict[str, Any]:
+        """Wait for the whole graph run, memory updates included, and return its final state."""
+        # Cancelling the caller must not cancel the run, which would lose the memory updates
+        await asyncio.shield(self._task)
+        if self.error is not None:
+            raise self.error
+        return self._state
+
+    def _elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def _end_reply(self, kind: str = "end", value: Any = None) -> None:
+        if self.reply_seconds is None:
+            self.reply_seconds = self._elapsed()
+            self._queue.put_nowait((kind, value))
+
+    async def _run(self, graph, inputs: Dict[str, Any], config: Dict[str, Any]) -> None:
+        self._state: Dict[str, Any] = {}
+        try:
+            async for mode, payload in graph.astream(inputs, config, stream_mode=["messages", "updates", "values"]):
+                if mode == "messages":
+                    chunk, metadata = payload
+                    text = _text(chunk.content) if chunk.type in ("ai", "AIMessageChunk") else ""
+                    if text and metadata.get("langgraph_node") in REPLY_NODES and self.reply_seconds is None:
+                        if self.ttft is None:
+                            self.ttft = self._elapsed()
+                        self.tokens += 1
+                        self._queue.put_nowait(("token", text))
+                elif mode == "updates":
+                    for node, update in payload.items():
+                        messages = (update or {}).get("messages") if isinstance(update, dict) else None
+                        if node in REPLY_NODES and messages and not messages[-1].tool_calls:
+                            self.reply = messages[-1]
+                            self._end_reply()
+                else:
+                    self._state = payload
+        except Exception as e:
+            self.error = e
+            self._end_reply("error", e)
+        finally:
+            # Graphs that end without a reply, e.g. with quick_reply disabled, still end the stream
+            self._end_reply()
+            self.total = self._elapsed()
+            self._record()
+
+    def _record(self) -> None:
+        status = "error" if self.error is not None else "success"
+        MESSAGES.inc(self.messages_count, status=status)
+        RESPONSE_SECONDS.observe(self.total)
+        if self.ttft is not None:
+            TTFT_SECONDS.observe(self.ttft)
+        REPLY_SECONDS.observe(self.reply_seconds)
+        if self.error is not None:
+            self.log_error("message_processing_failed", str(self.error), {"user_id": self.user_id})
+            return
+        self.log_event("reply_streamed", {
+            "user_id": self.user_id,
+            "tokens": self.tokens,
+            "ttft": self.ttft,
+            "reply_seconds": self.reply_seconds,
+            "total": self.total
+        })
@@ -0,0 +1,169 @@
+"""
+Per-user BM25 index over todo memories.
+
+task_mAIstro used to paste the user's todo namespace into its system prompt
+as is; for users with hundreds of todos that is most of the prompt. Instead
+the prompt now gets the ``todo_top_k`` non-archived todos that best match the
+current human turn, ranked by Okapi BM25 over the task text and solutions.
+
+Indexes are built from the store on first use (one paginated scan of
+``("todo", user_id)``), kept in an LRU of ``todo_index_users`` users, and
+updated in place by ``update_todos`` when it writes. Everything runs locally
+in pure Python; there is no embedding model or network call.
+"""
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from langgraph.store.base import BaseStore
+
+from components.store_access import read_namespace
+from config import MEMORY_CONFIG
+
+_TOKEN = re.compile(r"\w+")
+_STOPWORDS = frozenset("a an and are at be for from i in is it me my of on or the to with".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def todo_text(value: Mapping[str, Any]) -> str:
+    """The searchable text of a ToDo document."""
+    return " ".join([str(value.get("task") or "")] + [str(s) for s in value.get("solutions") or []])
+
+
+class TodoIndex:
+    """Incrementally updated BM25 index over one user's todos."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.values: Dict[str, Mapping[str, Any]] = {}
+        self._terms: Dict[str, Counter] = {}  # key -> term frequencies
+        self._lengths: Dict[str, int] = {}
+        self._postings: Dict[str, set] = {}  # term -> keys
+        self._order: Dict[str, int] = {}  # key -> write sequence, for recency
+        self._sequence = 0
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def put(self, key: str, value: Mapping[str, Any]) -> None:
+        with self._lock:
+            self._remove(key)
+            terms = Counter(tokenize(todo_text(value)))
+            self.values[key] = value
+            self._terms[key] = terms
+            self._lengths[key] = sum(terms.values())
+            self._total_length += self._lengths[key]
+            for term in terms:
+                self._postings.setdefault(term, set()).add(key)
+            self._sequence += 1
+            self._order[key] = self._sequence
+
+    def update(self, values: Mapping[str, Mapping[str, Any]]) -> None:
+        for key, value in values.items():
+            self.put(key, value)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        terms = self._terms.pop(key, None)
+        if terms is None:
+            return
+        del self.values[key]
+        del self._order[key]
+        self._total_length -= self._lengths.pop(key)
+        for term in terms:
+            keys = self._postings[term]
+            keys.discard(key)
+            if not keys:
+                del self._postings[term]
+
+    def search(self, query: str, k: int) -> List[Tuple[str, Mapping[str, Any]]]:
+        """The ``k`` best non-archived todos for ``query``, most relevant first.
+
+        Todos that match no query term rank below every match, newest first,
+        so a short or off-topic turn still sees the latest todos.
+        """
+        with self._lock:
+            n = len(self.values)
+            if not n or k <= 0:
+                return []
+            average_length = self._total_length / n or 1.0
+            scores = Counter()
+            for term in set(tokenize(query)):
+                keys = self._postings.get(term)
+                if not keys:
+                    continue
+                idf = math.log(1 + (n - len(keys) + 0.5) / (len(keys) + 0.5))
+                for key in keys:
+                    tf = self._terms[key][term]
+                    scores[key] += idf * tf * (self.k1 + 1) / (
+                        tf + self.k1 * (1 - self.b + self.b * self._lengths[key] / average_length))
+            ranked = sorted((key for key, value in self.values.items() if value.get("status") != "archived"),
+                            key=lambda key: (scores[key], self._order[key]), reverse=True)
+            return [(key, self.values[key]) for key in ranked[:k]]
+
+
+class TodoIndexCache:
+    """LRU of per-user TodoIndex objects, built from the store on a miss."""
+
+    def __init__(self, max_users: int = 1000):
+        self.max_users = max_users
+        self._indexes: "OrderedDict[str, TodoIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0  # bumped by every update, so a build that raced a write is not cached
+
+    def get(self, store: BaseStore, user_id: str) -> TodoIndex:
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+                return index
+            writes = self._writes
+        index = TodoIndex()
+        index.update({item.key: item.value for item in read_namespace(store, ("todo", user_id))})
+        with self._lock:
+            if self._writes != writes:
+                return index
+            # Another thread may have built it meanwhile; keep the first one
+            index = self._indexes.setdefault(user_id, index)
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        return index
+
+    def update(self, user_id: str, values: Mapping[str, Mapping[str, Any]]) -> None:
+        """Apply writes to the user's index, if it is loaded; otherwise the next get reads them."""
+        with self._lock:
+            self._writes += 1
+            index = self._indexes.get(user_id)
+        if index is not None:
+            index.update(values)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._writes += 1
+            self._indexes.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._writes += 1
+            self._indexes.clear()
+
+
+todo_indexes = TodoIndexCache(MEMORY_CONFIG["todo_index_users"])
+
+
+def relevant_todos(store: BaseStore, user_id: str, query: str, k: Optional[int] = None) -> List[Mapping[str, Any]]:
+    """Values of the user's top ``k`` todos for ``query`` (MEMORY_CONFIG's todo_top_k by default)."""
+    k = MEMORY_CONFIG["todo_top_k"] if k is None else k
+    return [value for _, value in todo_indexes.get(store, user_id).search(query, k)]
@@ -15,9 +15,49 @@ MODEL_CONFIG: Dict[str, Any] = {
 
 # Memory Configuration
 MEMORY_CONFIG: Dict[str, Any] = {
-    "store_type": "in_memory",  # Options: in_memory, redis, sqlite
-    "max_items": 1000,
-    "ttl": 3600  # Time to live in seconds
+    "store_type": "in_memory",  # Options: in_memory, sqlite
+    "sqlite_path": "./.nexusmind/memory.sqlite",
+    "max_items": 1000,  # per namespace, enforced by the sqlite sweeper
+    "ttl": 3600,  # Time to live in seconds
+    "sweep_interval": 60,  # seconds between sqlite TTL/max_items sweeps
+    "context_cache_size": 10000,  # users whose rendered memory context stays cached
+    "todo_index": True,  # prompt with the most relevant todos instead of the whole namespace
+    "todo_top_k": 10,  # todos per task_mAIstro prompt
+    "todo_index_users": 1000  # users whose todo index stays in memory
+}
+
+# Context Window Configuration
+CONTEXT_CONFIG: Dict[str, Any] = {
+    "max_tokens": 4000,  # history budget for every model/extractor call
+    "summarize": False,  # fold windowed-out turns into a rolling summary
+    "summary_trigger_tokens": 8000  # thread size that triggers summarization
+}
+
+# LLM Response Cache Configuration
+LLM_CACHE_CONFIG: Dict[str, Any] = {
+    "enabled": False,
+    "path": "./.nexusmind/llm_cache.sqlite",
+    "max_bytes": 256 * 1024 * 1024,  # LRU eviction beyond this size
+    "bypass": False  # skip lookups but still record; also NEXUSMIND_LLM_CACHE_BYPASS=1
+}
+
+# Pre-router Configuration
+PREROUTER_CONFIG: Dict[str, Any] = {
+    "enabled": False,  # when off, decisions are only scored against the LLM router
+    "threshold": 0.9,  # confidence of "no memory update" required to skip task_mAIstro
+    "shadow_rate": 0.05,  # share of skips still sent to the LLM to keep measuring precision
+    "model_path": "./.nexusmind/prerouter.json",
+    "log_path": "./.nexusmind/routing_log.jsonl",
+    "collect": False,  # append LLM routing decisions to log_path as training data
+    "reply": False  # answer skipped messages with a tool-free model call
+}
+
+# Checkpointer Configuration
+CHECKPOINT_CONFIG: Dict[str, Any] = {
+    "type": "memory",  # Options: memory, sqlite
+    "sqlite_path": "./.nexusmind/checkpoints.sqlite",
+    "keep_last": 5,  # checkpoints retained per thread (sqlite only)
+    "compact_every": 1000  # prunes between incremental vacuums
 }
 
 # Logging Configuration
@@ -26,15 +66,26 @@ LOGGING_CONFIG: Dict[str, Any] = {
     "format": "%(asctime)s %(levelname)s [%(name)s] %(message)s",
     "date_format": "%Y-%m-%d %H:%M:%S",
     "file_size_limit": 10000000,  # 10MB
-    "backup_count": 5
+    "backup_count": 5,
+    "queue": True,  # hand records to a background writer thread instead of writing inline
+    "console": True,  # also echo to stderr
+    "sample_rates": {  # share of log_event calls kept per event type; unlisted events are always kept
+        "message_processed": 1.0  # lower (e.g. 0.01) on high-volume runs; kept events carry sample_rate
+    }
 }
 
 # Application Configuration
 APP_CONFIG: Dict[str, Any] = {
     "batch_size": 5,
-    "max_retries": 3,
-    "retry_delay": 1.0,  # seconds
-    "timeout": 30.0  # seconds
+    "max_concurrency": 8,  # in-flight graph runs for aprocess_messages
+    "max_pending": 256,  # scheduled but unfinished work units; bounds read-ahead
+    "max_retries": 3,  # node retries on throttling, timeouts and server errors
+    "retry_delay": 1.0,  # seconds, first backoff; doubles per retry, jittered
+    "timeout": 30.0,  # seconds, per model request
+    "requests_per_minute": 500,  # provider quota shared by all model calls
+    "tokens_per_minute": 150000,
+    "model_concurrency": 16,  # starting limit on in-flight model requests; adapted AIMD
+    "max_model_concurrency": 64
 }
 
 # Agent Configuration
@@ -46,19 +97,74 @@ AGENT_CONFIG: Dict[str, Any] = {
 
 # Data Processing Configuration
 DATA_CONFIG: Dict[str, Any] = {
+    "input_path": "./data/fifa2026.txt",
+    "checkpoint_path": "./.nexusmind/ingest_checkpoint.json",
     "input_encoding": "utf8",
     "max_message_length": 1000,
     "min_message_length": 1
 }
 
+# Micro-batching Configuration
+COALESCE_CONFIG: Dict[str, Any] = {
+    "enabled": False,  # merge bursts from one user into a single graph invocation
+    "window_ms": 60000,  # measured from the first message's timestamp
+    "max_messages": 5
+}
+
 # Monitoring Configuration
 MONITORING_CONFIG: Dict[str, Any] = {
     "enabled": True,
-    "interval": 60,  # seconds
+    "interval": 60,  # seconds between exports
+    "export_path": "./.nexusmind/metrics.prom",
+    "format": "prometheus",  # Options: prometheus, json
     "metrics": [
         "message_count",
         "error_rate",
         "response_time",
         "memory_usage"
     ]
-} 
\ No newline at end of file
+} 
+
+# Sharded multi-process execution (components/sharding.py)
+SHARDING_CONFIG: Dict[str, Any] = {
+    "workers": 4,  # worker processes; each user_id is pinned to one by a stable hash
+    "chunk_size": 32,  # messages per hand-off to a worker
+    "queue_size": 4,  # chunks buffered per worker before the coordinator waits
+    "start_method": "spawn"  # multiprocessing start method; spawn is safe with the logging and metrics threads
+}
+
+# Batch jobs over the whole export (components/jobs.py)
+JOB_CONFIG: Dict[str, Any] = {
+    "chunk_size": 100,  # messages between progress commits
+    "max_concurrency": None,  # in-flight graph runs per chunk; None uses APP_CONFIG's max_concurrency
+    "ledger_path": "./.nexusmind/job_ledger.sqlite",  # keys of messages already handled
+    "dead_letter_path": "./.nexusmind/dead_letters.jsonl"
+}
+
+# Todo compaction (components/compaction.py)
+COMPACTION_CONFIG: Dict[str, Any] = {
+    "enabled": False,  # run the background compactor started by setup_graph
+    "interval": 300,  # seconds between passes over the users update_todos has written for
+    "users_per_pass": 100,
+    "similarity": 0.75,  # word Jaccard similarity above which two open todos are merged
+    "cold_namespace": "todo_archive"  # where done, archived and merged todos are moved
+}
+
+# Snapshots of the memory store and checkpoints (components/snapshot.py)
+SNAPSHOT_CONFIG: Dict[str, Any] = {
+    "path": "./.nexusmind/snapshot.bin",
+    "restore_on_start": False,  # load the snapshot at path, if there is one, when the graph is set up
+    "frame_items": 1000  # items, or threads, per frame
+}
+
+# HTTP service (components/service.py)
+SERVICE_CONFIG: Dict[str, Any] = {
+    "host": "127.0.0.1",
+    "port": 8080,
+    "max_pending": 256,  # admitted requests, running or waiting; more are shed with 429
+    "max_concurrency": 64,  # graph runs in flight
+    "per_user_in_flight": 2,  # admitted requests per user; they run one at a time
+    "request_timeout": 60.0,  # seconds before a submission answers 504 (the run still completes)
+    "keepalive_timeout": 15.0,  # seconds an idle connection stays open
+    "max_body_bytes": 65536
+}
@@ -0,0 +1,25 @@
+"""
+Shared fixtures for the recommendation system tests.
+"""
+import pytest
+
+from app import RecommendationSystem
+from benchmarks.fake_llm import FakeChatModel
+from components.registry import registry
+
+
+@pytest.fixture
+def make_system():
+    """Builds graph-only systems on a fake chat model and resets the registry afterwards.
+
+    ``make_system(model)`` uses ``model`` (a ``FakeChatModel`` by default);
+    other components can be replaced by name, e.g. ``prerouter=router``.
+    """
+    def build(model=None, **components) -> RecommendationSystem:
+        registry.set("chat", FakeChatModel() if model is None else model)
+        for name, component in components.items():
+            registry.set(name, component)
+        return RecommendationSystem(standalone=False)
+
+    yield build
+    registry.reset()
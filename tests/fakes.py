@@ -0,0 +1,11 @@
+"""
+Fake models shared by the tests.
+"""
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+
+class ToolCallingFake(FakeListChatModel):
+    """Fake chat model that accepts bound tools, as trustcall requires."""
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=tools, **kwargs)
@@ -0,0 +1,129 @@
+"""
+Test cases for the RecommendationSystem processing loop.
+"""
+import asyncio
+from app import RecommendationSystem
+from components.data_loader import ChatExportReader, ChatMessage
+
+
+class FakeGraph:
+    """Records graph runs and tracks how many overlap."""
+
+    def __init__(self, delay=0.01, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def ainvoke(self, state, config):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            content = state["messages"][0].content
+            self.calls.append((config["configurable"]["thread_id"], content))
+            await asyncio.sleep(self.delay)
+            if content == self.fail_on:
+                raise RuntimeError("boom")
+            return {"messages": state["messages"]}
+        finally:
+            self.in_flight -= 1
+
+
+def system_with_graph(graph):
+    system = RecommendationSystem(standalone=False)
+    system.graph = graph
+    return system
+
+
+def make_messages(pairs):
+    return [ChatMessage(user_id, "", message, offset) for offset, (user_id, message) in enumerate(pairs, 1)]
+
+
+def test_aprocess_messages_keeps_per_user_order():
+    """Messages of one user run in order on that user's own thread."""
+    messages = make_messages((f"u{i % 3}", f"m{i}") for i in range(12))
+    graph = FakeGraph()
+    system = system_with_graph(graph)
+
+    results = asyncio.run(system.aprocess_messages(messages, max_concurrency=3))
+
+    assert [r["user_id"] for r in results] == [m.user_id for m in messages]
+    assert all(r["status"] == "success" for r in results)
+    for user in ("u0", "u1", "u2"):
+        seen = [content for thread, content in graph.calls if thread == f"user-{user}"]
+        assert seen == [m.message for m in messages if m.user_id == user]
+
+
+def test_aprocess_messages_bounds_concurrency():
+    """No more than max_concurrency graph runs are in flight at once."""
+    messages = make_messages((f"u{i}", f"m{i}") for i in range(20))
+    graph = FakeGraph()
+    system = system_with_graph(graph)
+
+    asyncio.run(system.aprocess_messages(messages, max_concurrency=4))
+
+    assert graph.max_in_flight == 4
+
+
+def test_one_users_burst_does_not_delay_other_users():
+    """Queued messages from one user do not hold slots other users could run in."""
+    messages = make_messages([("u1", f"m{i}") for i in range(6)] + [("u2", "other")])
+    graph = FakeGraph(delay=0.05)
+    system = system_with_graph(graph)
+
+    asyncio.run(system.aprocess_messages(messages, max_concurrency=4, coalesce=False))
+
+    assert graph.calls.index(("user-u2", "other")) <= 1
+
+
+def test_aprocess_messages_records_errors():
+    """A failing message is reported without stopping the batch."""
+    messages = make_messages([("u1", "ok"), ("u1", "bad"), ("u1", "after")])
+    system = system_with_graph(FakeGraph(fail_on="bad"))
+
+    results = asyncio.run(system.aprocess_messages(messages))
+
+    assert [r["status"] for r in results] == ["success", "error", "success"]
+
+
+def test_aprocess_messages_resumes_from_checkpoint(tmp_path):
+    """A resumed run skips messages whose offsets were already committed."""
+    export = tmp_path / "export.txt"
+    export.write_text(
+        '[@alice - March 1, 2025, 10:05 AM]"first"\n\n'
+        '[@bob - March 1, 2025, 10:06 AM]"second"\n\n'
+        '[@alice - March 1, 2025, 10:07 AM]"third"\n',
+        encoding="utf8"
+    )
+    graph = FakeGraph()
+    system = system_with_graph(graph)
+    system.reader = ChatExportReader(str(export), checkpoint_path=str(tmp_path / "ckpt.json"))
+
+    first = asyncio.run(system.aprocess_messages(batch_size=2, resume=True))
+    second = asyncio.run(system.aprocess_messages(resume=True))
+
+    assert [r["user_id"] for r in first] == ["alice", "bob"]
+    assert [r["user_id"] for r in second] == ["alice"]
+    assert [content for _, content in graph.calls] == ['"first"', '"second"', '"third"']
+
+
+def test_coalesced_bursts_run_as_one_invocation(tmp_path):
+    """A user's burst becomes one graph run, and the resume offset still covers every message."""
+    export = tmp_path / "export.txt"
+    export.write_text(
+        '[@alice - March 1, 2025, 10:05 AM]"first"\n'
+        '[@alice - March 1, 2025, 10:05 AM]"second"\n'
+        '[@bob - March 1, 2025, 10:05 AM]"hello"\n'
+        '[@alice - March 1, 2025, 10:06 AM]"third"\n',
+        encoding="utf8"
+    )
+    graph = FakeGraph()
+    system = system_with_graph(graph)
+    system.reader = ChatExportReader(str(export), checkpoint_path=str(tmp_path / "ckpt.json"))
+
+    results = asyncio.run(system.aprocess_messages(resume=True, coalesce=True))
+
+    assert [(r["user_id"], r["messages_count"]) for r in results] == [("alice", 3), ("bob", 1)]
+    assert len(graph.calls) == 2
+    assert system.reader.resume_offset() == export.stat().st_size
@@ -0,0 +1,53 @@
+"""
+Test cases for the offline benchmark suite.
+"""
+import copy
+
+from langchain_core.messages import HumanMessage, ToolMessage
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.run import compare, run_benchmark
+from components.cls import UpdateMemory
+from components.data_loader import ChatExportReader
+
+
+def test_corpus_matches_the_export_format(tmp_path):
+    """Generated lines parse like data/*.txt and are reproducible from the seed."""
+    first = generate_corpus(str(tmp_path / "a.txt"), messages=200, users=20)
+    second = generate_corpus(str(tmp_path / "b.txt"), messages=200, users=20)
+
+    messages = list(ChatExportReader(first))
+    assert len(messages) == 200
+    assert messages[0].timestamp == "March 1, 2025, 10:00 AM"
+    assert open(first).read() == open(second).read()
+
+
+def test_fake_model_routes_like_task_maistro():
+    """Update cues produce UpdateMemory calls; chatter and tool results get plain replies."""
+    model = FakeChatModel().bind_tools([UpdateMemory], parallel_tool_calls=True)
+
+    todo = model.invoke([HumanMessage(content="Remind me to renew my passport")])
+    chatter = model.invoke([HumanMessage(content="What a goal!")])
+    after = model.invoke([HumanMessage(content="Remind me"), todo,
+                          ToolMessage(content="updated", tool_call_id=todo.tool_calls[0]["id"])])
+
+    assert [call["args"] for call in todo.tool_calls] == [{"update_type": "todo"}]
+    assert todo.additional_kwargs["tool_calls"][0]["function"]["name"] == "UpdateMemory"
+    assert not chatter.tool_calls and not after.tool_calls
+    assert model.invoke([HumanMessage(content="Remind me to renew my passport")]).tool_calls == todo.tool_calls
+
+
+def test_pipeline_benchmark_reports_and_compares(tmp_path):
+    """The whole pipeline runs on the fake model; the report flags regressions."""
+    corpus = generate_corpus(str(tmp_path / "corpus.txt"), messages=60, users=10, update_ratio=0.3)
+
+    report = run_benchmark(corpus, latency_ms=0)
+
+    assert report["messages"] == 60 and report["errors"] == 0
+    assert {"task_mAIstro", "update_todos", "model_call"} <= set(report["latency"])
+    assert report["store_ops"]["SearchOp"] > 0 and report["store_ops"]["PutOp"] > 0
+    slower = copy.deepcopy(report)
+    slower["throughput_msgs_per_s"] /= 2
+    assert compare(report, report) == []
+    assert compare(report, slower) and "throughput" in compare(report, slower)[0]
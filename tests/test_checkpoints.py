@@ -0,0 +1,60 @@
+"""
+Test cases for the within-thread checkpointers.
+"""
+import asyncio
+
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import StateGraph, MessagesState, START, END
+
+from components.checkpoints import RetainingSqliteSaver, create_checkpointer
+
+
+def echo(state: MessagesState):
+    return {"messages": [AIMessage(content=f"echo {len(state['messages'])}")]}
+
+
+def build_graph(checkpointer):
+    builder = StateGraph(MessagesState)
+    builder.add_node(echo)
+    builder.add_edge(START, "echo")
+    builder.add_edge("echo", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def test_create_checkpointer(tmp_path):
+    """The factory builds the checkpointer named in the config."""
+    assert isinstance(create_checkpointer({"type": "memory"}), MemorySaver)
+    saver = create_checkpointer({"type": "sqlite", "sqlite_path": str(tmp_path / "c.sqlite")})
+    assert isinstance(saver, RetainingSqliteSaver)
+    saver.close()
+
+
+def test_retains_last_checkpoints_and_state(tmp_path):
+    """Only keep_last checkpoints remain per thread and the state is intact."""
+    saver = RetainingSqliteSaver(str(tmp_path / "c.sqlite"), keep_last=2, compact_every=3)
+    graph = build_graph(saver)
+    config = {"configurable": {"thread_id": "user-a"}}
+    for i in range(5):
+        graph.invoke({"messages": [("user", f"hi {i}")]}, config)
+    graph.invoke({"messages": [("user", "other")]}, {"configurable": {"thread_id": "user-b"}})
+
+    assert len(list(saver.list(config))) == 2
+    assert len(graph.get_state(config).values["messages"]) == 10
+    sizes = saver.thread_bytes()
+    assert set(sizes) == {"user-a", "user-b"}
+    assert saver.thread_bytes("user-b") == {"user-b": sizes["user-b"]}
+    saver.close()
+
+
+def test_async_graph_runs(tmp_path):
+    """ainvoke works against the sqlite checkpointer."""
+    saver = RetainingSqliteSaver(str(tmp_path / "c.sqlite"), keep_last=3)
+    graph = build_graph(saver)
+    config = {"configurable": {"thread_id": "user-a"}}
+
+    asyncio.run(graph.ainvoke({"messages": [("user", "hi")]}, config))
+    result = asyncio.run(graph.ainvoke({"messages": [("user", "again")]}, config))
+
+    assert result["messages"][-1].content == "echo 3"
+    saver.close()
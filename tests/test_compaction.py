@@ -0,0 +1,111 @@
+"""
+Test cases for todo compaction.
+"""
+from langgraph.store.base import GetOp
+from langgraph.store.memory import InMemoryStore
+
+from components.compaction import TodoCompactor, merge_todos, plan_compaction
+from components.store_access import read_namespace
+
+
+def todo(task, status="not started", solutions=("Search online",), deadline=None):
+    return {"task": task, "time_to_complete": 30, "deadline": deadline, "solutions": list(solutions),
+            "status": status}
+
+
+def fill(store, user_id, todos):
+    for key, value in todos:
+        store.put(("todo", user_id), key, value)
+
+
+def test_plan_moves_closed_todos_and_merges_duplicates_into_the_newest():
+    store = InMemoryStore()
+    fill(store, "u", [
+        ("old", todo("Book a hotel in Miami", solutions=["booking.com"], deadline="2026-06-01T00:00:00")),
+        ("done", todo("Buy a scarf", status="done")),
+        ("other", todo("Renew my passport")),
+        ("new", todo("Book hotel in Miami", status="in progress", solutions=["Ask Omar"])),
+    ])
+    updates, moves = plan_compaction(store.search(("todo", "u"), limit=10), threshold=0.75)
+
+    assert set(moves) == {"done", "old"}
+    assert moves["old"]["merged_into"] == "new"
+    assert "merged_into" not in moves["done"]
+    assert updates["new"]["solutions"] == ["Ask Omar", "booking.com"]
+    assert updates["new"]["deadline"] == "2026-06-01T00:00:00"
+    assert updates["new"]["status"] == "in progress"
+
+
+def test_merge_keeps_the_furthest_status_and_earliest_deadline():
+    merged = merge_todos(todo("a", deadline="2026-07-01T00:00:00"),
+                         todo("a", status="in progress", deadline="2026-06-01T00:00:00"))
+    assert merged["status"] == "in progress"
+    assert merged["deadline"] == "2026-06-01T00:00:00"
+
+
+def test_compaction_moves_todos_to_the_cold_namespace_and_reports_savings():
+    store = InMemoryStore()
+    fill(store, "u", [("a", todo("Book a hotel in Miami")), ("b", todo("Buy a scarf", status="archived")),
+                      ("c", todo("Book a hotel in Miami")), ("d", todo("Renew my passport"))])
+    compactor = TodoCompactor({"cold_namespace": "todo_cold"})
+    compactor.mark("u")
+
+    stats = compactor.run_pending(store)
+
+    assert {item.key for item in read_namespace(store, ("todo", "u"))} == {"c", "d"}
+    assert {item.key for item in read_namespace(store, ("todo_cold", "u"))} == {"a", "b"}
+    assert stats["archived"] == 1 and stats["merged"] == 1
+    assert stats["bytes_saved"] > 0 and stats["tokens_saved"] > 0
+    assert compactor.pending() == []
+    # Nothing is left to do, and unmarked users are not visited
+    assert compactor.run_pending(store)["users"] == 0
+    assert compactor.compact_user(store, "u")["archived"] == 0
+
+
+def test_compaction_drops_a_plan_raced_by_a_write():
+    class RacingStore(InMemoryStore):
+        raced = False
+
+        def batch(self, ops):
+            ops = list(ops)
+            if ops and isinstance(ops[0], GetOp) and not self.raced:
+                self.raced = True
+                self.put(("todo", "u"), "b", todo("Buy a scarf", status="in progress"))
+            return super().batch(ops)
+
+    store = RacingStore()
+    fill(store, "u", [("a", todo("Renew my passport")), ("b", todo("Buy a scarf", status="done"))])
+    compactor = TodoCompactor()
+
+    stats = compactor.compact_user(store, "u")
+
+    assert stats["conflict"]
+    assert {item.key for item in read_namespace(store, ("todo", "u"))} == {"a", "b"}
+    assert compactor.pending() == ["u"]
+    assert compactor.run_pending(store)["archived"] == 0
+
+
+def test_compact_all_visits_every_user():
+    store = InMemoryStore()
+    fill(store, "u1", [("a", todo("Buy a scarf", status="done"))])
+    fill(store, "u2", [("b", todo("Renew my passport", status="archived")), ("c", todo("Call mum"))])
+
+    stats = TodoCompactor().compact_all(store)
+
+    assert stats["users"] == 2 and stats["archived"] == 2
+    assert [item.key for item in read_namespace(store, ("todo", "u2"))] == ["c"]
+
+
+def test_compaction_skips_a_user_while_update_todos_holds_the_lock():
+    """A user being updated is marked again rather than compacted under the extraction."""
+    store = InMemoryStore()
+    fill(store, "u", [("a", todo("Buy a scarf", status="done"))])
+    compactor = TodoCompactor()
+
+    with compactor.locked("u"):
+        stats = compactor.compact_user(store, "u")
+
+    assert stats["conflict"] and compactor.pending() == ["u"]
+    assert [item.key for item in read_namespace(store, ("todo", "u"))] == ["a"]
+    assert compactor.run_pending(store)["archived"] == 1
+    assert compactor._user_locks == {}
@@ -0,0 +1,134 @@
+"""
+Test cases for token-budgeted context windowing.
+"""
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.store.memory import InMemoryStore
+
+from components import nodes
+from components.context_window import (TokenAccountant, build_history, count_tokens, extraction_history,
+                                       last_human_turn, window_messages)
+from components.registry import registry
+from config import CONTEXT_CONFIG
+
+
+def make_thread(turns):
+    messages = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=f"turn {i} " + "word " * 50, id=f"h{i}"))
+        messages.append(AIMessage(content="", id=f"a{i}",
+                                  tool_calls=[{"name": "UpdateMemory", "args": {"update_type": "todo"}, "id": f"c{i}"}]))
+        messages.append(ToolMessage(content="updated", tool_call_id=f"c{i}", id=f"t{i}"))
+        messages.append(AIMessage(content="Done!", id=f"r{i}"))
+    return messages
+
+
+def test_window_stays_within_budget_and_starts_on_human():
+    """Prompt size stays flat however long the thread grows."""
+    for turns in (10, 100):
+        windowed = window_messages(make_thread(turns), max_tokens=300)
+        assert count_tokens(windowed) <= 300
+        assert windowed[0].type == "human"
+        assert windowed[-1].id == f"r{turns - 1}"
+
+
+def test_short_history_is_untouched_and_summary_is_prepended():
+    """Within budget nothing is dropped; the rolling summary leads the history."""
+    thread = make_thread(2)
+
+    assert window_messages(thread, max_tokens=10000) == thread
+    history = build_history({"messages": thread, "summary": "User plans to attend FIFA."}, max_tokens=10000)
+    assert isinstance(history[0], SystemMessage)
+    assert "FIFA" in history[0].content
+    assert build_history({"messages": thread}, drop_last=True, max_tokens=10000) == thread[:-1]
+
+
+def test_oversized_single_turn_is_kept():
+    """A turn larger than the budget is still sent rather than an empty prompt."""
+    messages = [HumanMessage(content="word " * 1000, id="h")]
+
+    assert window_messages(messages, max_tokens=10) == messages
+
+
+def test_summarize_history_folds_old_turns(monkeypatch):
+    """Turns outside the window become the summary and are removed from the thread."""
+    registry.set("chat", FakeListChatModel(responses=["User is planning a FIFA trip."]))
+    monkeypatch.setitem(CONTEXT_CONFIG, "max_tokens", 300)
+    thread = make_thread(20)
+
+    try:
+        update = nodes.summarize_history({"messages": thread}, {"configurable": {}}, None)
+    finally:
+        registry.reset()
+
+    assert update["summary"] == "User is planning a FIFA trip."
+    removed = {message.id for message in update["messages"]}
+    assert removed and "h0" in removed and "r19" not in removed
+
+
+def pending_update(thread, update_type="todo", turn="new"):
+    """``thread`` plus a new human turn and task_mAIstro's tool call for it."""
+    call = {"name": "UpdateMemory", "args": {"update_type": update_type}, "id": "pending"}
+    return thread + [HumanMessage(content=f"turn {turn}", id=f"h-{turn}"),
+                     AIMessage(content="", id=f"a-{turn}", tool_calls=[call],
+                               additional_kwargs={"tool_calls": [call]})]
+
+
+def test_extraction_history_is_delta_only():
+    """After a watermark only the newer turns are sent, starting on a human message."""
+    thread = make_thread(10)
+    messages = pending_update(thread)
+
+    first, watermark = extraction_history({"messages": messages}, "todo", max_tokens=10000)
+    delta, _ = extraction_history({"messages": messages, "extracted": {"todo": "h7"}}, "todo", max_tokens=10000)
+
+    assert first == messages[:-1] and watermark == "h-new"
+    assert [m.id for m in delta] == ["h8", "a8", "t8", "r8", "h9", "a9", "t9", "r9", "h-new"]
+    # A watermark summarized out of the thread falls back to the windowed history
+    lost, _ = extraction_history({"messages": messages, "extracted": {"todo": "gone"}}, "todo", max_tokens=10000)
+    assert lost == messages[:-1]
+
+
+def test_update_todos_sends_only_new_turns():
+    """On a long thread the extractor prompt shrinks to the turns since its last run."""
+    seen = []
+
+    def fake_extractor(payload):
+        seen.append(payload["messages"])
+        return {"messages": [], "responses": [], "response_metadata": []}
+
+    registry.set("todo_extractor", RunnableLambda(fake_extractor))
+    config = {"configurable": {"user_id": "u1"}}
+    thread = make_thread(30)
+    try:
+        full = nodes.update_todos({"messages": pending_update(thread)}, config, InMemoryStore())
+        delta = nodes.update_todos({"messages": pending_update(thread), "extracted": {"todo": "r29"}},
+                                   config, InMemoryStore())
+    finally:
+        registry.reset()
+
+    assert full["extracted"] == delta["extracted"] == {"todo": "h-new"}
+    assert count_tokens(seen[1]) * 10 < count_tokens(seen[0])
+
+
+def test_last_human_turn_skips_tool_round_trips_and_caps_bursts():
+    """The latest run of human messages, newest ``max_messages`` of it when capped."""
+    messages = [HumanMessage(content="old"), AIMessage(content="ok"),
+                HumanMessage(content="a"), HumanMessage(content="b"), HumanMessage(content="c"),
+                AIMessage(content="", tool_calls=[{"name": "UpdateMemory", "args": {}, "id": "t1"}]),
+                ToolMessage(content="done", tool_call_id="t1")]
+    assert last_human_turn(messages) == "a\nb\nc"
+    assert last_human_turn(messages[:5], max_messages=2) == "b\nc"
+    assert last_human_turn([AIMessage(content="hi")]) == ""
+
+
+def test_token_accountant_totals():
+    """Per-call records roll up into per-node totals."""
+    accountant = TokenAccountant()
+    accountant.record("task_mAIstro", 120, AIMessage(content="hi", usage_metadata={
+        "input_tokens": 130, "output_tokens": 5, "total_tokens": 135}))
+    accountant.record("task_mAIstro", 80)
+
+    assert accountant.snapshot() == {"task_mAIstro": {"calls": 2, "prompt_tokens": 200, "max_prompt_tokens": 120}}
+    assert accountant.records[0]["output_tokens"] == 5
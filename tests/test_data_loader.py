@@ -0,0 +1,78 @@
+"""
+Test cases for streaming chat export ingestion.
+"""
+from components.data_loader import ChatExportReader, ChatMessage, OffsetTracker, coalesce_messages, parse_line
+
+
+def test_parse_line_extracts_author_timestamp_and_body():
+    """A message line is parsed into a compact record."""
+    msg = parse_line(b'[@SoccerGuru22 - March 1, 2025, 10:05 AM]"Massive news!"\n', 60)
+
+    assert msg == ChatMessage("SoccerGuru22", "March 1, 2025, 10:05 AM", '"Massive news!"', 60)
+    assert parse_line(b"[Comment Thread]\n", 0) is None
+    assert parse_line(b"[@empty - March 1, 2025, 10:05 AM]\n", 0) is None
+
+
+def test_reader_resumes_from_committed_offset(tmp_path):
+    """Committed offsets survive a restart and skip what was already read."""
+    export = tmp_path / "export.txt"
+    export.write_text(
+        '[@a - March 1, 2025, 10:05 AM]"one"\n\nnoise\n'
+        '[@b - March 1, 2025, 10:06 AM]"two"\n'
+        '[@c - March 1, 2025, 10:07 AM]"three"\n',
+        encoding="utf8"
+    )
+    checkpoint = str(tmp_path / "state" / "ckpt.json")
+    reader = ChatExportReader(str(export), checkpoint_path=checkpoint)
+
+    messages = list(reader.iter_messages(reader.resume_offset()))
+    reader.commit(messages[1].offset)
+    restarted = ChatExportReader(str(export), checkpoint_path=checkpoint)
+
+    assert [m.user_id for m in messages] == ["a", "b", "c"]
+    assert reader.skipped == 1
+    assert [m.user_id for m in restarted.iter_messages(restarted.resume_offset())] == ["c"]
+
+
+def test_offset_tracker_waits_for_oldest_message():
+    """The watermark only passes messages whose predecessors have completed."""
+    first, second, third = (ChatMessage("u", "", str(i), i * 10) for i in range(1, 4))
+    tracker = OffsetTracker()
+    for msg in (first, second, third):
+        tracker.issue(msg)
+
+    assert not tracker.complete(second)
+    assert tracker.watermark == 0
+    assert tracker.complete(first)
+    assert tracker.watermark == 20
+    tracker.complete(third)
+    assert tracker.watermark == 30
+
+
+def stamped(user_id, minute, message, offset):
+    return ChatMessage(user_id, f"March 1, 2025, 10:{minute:02d} AM", message, offset)
+
+
+def test_coalesce_groups_bursts_per_user():
+    """A user's messages within the window merge; other users' messages interleave freely."""
+    messages = [
+        stamped("alice", 0, "a1", 1),
+        stamped("bob", 0, "b1", 2),
+        stamped("alice", 1, "a2", 3),
+        stamped("alice", 5, "a3", 4),
+        stamped("bob", 6, "b2", 5),
+    ]
+
+    batches = list(coalesce_messages(messages, window_ms=60000, max_messages=5))
+
+    assert [[m.message for m in batch] for batch in batches] == [["b1"], ["a1", "a2"], ["a3"], ["b2"]]
+
+
+def test_coalesce_caps_batches_and_needs_adjacency_without_timestamps():
+    """max_messages closes a batch; unstamped messages only merge when adjacent."""
+    burst = [stamped("alice", 0, f"a{i}", i) for i in range(5)]
+    unstamped = [ChatMessage("carol", "", "c1", 1), ChatMessage("carol", "", "c2", 2),
+                 ChatMessage("dave", "", "d1", 3), ChatMessage("carol", "", "c3", 4)]
+
+    assert [len(b) for b in coalesce_messages(burst, window_ms=60000, max_messages=2)] == [2, 2, 1]
+    assert [[m.message for m in b] for b in coalesce_messages(unstamped, 60000, 5)] == [["c1", "c2"], ["d1"], ["c3"]]
@@ -0,0 +1,79 @@
+"""
+Test cases for resumable batch jobs, the idempotency ledger and dead letters.
+"""
+from datetime import datetime, timedelta
+from typing import ClassVar
+
+import pytest
+
+from benchmarks.corpus import format_timestamp
+from benchmarks.fake_llm import FakeChatModel
+from components.data_loader import ChatExportReader
+from components.jobs import BatchJob
+
+
+class FlakyModel(FakeChatModel):
+    """Fails every prompt ending in a "boom" message while ``failing`` is set."""
+
+    failing: ClassVar[bool] = True
+
+    def _respond(self, messages, **kwargs):
+        if FlakyModel.failing and "boom" in str(messages[-1].content):
+            raise ValueError("model exploded")
+        return super()._respond(messages, **kwargs)
+
+
+@pytest.fixture
+def job(make_system, tmp_path):
+    lines = []
+    for i in range(10):
+        text = "boom goes the goal" if i == 6 else f"What a goal number {i}!"
+        moment = datetime(2025, 3, 1, 10, 0) + timedelta(minutes=i)
+        lines.append(f'[@fan{i % 3} - {format_timestamp(moment)}]"{text}"\n')
+    export = tmp_path / "export.txt"
+    export.write_text("".join(lines))
+
+    FlakyModel.failing = True
+    system = make_system(FlakyModel())
+    system.reader = ChatExportReader(str(export), checkpoint_path=str(tmp_path / "checkpoint.json"))
+    job = BatchJob(system, chunk_size=4, ledger_path=str(tmp_path / "ledger.sqlite"),
+                   dead_letter_path=str(tmp_path / "dead.jsonl"))
+    yield job
+    job.close()
+
+
+def test_job_records_progress_and_dead_letters(job):
+    """Every chunk is committed; the failure is dead-lettered and not retried by a rerun."""
+    stats = job.run()
+
+    assert (stats["chunks"], stats["processed"], stats["failed"]) == (3, 9, 1)
+    assert job.system.reader.resume_offset() == stats["offset"] > 0
+    assert [entry["message"] for entry in job.dead_letters.read()] == ['"boom goes the goal"']
+    assert job.ledger.counts() == {"success": 9, "error": 1}
+
+    rerun = job.run(resume=False)
+    assert (rerun["processed"], rerun["skipped"], rerun["failed"]) == (0, 10, 0)
+
+
+def test_crashed_job_resumes_without_redoing_work(job):
+    """A job stopped after one chunk picks up at the next; a full replay skips everything done."""
+    first = job.run(limit=4)
+    resumed = job.run()
+    replay = job.run(resume=False)
+
+    assert first["processed"] == 4
+    assert (resumed["start_offset"], resumed["processed"] + resumed["failed"]) == (first["offset"], 6)
+    assert replay["skipped"] == 10 and replay["processed"] == 0
+
+
+def test_replay_recovers_dead_letters(job):
+    """Replayed messages that now succeed leave the file; the ledger marks them done."""
+    job.run()
+    FlakyModel.failing = False
+
+    stats = job.replay_dead_letters()
+
+    assert stats == {"replayed": 1, "recovered": 1, "failed": 0, "already_done": 0}
+    assert job.dead_letters.read() == []
+    assert job.ledger.counts() == {"success": 10}
+    assert job.replay_dead_letters()["replayed"] == 0
@@ -0,0 +1,82 @@
+"""
+Test cases for the persistent LLM response cache.
+"""
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration
+
+from components.llm_cache import ResponseCache, create_response_cache
+
+
+def prompt(message_id, system_time="2026-10-17T10:00:00"):
+    return dumps([
+        SystemMessage(content=f"Reflect on the interaction.\n\nSystem Time: {system_time}"),
+        HumanMessage(content="I need to buy match tickets", id=message_id),
+    ])
+
+
+def reply(text):
+    return [ChatGeneration(message=AIMessage(content=text, id="run-1",
+                                             response_metadata={"model_name": "gpt-4o"}))]
+
+
+def test_hit_ignores_message_ids_and_system_time(tmp_path):
+    """A replayed prompt hits although ids and the timestamp changed."""
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    cache.update(prompt("run-a"), "gpt-4o", reply("Noted."))
+
+    hit = cache.lookup(prompt("run-b", system_time="2026-10-18T09:30:00"), "gpt-4o")
+
+    assert hit[0].message.content == "Noted."
+    assert cache.lookup(prompt("run-b"), "gpt-4o-mini") is None
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_entries_survive_reopen(tmp_path):
+    """The cache is on disk, so a new process sees the previous run's entries."""
+    path = str(tmp_path / "cache.sqlite")
+    first = ResponseCache(path)
+    first.update(prompt("a"), "gpt-4o", reply("Noted."))
+    first.close()
+
+    second = ResponseCache(path)
+
+    assert second.lookup(prompt("b"), "gpt-4o")[0].message.content == "Noted."
+    assert second.stats()["bytes"] > 0
+
+
+def test_lru_eviction_by_size(tmp_path):
+    """Least recently used entries go once the cache outgrows max_bytes."""
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=1000)
+    for i in range(20):
+        cache.update(f"prompt {i}", "gpt-4o", reply("x" * 100))
+        cache.lookup("prompt 0", "gpt-4o")  # keep the first entry hot
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 1000 and stats["evictions"] > 0
+    assert cache.lookup("prompt 0", "gpt-4o") is not None
+    assert cache.lookup("prompt 1", "gpt-4o") is None
+
+
+def test_bypass_skips_lookups_but_records(tmp_path, monkeypatch):
+    """Bypass forces fresh calls while still refreshing the cache."""
+    monkeypatch.setenv("NEXUSMIND_LLM_CACHE_BYPASS", "1")
+    cache = create_response_cache({"enabled": True, "path": str(tmp_path / "cache.sqlite")})
+    cache.update(prompt("a"), "gpt-4o", reply("Noted."))
+
+    assert cache.bypass
+    assert cache.lookup(prompt("a"), "gpt-4o") is None
+    assert cache.stats()["bytes"] > 0
+    assert create_response_cache({"enabled": False}) is None
+
+
+def test_chat_model_reads_through_cache(tmp_path):
+    """A model built with the cache answers a repeated prompt without a call."""
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    model = FakeListChatModel(responses=["first", "second"], cache=cache)
+
+    assert model.invoke([HumanMessage(content="hello", id="1")]).content == "first"
+    assert model.invoke([HumanMessage(content="hello", id="2")]).content == "first"
+    assert model.invoke([HumanMessage(content="bye")]).content == "second"
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,84 @@
+"""
+Test cases for queued, lazily serialized and sampled logging.
+"""
+import json
+import logging
+
+import components.logger as logger_module
+from components.logger import LoggerMixin, StructuredRecord, setup_logger, shutdown_logging
+from config import LOGGING_CONFIG
+
+
+class Component(LoggerMixin):
+    pass
+
+
+def test_setup_logger_is_idempotent_and_queued(tmp_path):
+    """Repeated setup adds no handlers, and queued records reach the file once drained."""
+    log_file = str(tmp_path / "queued.log")
+    logger = setup_logger("test_queued", log_file, use_queue=True)
+    handlers = list(logger.handlers)
+    assert setup_logger("test_queued", log_file, use_queue=True).handlers == handlers
+    assert [type(h).__name__ for h in handlers] == ["DeferredQueueHandler"]
+
+    logger.info("%s", StructuredRecord({"event_type": "ping", "data": {"n": 1}}))
+    shutdown_logging()
+
+    line = open(log_file).read().strip()
+    entry = json.loads(line.split("[test_queued] ", 1)[1])
+    assert entry["event_type"] == "ping" and entry["data"] == {"n": 1} and "timestamp" in entry
+    logger.handlers.clear()
+    logger_module._handlers.pop("test_queued")
+
+
+def test_log_event_skips_serialization_when_disabled(monkeypatch):
+    """With INFO off nothing is built or serialized."""
+    component = Component()
+    component.logger.setLevel(logging.WARNING)
+    monkeypatch.setattr(logger_module, "StructuredRecord", None)
+    component.log_event("anything", {"x": object()})
+
+
+def test_log_event_samples_configured_events(monkeypatch, caplog):
+    """Sampled events are dropped at the configured rate and carry the rate when kept."""
+    monkeypatch.setitem(LOGGING_CONFIG, "sample_rates", {"noisy": 0.0, "half": 0.5})
+    monkeypatch.setattr(logger_module.random, "random", lambda: 0.25)
+    component = Component()
+    component.logger.setLevel(logging.INFO)
+
+    with caplog.at_level(logging.INFO, logger="main.Component"):
+        component.log_event("noisy", {})
+        component.log_event("half", {})
+        component.log_event("always", {})
+        component.log_error("boom", "failed")
+
+    entries = [json.loads(record.getMessage()) for record in caplog.records]
+    assert [(e.get("event_type") or e["error_type"], e.get("sample_rate")) for e in entries] == [
+        ("half", 0.5), ("always", None), ("boom", None)
+    ]
+
+
+def test_mixin_events_reach_the_main_logger_handlers(tmp_path):
+    """Component loggers are children of main, so they inherit its level and handlers."""
+    main = logging.getLogger("main")
+    saved = main.level, list(main.handlers), logger_module._handlers.pop("main", None)
+    main.handlers.clear()
+    log_file = str(tmp_path / "main.log")
+    try:
+        setup_logger("main", log_file, level="INFO", use_queue=True)
+        component = Component()
+        assert component.logger.name == "main.Component"
+        assert component.logger.isEnabledFor(logging.INFO)
+        component.log_event("ping", {"n": 1})
+        component.log_error("boom", "failed")
+        shutdown_logging()
+    finally:
+        main.handlers[:] = saved[1]
+        main.setLevel(saved[0])
+        logger_module._handlers.pop("main", None)
+        if saved[2] is not None:
+            logger_module._handlers["main"] = saved[2]
+
+    lines = open(log_file).read().splitlines()
+    assert [json.loads(line.split("[main.Component] ", 1)[1]).get("event_type", "error") for line in lines] == \
+        ["ping", "error"]
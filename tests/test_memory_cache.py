@@ -0,0 +1,76 @@
+"""
+Test cases for the per-user memory context cache.
+"""
+from langgraph.store.memory import InMemoryStore
+
+from components.memory_cache import MemoryContext, MemoryContextCache, memory_context_cache
+from components.nodes import load_memory_context
+
+
+class CountingStore(InMemoryStore):
+    """InMemoryStore that counts batch round trips."""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = 0
+
+    def batch(self, ops):
+        self.batches += 1
+        return super().batch(ops)
+
+
+def make_context(todo="", profile="None", instructions=""):
+    return MemoryContext({"profile": profile, "todo": todo, "instructions": instructions})
+
+
+def test_cache_hits_and_write_through():
+    """Writers update their namespace in place instead of forcing a reload."""
+    cache = MemoryContextCache(max_users=10)
+    assert cache.get("u1") is None
+    cache.put("u1", cache.version("u1"), make_context(todo="old"))
+
+    cache.update("u1", "todo", "new")
+    context = cache.get("u1")
+
+    assert context.parts["todo"] == "new"
+    assert "new" in context.system_message
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_stale_put_is_rejected():
+    """A reader that started before a write cannot overwrite the newer snapshot."""
+    cache = MemoryContextCache(max_users=10)
+    version = cache.version("u1")
+    cache.invalidate("u1")
+
+    assert not cache.put("u1", version, make_context(todo="stale"))
+    assert cache.get("u1") is None
+
+
+def test_lru_eviction():
+    """The least recently used user is evicted first."""
+    cache = MemoryContextCache(max_users=2)
+    for user in ("a", "b"):
+        cache.put(user, cache.version(user), make_context())
+    cache.get("a")
+    cache.put("c", cache.version("c"), make_context())
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_load_memory_context_reads_store_once():
+    """The second task_mAIstro pass is served without touching the store."""
+    store = CountingStore()
+    store.put(("todo", "u1"), "t1", {"task": "Buy FIFA tickets"})
+    memory_context_cache.clear()
+
+    store.batches = 0
+    first = load_memory_context(store, "u1")
+    second = load_memory_context(store, "u1")
+
+    assert store.batches == 1
+    assert second is first
+    assert "Buy FIFA tickets" in second.system_message
@@ -0,0 +1,45 @@
+"""
+Test cases for compact memory rendering and the compiled prompt templates.
+"""
+from benchmarks.prompt_tokens import measure
+from components.cls import Profile, ToDo
+from components.memory_format import format_instructions, format_profile, format_todo
+from components.prompts import MODEL_SYSTEM_MESSAGE, MODEL_SYSTEM_TEMPLATE, PromptTemplate, TRUSTCALL_TEMPLATE
+
+
+def test_profile_drops_defaults():
+    """Null fields and empty lists are left out; an empty profile renders as None."""
+    profile = Profile(name="Sam", interests=["football", "food"]).model_dump(mode="json")
+
+    assert format_profile(profile) == "name: Sam; interests: football, food"
+    assert format_profile(Profile().model_dump(mode="json")) == "None"
+
+
+def test_todo_is_one_terse_line():
+    """Default status, missing deadline and empty solutions cost nothing."""
+    plain = ToDo(task="Buy a scarf", time_to_complete=None).model_dump(mode="json")
+    full = ToDo(task="Book a hotel", time_to_complete=30, deadline="2026-06-01T00:00:00",
+                solutions=["booking.com", "ask Omar"], status="in progress").model_dump(mode="json")
+
+    assert format_todo(plain) == "Buy a scarf"
+    assert format_todo(full) == "Book a hotel [in progress] ~30min due 2026-06-01 -> booking.com; ask Omar"
+    assert format_instructions({"memory": "Be brief"}) == "Be brief"
+
+
+def test_templates_format_like_str_format_after_a_static_prefix():
+    """Compiled templates match str.format, and user fields come after the shared prefix."""
+    values = {"user_profile": "name: Sam", "todo": "Buy a scarf", "instructions": "Be brief"}
+
+    assert MODEL_SYSTEM_TEMPLATE.format(**values) == MODEL_SYSTEM_MESSAGE.format(**values)
+    assert MODEL_SYSTEM_TEMPLATE.fields == ("user_profile", "todo", "instructions")
+    assert "Err on the side of updating the todo list" in MODEL_SYSTEM_TEMPLATE.prefix
+    assert TRUSTCALL_TEMPLATE.prefix.endswith("System Time: ")
+    assert PromptTemplate("no fields").format() == "no fields"
+
+
+def test_compact_rendering_saves_tokens():
+    """The token report shows the compact prompt smaller once there are memories."""
+    report = measure(20)
+
+    assert report["compact_prompt_tokens"] < 0.8 * report["repr_prompt_tokens"]
+    assert report["static_prefix_tokens"] > 300
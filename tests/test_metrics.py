@@ -0,0 +1,94 @@
+"""
+Test cases for the in-process metrics registry and its exporters.
+"""
+import json
+
+from langgraph.store.memory import InMemoryStore
+
+from components.data_loader import ChatMessage
+from components.llm_cache import ResponseCache
+from components.memory_cache import MemoryContext, memory_context_cache
+from components.metrics import (CACHE_HITS, CACHE_MISSES, MESSAGES, NODE_SECONDS, PRE_ROUTES, ROUTES, STORE_OPS,
+                                MeteredStore, MetricsExporter, MetricsRegistry, metrics)
+from components.registry import registry
+from components.store_access import read_memories, write_memories
+from tests.fakes import ToolCallingFake
+
+
+def test_prometheus_rendering():
+    """Counters, gauges and histograms render in the Prometheus text format."""
+    local = MetricsRegistry()
+    calls = local.counter("calls_total", "Calls", ("node",))
+    latency = local.histogram("latency_seconds", "Latency", ("node",), buckets=(0.1, 1.0))
+    calls.inc(node='say "hi"')
+    latency.observe(0.05, node="a")
+    latency.observe(5.0, node="a")
+
+    text = local.render_prometheus()
+
+    assert '# TYPE calls_total counter' in text
+    assert 'calls_total{node="say \\"hi\\""} 1.0' in text
+    assert 'latency_seconds_bucket{node="a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{node="a",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{node="a"} 2' in text
+    assert local.snapshot()["metrics"]["latency_seconds"]["values"][0]["p50"] == 0.1
+
+
+def test_metered_store_counts_ops_and_keeps_ttl():
+    """The store wrapper counts every op and still exposes the wrapped store's settings."""
+    store = MeteredStore(InMemoryStore())
+    before = STORE_OPS.value(op="PutOp"), STORE_OPS.value(op="SearchOp")
+
+    write_memories(store, ("todo", "u1"), {"a": {"task": "x"}, "b": {"task": "y"}})
+    read_memories(store, "u1")
+
+    assert STORE_OPS.value(op="PutOp") - before[0] == 2
+    assert STORE_OPS.value(op="SearchOp") - before[1] == 3
+    assert store.ttl_config is None and store.supports_ttl is False
+
+
+def test_cache_hits_and_misses_are_exported(tmp_path):
+    """Both caches' counters are read into gauges on every export."""
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    registry.set("llm_cache", cache)
+    try:
+        memory_context_cache.get("metrics-fan")
+        cache.lookup("prompt", "gpt-4o")
+        metrics.collect()
+        before = {name: (CACHE_HITS.value(cache=name), CACHE_MISSES.value(cache=name))
+                  for name in ("memory_context", "llm_response")}
+
+        memory_context_cache.get("metrics-fan")
+        memory_context_cache.put("metrics-fan", memory_context_cache.version("metrics-fan"),
+                                 MemoryContext({"profile": "None", "todo": "", "instructions": ""}))
+        memory_context_cache.get("metrics-fan")
+        cache.lookup("prompt", "gpt-4o")
+        metrics.collect()
+
+        assert CACHE_HITS.value(cache="memory_context") == before["memory_context"][0] + 1
+        assert CACHE_MISSES.value(cache="memory_context") == before["memory_context"][1] + 1
+        assert CACHE_MISSES.value(cache="llm_response") == before["llm_response"][1] + 1
+        assert 'nexusmind_cache_hits{cache="memory_context"}' in metrics.render_prometheus()
+    finally:
+        registry.reset()
+        memory_context_cache.invalidate("metrics-fan")
+        cache.close()
+
+
+def test_graph_run_records_nodes_routes_and_messages(make_system, tmp_path):
+    """A processed message shows up in the node, routing and message metrics and in the export."""
+    system = make_system(ToolCallingFake(responses=["Sounds fun!"]))
+    before = (NODE_SECONDS.count(node="task_mAIstro"), ROUTES.value(route="__end__"),
+              PRE_ROUTES.value(path="task_mAIstro"), MESSAGES.value(status="success"))
+    system.process_messages(messages=[ChatMessage("fan", "", "hi", 1)])
+
+    after = (NODE_SECONDS.count(node="task_mAIstro"), ROUTES.value(route="__end__"),
+             PRE_ROUTES.value(path="task_mAIstro"), MESSAGES.value(status="success"))
+    assert [b - a for a, b in zip(before, after)] == [1, 1, 1, 1]
+
+    exporter = MetricsExporter(metrics, str(tmp_path / "metrics.json"), format="json")
+    exporter.export()
+    snapshot = json.loads((tmp_path / "metrics.json").read_text())
+    errors = MESSAGES.value(status="error")
+    assert snapshot["metrics"]["nexusmind_error_rate"]["values"][0]["value"] == errors / (errors + after[3])
+    assert snapshot["metrics"]["nexusmind_memory_peak_rss_bytes"]["values"][0]["value"] > 0
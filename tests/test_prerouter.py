@@ -0,0 +1,111 @@
+"""
+Test cases for the local pre-router.
+"""
+from langchain_core.messages import HumanMessage
+
+from components.prerouter import HashedLogisticModel, PreRouter, evaluate, read_decisions
+from tests.fakes import ToolCallingFake
+
+CHATTER = [
+    "What a goal! The atmosphere is going to be insane",
+    "Argentina will win it again, no doubt",
+    "The stadiums in the USA are huge",
+    "Can't wait to see who qualifies",
+    "This World Cup will be the most commercialized ever",
+]
+UPDATES = [
+    "Please add buying tickets to my list",
+    "I live in Toronto and work as a nurse",
+    "Remind me to renew my passport",
+    "I need to book a hotel in Dallas",
+    "Put flights to Miami on the list",
+]
+
+
+def samples():
+    return [(text, False) for text in CHATTER] + [(text, True) for text in UPDATES]
+
+
+def trained_model():
+    return HashedLogisticModel(n_features=2 ** 12).fit(samples() * 20, epochs=5)
+
+
+def test_cues_always_reach_the_llm():
+    """Memory cues win over the model; without a model nothing is skipped."""
+    model = trained_model()
+    router = PreRouter(model, threshold=0.5, enabled=True)
+
+    assert router.decide("Remind me to renew my passport") == (False, 1.0, "cue")
+    assert router.decide("What a goal!").skip
+    assert not PreRouter(model, threshold=0.5, enabled=False).should_skip("What a goal!")
+    assert PreRouter(enabled=True).decide("What a goal!") == (False, 0.0, "no_model")
+
+
+def test_model_learns_from_logged_decisions(tmp_path):
+    """The hashed model separates chatter from updates and survives save/load."""
+    model = trained_model()
+    path = str(tmp_path / "prerouter.json")
+    model.save(path)
+    loaded = HashedLogisticModel.load(path)
+
+    assert loaded.predict_proba("Put flights to Miami on the list") > 0.5
+    assert loaded.predict_proba("Argentina will win it again, no doubt") < 0.5
+    report = evaluate(PreRouter(loaded), samples(), thresholds=(0.5,))
+    assert report[0.5] == {"precision": 1.0, "recall": 1.0, "skip_rate": 0.5}
+
+
+def test_observe_scores_against_the_llm_and_logs(tmp_path):
+    """Precision and recall of the skip path are measured against the LLM router."""
+    log_path = str(tmp_path / "routing_log.jsonl")
+    model = trained_model()
+    router = PreRouter(model, threshold=0.5, log_path=log_path)
+
+    router.observe("What a goal!", needs_update=False)  # would skip, LLM agrees
+    router.observe("Argentina will win it again, no doubt", needs_update=True)  # would skip, LLM disagrees
+    router.observe("Remind me about the final", needs_update=False)  # cue, LLM said END
+
+    stats = router.stats()
+    assert (stats["tp"], stats["fp"], stats["fn"]) == (1, 1, 1)
+    assert stats["precision"] == 0.5 and stats["recall"] == 0.5
+    assert read_decisions(log_path)[1] == ("Argentina will win it again, no doubt", True)
+
+
+def test_shadow_rate_sends_some_skips_to_the_llm():
+    """Shadowed skips keep feeding the precision estimate once enabled."""
+    model = trained_model()
+    router = PreRouter(model, threshold=0.5, enabled=True, shadow_rate=0.5, seed=1)
+
+    skipped = sum(router.should_skip("What a goal!") for _ in range(200))
+
+    assert 0 < skipped < 200
+    assert router.stats()["shadowed"] == 200 - skipped
+
+
+def test_shadowed_skips_are_weighted_by_the_shadow_rate():
+    """With a 10% shadow rate one observed skip stands for ten, so precision/recall stay unbiased."""
+    model = trained_model()
+    router = PreRouter(model, threshold=0.5, enabled=True, shadow_rate=0.1)
+
+    router.observe("What a goal!", needs_update=False)  # shadowed skip, LLM agrees
+    for _ in range(10):
+        router.observe("Remind me about the final", needs_update=False)  # cue, LLM said END
+
+    stats = router.stats()
+    assert (stats["tp"], stats["fn"]) == (10, 10)
+    assert stats["precision"] == 1.0 and stats["recall"] == 0.5
+
+
+def test_graph_skips_task_maistro_for_chatter(make_system):
+    """Chatter takes quick_reply without a model call; cues still go through the LLM."""
+    chat = ToolCallingFake(responses=["Noted."])
+    router = PreRouter(trained_model(), threshold=0.5, enabled=True)
+    system = make_system(chat, prerouter=router)
+    config = system.thread_config("fan")
+
+    chatter = system.graph.invoke({"messages": [HumanMessage(content="What a goal!")]}, config)
+    assert chat.i == 0 and chatter["messages"][-1].type == "human"
+
+    update = system.graph.invoke({"messages": [HumanMessage(content="Remind me to buy a scarf")]}, config)
+    assert update["messages"][-1].content == "Noted."
+
+    assert router.stats()["skipped"] == 1 and router.stats()["tn"] == 0 and router.stats()["fn"] == 1
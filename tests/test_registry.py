@@ -0,0 +1,45 @@
+"""
+Test cases for the shared model/extractor registry.
+"""
+from components.registry import ModelRegistry, registry
+from tests.fakes import ToolCallingFake
+
+
+def test_components_are_built_once():
+    """Repeated lookups share one instance and one factory call."""
+    calls = []
+    local = ModelRegistry()
+    local.register("thing", lambda reg: calls.append(1) or object())
+
+    assert local.get("thing") is local.get("thing")
+    assert calls == [1]
+
+
+def test_extractors_share_the_chat_model_and_spies_are_per_call():
+    """Extractors are built once on the shared model; each call gets its own spy."""
+    fake = ToolCallingFake(responses=["ok"])
+    registry.set("chat", fake)
+    try:
+        first, first_spy = registry.with_spy("todo_extractor")
+        second, second_spy = registry.with_spy("todo_extractor")
+
+        assert first.bound is second.bound
+        assert first.bound is registry.get("todo_extractor")
+        assert first_spy is not second_spy
+        assert registry.get("chat") is fake
+    finally:
+        registry.reset()
+
+
+def test_default_chat_model_uses_pooled_client(monkeypatch):
+    """Every default model shares the registry's HTTP client."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    local = ModelRegistry()
+    local.register("scheduler", registry._factories["scheduler"])
+    local.register("http_clients", registry._factories["http_clients"])
+    local.register("llm_cache", registry._factories["llm_cache"])
+    local.register("chat", registry._factories["chat"])
+
+    http_client, _ = local.get("http_clients")
+
+    assert local.get("chat").http_client is http_client
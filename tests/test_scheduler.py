@@ -0,0 +1,135 @@
+"""
+Test cases for client-side rate limiting, AIMD concurrency and node retries.
+"""
+import asyncio
+import threading
+
+import httpx
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from components.scheduler import (AIMDLimiter, AsyncScheduledTransport, CallScheduler, ScheduledTransport,
+                                  TokenBucket, is_transient, node_retry_policy)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_reserves_in_order():
+    """Beyond the burst, each reservation waits for the refill it needs."""
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)  # one token per second
+
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    assert bucket.reserve(1) == pytest.approx(2.0)
+    clock.now = 10.0
+    assert bucket.reserve(1) == 0.0
+
+
+def test_aimd_backs_off_once_per_burst_and_recovers():
+    """Simultaneous 429s halve the limit once; successes grow it back."""
+    clock = FakeClock()
+    limiter = AIMDLimiter(8, maximum=8, clock=clock)
+    for _ in range(4):
+        limiter.acquire()
+    for _ in range(4):
+        limiter.release("throttled")
+
+    assert limiter.limit == 4
+    for _ in range(40):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.limit == 8
+
+
+def test_transport_backs_off_on_429():
+    """A 429 shrinks the concurrency limit and honours Retry-After."""
+    clock = FakeClock()
+    scheduler = CallScheduler(600, 100000, concurrency=10, max_concurrency=10, clock=clock)
+    responses = iter([httpx.Response(429, headers={"retry-after": "2"}), httpx.Response(200, json={})])
+    transport = ScheduledTransport(httpx.MockTransport(lambda request: next(responses)), scheduler)
+    client = httpx.Client(transport=transport)
+
+    assert client.post("https://api.test/v1/chat", json={"messages": []}).status_code == 429
+    assert scheduler.stats()["concurrency_limit"] == 5
+    assert scheduler._delay(1) == pytest.approx(2.0)
+    assert client.post("https://api.test/v1/chat", json={}).status_code == 200
+    assert scheduler.stats()["in_flight"] == 0 and scheduler.stats()["throttled"] == 1
+
+
+def test_server_errors_keep_the_limit_and_streams_hold_their_slot():
+    """A 5xx neither grows nor shrinks the limit; a streamed body holds its slot until closed."""
+    scheduler = CallScheduler(600, 100000, concurrency=2, max_concurrency=10)
+    responses = iter([httpx.Response(500), httpx.Response(200, content=iter([b"{", b"}"]))])
+    client = httpx.Client(transport=ScheduledTransport(httpx.MockTransport(lambda request: next(responses)),
+                                                       scheduler))
+
+    assert client.post("https://api.test/v1/chat", json={}).status_code == 500
+    assert scheduler.stats()["errors"] == 1 and scheduler.limiter.limit == 2
+    with client.stream("POST", "https://api.test/v1/chat", json={}) as response:
+        assert scheduler.stats()["in_flight"] == 1
+        assert response.read() == b"{}"
+    assert scheduler.stats()["in_flight"] == 0 and scheduler.limiter.limit == 2.5
+
+
+def test_async_waiters_are_woken_by_release_from_any_thread():
+    """aacquire waits on a future, not a poll, and a release from another thread wakes it."""
+    scheduler = CallScheduler(600, 100000, concurrency=1, max_concurrency=1)
+    transport = AsyncScheduledTransport(httpx.MockTransport(lambda request: httpx.Response(200, json={})), scheduler)
+
+    async def main():
+        scheduler.limiter.acquire()
+        async with httpx.AsyncClient(transport=transport) as client:
+            request = asyncio.create_task(client.post("https://api.test/v1/chat", json={}))
+            await asyncio.sleep(0.05)
+            assert not request.done() and len(scheduler.limiter._waiters) == 1
+            threading.Thread(target=scheduler.limiter.release).start()
+            return (await asyncio.wait_for(request, 1)).status_code
+
+    assert asyncio.run(main()) == 200
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_cancelled_quota_waits_hand_back_their_slot():
+    """A caller cancelled while waiting for the token bucket releases its slot without moving the limit."""
+    scheduler = CallScheduler(60, 100000, concurrency=2, max_concurrency=4)
+    scheduler.requests.reserve(60)  # the next request waits about a second
+
+    async def main():
+        waiting = asyncio.create_task(scheduler.aacquire(1))
+        await asyncio.sleep(0.05)
+        assert scheduler.stats()["in_flight"] == 1
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+    asyncio.run(main())
+    assert scheduler.stats()["in_flight"] == 0 and scheduler.stats()["concurrency_limit"] == 2
+
+
+def test_transient_errors_are_retried_at_node_level():
+    """Nodes that hit throttling or timeouts are retried; other errors fail fast."""
+    attempts = []
+
+    def flaky(state):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise httpx.ReadTimeout("slow provider")
+        return {"messages": [("ai", "done")]}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node(flaky, retry_policy=node_retry_policy({"retry_delay": 0.001, "max_retries": 3}))
+    builder.add_edge(START, "flaky")
+    builder.add_edge("flaky", END)
+
+    result = builder.compile().invoke({"messages": [HumanMessage(content="hi")]})
+
+    assert len(attempts) == 3 and result["messages"][-1].content == "done"
+    assert not is_transient(ValueError("bad tool call"))
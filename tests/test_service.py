@@ -0,0 +1,153 @@
+"""
+Test cases for the asyncio HTTP service.
+"""
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from benchmarks.fake_llm import FakeChatModel
+from components.prerouter import PreRouter
+from components.service import ChatService
+from tests.fakes import ToolCallingFake
+from tests.test_prerouter import trained_model
+
+
+@pytest.fixture
+def make_service(make_system):
+    def build(latency_ms: float = 0.0, **config) -> ChatService:
+        return ChatService(make_system(FakeChatModel(latency_ms=latency_ms)), {"port": 0, **config})
+    return build
+
+
+async def with_client(service: ChatService, scenario):
+    await service.start()
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{service.port}") as client:
+            return await scenario(client)
+    finally:
+        await service.stop()
+
+
+def test_submit_and_read_memories(make_service):
+    """A submission runs the graph and its memories can be read back over the same connection."""
+    async def scenario(client):
+        reply = await client.post("/messages", json={"user_id": "fan 1", "message": "Remind me to book a hotel"})
+        memories = await client.get("/users/fan%201/memories")
+        bad = await client.post("/messages", json={"message": "no user"})
+        missing = await client.get("/nowhere")
+        health = await client.get("/health")
+        return reply, memories, bad, missing, health
+
+    reply, memories, bad, missing, health = asyncio.run(with_client(make_service(), scenario))
+
+    assert reply.status_code == 200 and reply.json()["reply"] == "Got it, I've updated your memory."
+    assert memories.json()["todo"][0]["task"] == "Remind me to book a hotel"
+    assert (bad.status_code, missing.status_code) == (400, 404)
+    assert health.json()["pending"] == 0
+
+
+def test_skipped_turns_without_quick_reply_have_no_reply(make_system):
+    """A pre-routed turn that gets no AI message replies null, not with the user's text or an older reply."""
+    router = PreRouter(trained_model(), threshold=0.5, enabled=True)
+    service = ChatService(make_system(ToolCallingFake(responses=["Noted."]), prerouter=router), {"port": 0})
+
+    async def scenario(client):
+        update = await client.post("/messages", json={"user_id": "fan", "message": "Remind me to buy a scarf"})
+        chatter = await client.post("/messages", json={"user_id": "fan", "message": "What a goal!"})
+        return update.json(), chatter.json()
+
+    update, chatter = asyncio.run(with_client(service, scenario))
+
+    assert update["reply"] == "Noted."
+    assert chatter["status"] == "success" and chatter["reply"] is None
+
+
+def test_streamed_submission_sends_tokens_then_latencies(make_service):
+    """POST /messages/stream answers NDJSON token lines and a final status line."""
+    async def scenario(client):
+        async with client.stream("POST", "/messages/stream",
+                                 json={"user_id": "svc_stream", "message": "Add a todo to buy a scarf"}) as response:
+            lines = [json.loads(line) async for line in response.aiter_lines() if line]
+            content_type = response.headers["content-type"]
+        memories = (await client.get("/users/svc_stream/memories")).json()
+        return content_type, lines, memories
+
+    content_type, lines, memories = asyncio.run(with_client(make_service(), scenario))
+    assert content_type == "application/x-ndjson"
+    assert "".join(line["token"] for line in lines[:-1]) == "Got it, I've updated your memory."
+    assert lines[-1]["status"] == "success"
+    assert 0 < lines[-1]["ttft_ms"] <= lines[-1]["reply_ms"]
+    assert [todo["task"] for todo in memories["todo"]] == ["Add a todo to buy a scarf"]
+
+
+def test_saturation_and_per_user_limits_shed_with_429(make_service):
+    """Beyond max_pending, or a user's in-flight limit, requests are refused at once."""
+    async def scenario(client):
+        async def post(user):
+            return await client.post("/messages", json={"user_id": user, "message": "What a goal!"})
+        same_user = await asyncio.gather(post("a"), post("a"))
+        crowd = await asyncio.gather(*(post(f"u{i}") for i in range(5)))
+        return same_user, crowd
+
+    service = make_service(latency_ms=200, max_pending=3, per_user_in_flight=1)
+    same_user, crowd = asyncio.run(with_client(service, scenario))
+
+    assert sorted(r.status_code for r in same_user) == [200, 429]
+    assert sorted(r.status_code for r in crowd) == [200, 200, 200, 429, 429]
+    assert all(r.headers["retry-after"] == "1" for r in crowd if r.status_code == 429)
+    assert service.admission.stats()["shed"] == 3 and service.admission.pending == 0
+
+
+def test_hundreds_of_sessions_share_one_loop(make_service):
+    """Hundreds of concurrent sessions complete on one event loop without a thread each."""
+    async def scenario(client):
+        return await asyncio.gather(*(
+            client.post("/messages", json={"user_id": f"fan{i}", "message": "What a goal!"}) for i in range(200)
+        ))
+
+    limits = httpx.Limits(max_connections=200)
+    service = make_service(latency_ms=50, max_concurrency=200)
+
+    async def run():
+        await service.start()
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{service.port}", limits=limits) as client:
+                return await scenario(client)
+        finally:
+            await service.stop()
+
+    responses = asyncio.run(run())
+    assert all(r.status_code == 200 for r in responses)
+
+
+def test_concurrent_runs_await_their_model_calls(make_system):
+    """arespond runs the async node path: model calls are awaited on the loop, not run on executor threads."""
+    class CountingModel(FakeChatModel):
+        sync_calls: int = 0
+        async_calls: int = 0
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            self.sync_calls += 1
+            return super()._generate(messages, stop, run_manager, **kwargs)
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+            self.async_calls += 1
+            return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+    model = CountingModel(latency_ms=200)
+    system = make_system(model)
+
+    async def main():
+        started = time.perf_counter()
+        results = await asyncio.gather(*(system.arespond(f"fan{i}", ["What a goal!"]) for i in range(50)))
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(main())
+
+    assert all(result["status"] == "success" for result in results)
+    assert model.sync_calls == 0 and model.async_calls >= 50
+    # 50 replies of 200 ms each overlap; on a handful of executor threads they would take seconds
+    assert elapsed < 2.0
@@ -0,0 +1,99 @@
+"""
+Test cases for sharded multi-process execution.
+"""
+import functools
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app import RecommendationSystem
+from benchmarks.fake_llm import install
+from components.context_window import TokenAccountant
+from components.data_loader import ChatMessage
+from components.metrics import MESSAGES, MetricsRegistry
+from components.sharding import ShardedRunner, _slim, shard_for
+from config import MEMORY_CONFIG
+
+
+def test_shards_are_stable_and_spread():
+    """A user always maps to the same shard, and users spread over every shard."""
+    users = [f"fan{i}" for i in range(200)]
+
+    assert [shard_for(u, 4) for u in users] == [shard_for(u, 4) for u in users]
+    assert {shard_for(u, 4) for u in users} == {0, 1, 2, 3}
+
+
+def test_metrics_and_token_totals_merge():
+    """A worker's dump adds counters and histogram buckets into the coordinator's families."""
+    worker, coordinator = MetricsRegistry(), MetricsRegistry()
+    for registry in (worker, coordinator):
+        registry.counter("calls_total", "Calls", ("node",))
+        registry.histogram("latency_seconds", "Latency", buckets=(1.0,))
+        registry.gauge("rss_bytes", "RSS")
+    worker.counter("calls_total", "Calls", ("node",)).inc(2, node="a")
+    worker.histogram("latency_seconds", "Latency").observe(0.5)
+    worker.gauge("rss_bytes", "RSS").set(10)
+    coordinator.counter("calls_total", "Calls", ("node",)).inc(1, node="a")
+
+    coordinator.merge(worker.dump())
+    coordinator.merge(worker.dump())
+
+    assert coordinator.counter("calls_total", "Calls").value(node="a") == 5
+    assert coordinator.histogram("latency_seconds", "Latency").count() == 2
+    assert coordinator.gauge("rss_bytes", "RSS").value() == 0.0
+
+    totals = TokenAccountant()
+    totals.merge({"task_mAIstro": {"calls": 2, "prompt_tokens": 50, "max_prompt_tokens": 30}})
+    totals.merge({"task_mAIstro": {"calls": 1, "prompt_tokens": 40, "max_prompt_tokens": 40}})
+    assert totals.snapshot() == {"task_mAIstro": {"calls": 3, "prompt_tokens": 90, "max_prompt_tokens": 40}}
+
+
+def test_slim_results_reply_only_with_the_turns_ai_message():
+    """A turn the graph ended without an AI message has no reply rather than the user's own text."""
+    thread = [HumanMessage(content="Remind me"), AIMessage(content="Noted."), HumanMessage(content="What a goal!")]
+
+    assert _slim({"status": "success", "result": {"messages": thread[:2]}})["reply"] == "Noted."
+    assert _slim({"status": "success", "result": {"messages": thread}})["reply"] is None
+
+
+def test_sharded_runs_refuse_private_in_memory_stores(monkeypatch):
+    """Workers would each keep their own in-memory store, so the run is refused up front."""
+    monkeypatch.setitem(MEMORY_CONFIG, "store_type", "in_memory")
+
+    with pytest.raises(ValueError, match="sqlite"):
+        ShardedRunner(workers=2, start_workers=False).run([ChatMessage("fan", "", "What a goal!", 0)])
+
+
+def test_process_sharded_runs_workers_and_merges_results(monkeypatch, tmp_path):
+    """Worker processes answer every message; results come back in input order with metrics merged."""
+    monkeypatch.setitem(MEMORY_CONFIG, "store_type", "sqlite")
+    monkeypatch.setitem(MEMORY_CONFIG, "sqlite_path", str(tmp_path / "memory.sqlite"))
+    messages = [ChatMessage(f"fan{i % 7}", "", "Remind me to book a hotel" if i % 3 == 0 else "What a goal!", i)
+                for i in range(30)]
+    system = RecommendationSystem(standalone=False)
+    before = MESSAGES.value(status="success")
+
+    results = system.process_sharded(messages=messages, workers=2, initializer=functools.partial(install))
+
+    assert [r["user_id"] for r in results] == [m.user_id for m in messages]
+    assert all(r["status"] == "success" and "result" not in r for r in results)
+    assert results[0]["reply"] == "Got it, I've updated your memory."
+    assert {r["shard"] for r in results} == {shard_for(m.user_id, 2) for m in messages}
+    assert MESSAGES.value(status="success") - before == 30
+
+
+def test_coalesced_bursts_keep_the_position_of_their_first_message(monkeypatch, tmp_path):
+    """A burst that closes after later users' bursts is still ordered by its first message."""
+    monkeypatch.setitem(MEMORY_CONFIG, "store_type", "sqlite")
+    monkeypatch.setitem(MEMORY_CONFIG, "sqlite_path", str(tmp_path / "memory.sqlite"))
+    stamp = "March 1, 2025, 10:{:02d} AM"
+    messages = ([ChatMessage("alice", stamp.format(0), "What a goal!", 0)]
+                + [ChatMessage("bob", stamp.format(0), f"Goal number {i}", i) for i in range(1, 6)]
+                + [ChatMessage("alice", stamp.format(0), "Unreal", 6), ChatMessage("carol", stamp.format(5), "Hi", 7)])
+    system = RecommendationSystem(standalone=False)
+
+    results = system.process_sharded(messages=messages, workers=1, coalesce=True,
+                                     initializer=functools.partial(install))
+
+    assert [(r["user_id"], r["seq"], r["messages_count"]) for r in results] == [
+        ("alice", 0, 2), ("bob", 1, 5), ("carol", 7, 1)]
@@ -0,0 +1,105 @@
+"""
+Test cases for snapshots of the memory store and checkpoints.
+"""
+import asyncio
+
+import pytest
+
+from components import snapshot
+from components.snapshot import Snapshotter
+from components.stores import create_store
+from components.store_access import read_namespace
+
+MESSAGES = {"snap_a": ["Add a todo to book a hotel in Miami", "I live in Miami"],
+            "snap_b": ["Remind me to buy a scarf", "What a match!"]}
+
+
+@pytest.fixture
+def warm_system(make_system):
+    system = make_system()
+
+    async def run():
+        for user_id, texts in MESSAGES.items():
+            for text in texts:
+                assert (await system.arespond(user_id, [text]))["status"] == "success"
+
+    asyncio.run(run())
+    return system
+
+
+def test_snapshot_round_trip_restores_memories_and_threads(make_system, warm_system, tmp_path):
+    """Memories keep their keys, values and timestamps, and threads carry on from their last checkpoint."""
+    path = str(tmp_path / "snapshot.bin")
+    written = warm_system.snapshot(path)
+
+    restored = make_system()
+    loaded = restored.restore(path)
+
+    assert loaded["items"] == written["items"] > 0
+    assert loaded["checkpoints"] == written["checkpoints"] > 0
+    for user_id in MESSAGES:
+        before = warm_system.get_user_memories(user_id)
+        after = restored.get_user_memories(user_id)
+        for memory_type in before:
+            assert [(i.key, i.value, i.updated_at) for i in after[memory_type]] == \
+                   [(i.key, i.value, i.updated_at) for i in before[memory_type]]
+        config = warm_system.thread_config(user_id)
+        assert restored.graph.get_state(config).values["messages"] == \
+               warm_system.graph.get_state(config).values["messages"]
+
+    # The restored thread carries on where it left off
+    result = asyncio.run(restored.arespond("snap_b", ["Nice weather today"]))
+    assert len(result["result"]["messages"]) == len(warm_system.graph.get_state(
+        warm_system.thread_config("snap_b")).values["messages"]) + 2
+
+
+def test_truncated_snapshot_is_refused_before_loading(make_system, warm_system, tmp_path):
+    """A cut-off file or a foreign one raises before anything is restored."""
+    path = tmp_path / "snapshot.bin"
+    warm_system.snapshot(str(path))
+    path.write_bytes(path.read_bytes()[:-3])
+
+    restored = make_system()
+    with pytest.raises(ValueError, match="truncated"):
+        restored.restore(str(path))
+    assert restored.get_user_memories("snap_a")["todo"] == []
+
+    path.write_bytes(b"not a snapshot")
+    with pytest.raises(ValueError, match="not a snapshot"):
+        restored.restore(str(path))
+
+
+def test_snapshot_restores_into_other_stores(warm_system, tmp_path):
+    """Items go into a sqlite store through batched puts."""
+    path = str(tmp_path / "snapshot.bin")
+    Snapshotter({"frame_items": 1}).write(path, warm_system.across_thread_memory)
+    store = create_store({"store_type": "sqlite", "sqlite_path": str(tmp_path / "memory.sqlite"), "ttl": None})
+    try:
+        stats = Snapshotter().load(path, store)
+        assert stats["checkpoints"] == 0
+        assert [item.value for item in read_namespace(store, ("todo", "snap_b"))] == \
+               [item.value for item in read_namespace(warm_system.across_thread_memory, ("todo", "snap_b"))]
+    finally:
+        store.close()
+
+
+def test_public_api_path_writes_and_reads_the_same_frames(make_system, warm_system, tmp_path, monkeypatch):
+    """Without the in-memory internals, search/list and put/put_writes round-trip the same snapshot."""
+    raw_path = str(tmp_path / "raw.bin")
+    warm_system.snapshot(raw_path)
+    monkeypatch.setattr(snapshot, "_raw_store", lambda store: False)
+    monkeypatch.setattr(snapshot, "_raw_saver", lambda saver: False)
+    path = str(tmp_path / "public.bin")
+    written = warm_system.snapshot(path)
+
+    for source in (path, raw_path):
+        restored = make_system()
+        loaded = restored.restore(source)
+        assert loaded["items"] == written["items"] and loaded["checkpoints"] == written["checkpoints"]
+        for user_id in MESSAGES:
+            assert [i.value for i in restored.get_user_memories(user_id)["todo"]] == \
+                   [i.value for i in warm_system.get_user_memories(user_id)["todo"]]
+            config = warm_system.thread_config(user_id)
+            assert restored.graph.get_state(config).values == warm_system.graph.get_state(config).values
+            assert len(list(restored.within_thread_memory.list(config))) == \
+                   len(list(warm_system.within_thread_memory.list(config)))
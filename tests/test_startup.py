@@ -0,0 +1,55 @@
+"""
+Test cases for worker cold start.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous enough for slow CI machines; importing langgraph alone is ~1s
+IMPORT_BUDGET_SECONDS = 5.0
+
+HEAVY_MODULES = ("langchain_openai", "openai", "trustcall")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+@pytest.fixture
+def import_report(tmp_path):
+    env = {**os.environ, "PYTHONPATH": REPO_ROOT}
+    env.pop("OPENAI_API_KEY", None)
+    output = subprocess.run([sys.executable, "-c", PROBE], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1]), tmp_path
+
+
+def test_import_is_lazy_and_within_budget(import_report):
+    """Importing the app builds no clients, loads no SDKs and creates no files."""
+    report, cwd = import_report
+
+    assert report["loaded"] == []
+    assert report["elapsed"] < IMPORT_BUDGET_SECONDS
+    assert list(cwd.iterdir()) == []
+
+
+def test_warmup_builds_components_in_background():
+    """warmup() returns at once and builds every requested component."""
+    from components.registry import ModelRegistry
+
+    local = ModelRegistry()
+    local.register("a", lambda reg: "built-a")
+    local.register("b", lambda reg: reg.get("a") + "-b")
+
+    local.warmup().join(timeout=5)
+
+    assert local._instances == {"a": "built-a", "b": "built-a-b"}
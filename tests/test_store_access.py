@@ -0,0 +1,45 @@
+"""
+Test cases for batched memory store access.
+"""
+from langgraph.store.memory import InMemoryStore
+
+from components.store_access import get_memories_for_users, read_memories, write_memories
+
+
+class CountingStore(InMemoryStore):
+    """InMemoryStore that counts batch round trips."""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = 0
+
+    def batch(self, ops):
+        self.batches += 1
+        return super().batch(ops)
+
+
+def test_writes_and_reads_are_single_batches():
+    """Several puts and several namespace searches each cost one round trip."""
+    store = CountingStore()
+
+    write_memories(store, ("todo", "u1"), {"a": {"task": "A"}, "b": {"task": "B"}})
+    memories = read_memories(store, "u1")
+
+    assert store.batches == 2
+    assert [item.key for item in memories["todo"]] == ["a", "b"]
+    assert memories["profile"] == [] and memories["instructions"] == []
+
+
+def test_get_memories_for_users():
+    """Memories of many users come back grouped by user and type from one batch."""
+    store = CountingStore()
+    write_memories(store, ("profile", "u1"), {"p": {"name": "Ana"}})
+    write_memories(store, ("todo", "u2"), {"t": {"task": "Book hotel"}})
+    store.batches = 0
+
+    memories = get_memories_for_users(store, ["u1", "u2", "u1"])
+
+    assert store.batches == 1
+    assert list(memories) == ["u1", "u2"]
+    assert memories["u1"]["profile"][0].value == {"name": "Ana"}
+    assert memories["u2"]["todo"][0].value == {"task": "Book hotel"}
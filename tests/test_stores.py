@@ -0,0 +1,67 @@
+"""
+Test cases for the memory store backends.
+"""
+import asyncio
+import time
+
+import pytest
+from langgraph.store.memory import InMemoryStore
+
+from components.stores import SqliteMemoryStore, create_store
+
+
+def make_store(tmp_path, **kwargs):
+    store = SqliteMemoryStore(str(tmp_path / "memory.sqlite"), **kwargs)
+    store.setup()
+    return store
+
+
+def test_create_store_honors_store_type(tmp_path):
+    """The factory builds the backend named in the config."""
+    assert isinstance(create_store({"store_type": "in_memory"}), InMemoryStore)
+    store = create_store({"store_type": "sqlite", "sqlite_path": str(tmp_path / "m.sqlite")})
+    try:
+        assert isinstance(store, SqliteMemoryStore)
+        assert store.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        store.close()
+    for store_type in ("bogus", "redis"):
+        with pytest.raises(ValueError):
+            create_store({"store_type": store_type})
+
+
+def test_sweep_enforces_max_items_per_namespace(tmp_path):
+    """Only the newest max_items of each namespace survive a sweep."""
+    swept = []
+    store = make_store(tmp_path, max_items=2, on_sweep=swept.append)
+    for i in range(4):
+        store.put(("todo", "u1"), f"t{i}", {"task": str(i)})
+    store.put(("todo", "u2"), "only", {"task": "kept"})
+
+    assert store.sweep() == 2
+    assert sorted(item.key for item in store.search(("todo", "u1"))) == ["t2", "t3"]
+    assert len(store.search(("todo", "u2"))) == 1
+    assert swept == [{("todo", "u1")}]
+    store.close()
+
+
+def test_sweep_removes_expired_items(tmp_path):
+    """Items older than the TTL are deleted by the sweeper."""
+    store = make_store(tmp_path, ttl=0.5)
+    store.put(("profile", "u1"), "p", {"name": "Ana"})
+    time.sleep(1.6)
+
+    assert store.sweep() == 1
+    assert store.search(("profile", "u1")) == []
+    store.close()
+
+
+def test_async_batch_persists_across_reopen(tmp_path):
+    """abatch works for graph.ainvoke and data survives a restart."""
+    store = make_store(tmp_path)
+    asyncio.run(store.aput(("instructions", "u1"), "user_instructions", {"memory": "be brief"}))
+    store.close()
+
+    reopened = make_store(tmp_path)
+    assert reopened.get(("instructions", "u1"), "user_instructions").value == {"memory": "be brief"}
+    reopened.close()
@@ -0,0 +1,70 @@
+"""
+Test cases for token streaming of replies.
+"""
+import asyncio
+
+from benchmarks.fake_llm import FakeChatModel
+from components.metrics import TTFT_SECONDS
+
+
+def test_stream_yields_reply_tokens_before_the_run_ends(make_system):
+    """Chatter is streamed word by word and the latencies are ordered ttft <= reply <= total."""
+    system = make_system(FakeChatModel(latency_ms=20, token_ms=5))
+    observed = TTFT_SECONDS.count()
+
+    async def run():
+        stream = system.astream_reply("stream_user", ["What a match that was last night!"])
+        tokens = [token async for token in stream]
+        state = await stream.finished()
+        return stream, tokens, state
+
+    stream, tokens, state = asyncio.run(run())
+    assert tokens == ["Sounds ", "exciting!"]
+    assert stream.tokens == 2
+    assert stream.reply.content == "Sounds exciting!"
+    assert state["messages"][-1].content == "Sounds exciting!"
+    assert 0 < stream.ttft <= stream.reply_seconds <= stream.total
+    assert TTFT_SECONDS.count() == observed + 1
+
+
+def test_stream_skips_tool_calls_and_finishes_memory_updates(make_system):
+    """Only the confirmation is streamed; the todo is stored by the time the run has finished."""
+    system = make_system()
+
+    async def run():
+        stream = system.astream_reply("stream_user", ["Add a todo to book a hotel in Miami"])
+        tokens = [token async for token in stream]
+        await stream.finished()
+        return tokens
+
+    tokens = asyncio.run(run())
+    todos = system.get_user_memories("stream_user")["todo"]
+    assert "".join(tokens) == "Got it, I've updated your memory."
+    assert [todo.value["task"] for todo in todos] == ["Add a todo to book a hotel in Miami"]
+
+
+def test_stream_surfaces_model_errors(make_system):
+    """A failing run ends iteration with its error, and finished raises it too."""
+    class BrokenModel(FakeChatModel):
+        def _respond(self, messages, **kwargs):
+            raise ValueError("model down")
+
+    system = make_system(BrokenModel())
+
+    async def run():
+        stream = system.astream_reply("stream_user", ["Hello there"])
+        errors = []
+        try:
+            async for _ in stream:
+                pass
+        except ValueError as e:
+            errors.append(str(e))
+        try:
+            await stream.finished()
+        except ValueError as e:
+            errors.append(str(e))
+        return stream, errors
+
+    stream, errors = asyncio.run(run())
+    assert errors == ["model down", "model down"]
+    assert stream.ttft is None
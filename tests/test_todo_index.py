@@ -0,0 +1,98 @@
+"""
+Test cases for the per-user todo index behind task_mAIstro's prompt.
+"""
+from typing import List
+
+from langchain_core.messages import HumanMessage
+from langgraph.store.memory import InMemoryStore
+
+from benchmarks.todo_prompt import run
+from components.store_access import write_memories
+from components.todo_index import TodoIndex, TodoIndexCache
+from config import MEMORY_CONFIG
+from tests.fakes import ToolCallingFake
+
+
+class RecordingFake(ToolCallingFake):
+    """Fake chat model that keeps the system prompt of every call."""
+
+    prompts: List[str] = []
+
+    def _call(self, messages, *args, **kwargs):
+        self.prompts.append(messages[0].content)
+        return super()._call(messages, *args, **kwargs)
+
+
+def todo(task, status="not started", solutions=()):
+    return {"task": task, "status": status, "solutions": list(solutions)}
+
+
+def test_search_ranks_relevant_todos_and_skips_archived():
+    """Matching todos come first, archived ones never, unmatched ones newest first."""
+    index = TodoIndex()
+    index.update({
+        "hotel": todo("Book a hotel in Miami"),
+        "old": todo("Book a hotel in Miami for 2022", status="archived"),
+        "passport": todo("Renew passport"),
+        "jersey": todo("Order a jersey", solutions=["Miami store"]),
+        "bar": todo("Find a sports bar")
+    })
+
+    keys = [key for key, _ in index.search("Did I book the Miami hotel?", 4)]
+
+    assert keys == ["hotel", "jersey", "bar", "passport"]
+
+
+def test_incremental_updates_replace_and_delete():
+    """Rewriting a todo reindexes its text; deleting drops it from every term."""
+    index = TodoIndex()
+    index.put("t1", todo("Buy tickets"))
+    index.put("t1", todo("Buy scarf"))
+    index.put("t2", todo("Buy tickets for Dallas"))
+    index.delete("t2")
+
+    assert index.search("tickets", 5) == [("t1", todo("Buy scarf"))]
+    assert "tickets" not in index._postings and len(index) == 1
+
+
+def test_cache_builds_from_the_store_and_follows_writes():
+    """The first lookup pages through the namespace; later writes land without a store read."""
+    store = InMemoryStore()
+    write_memories(store, ("todo", "u1"), {f"t{i}": todo(f"Task number {i}") for i in range(150)})
+    indexes = TodoIndexCache(max_users=1)
+
+    index = indexes.get(store, "u1")
+    indexes.update("u1", {"new": todo("Visit Toronto")})
+    indexes.update("u2", {"ignored": todo("Not loaded")})
+
+    assert len(index) == 151
+    assert indexes.get(store, "u1") is index
+    assert index.search("toronto", 1)[0][0] == "new"
+    assert indexes.get(store, "u2") is not index and indexes.get(store, "u1") is not index
+
+
+def test_prompt_tokens_stay_flat_as_todos_grow():
+    """The benchmark shows the indexed prompt bounded by top-k while the full one grows."""
+    small, large = run([10, 400], "hotel in Miami", 10)
+
+    assert large["full_prompt_tokens"] > 10 * small["full_prompt_tokens"]
+    assert large["indexed_prompt_tokens"] < 2 * small["full_prompt_tokens"]
+
+
+def test_task_maistro_prompt_lists_only_relevant_todos(make_system, monkeypatch):
+    """Only the top-k todos for the current turn reach the system prompt."""
+    monkeypatch.setitem(MEMORY_CONFIG, "todo_top_k", 2)
+    chat = RecordingFake(responses=["Yes, it is on your list."])
+    system = make_system(chat)
+    write_memories(system.across_thread_memory, ("todo", "fan"), {
+        "hotel": todo("Book a hotel in Miami"),
+        "scarf": todo("Buy a scarf"),
+        "passport": todo("Renew passport"),
+        "tickets": todo("Buy Miami tickets", status="archived")
+    })
+    system.graph.invoke({"messages": [HumanMessage(content="Is the Miami hotel booked?")]},
+                        system.thread_config("fan"))
+
+    prompt = chat.prompts[0]
+    assert "Book a hotel in Miami" in prompt and "Renew passport" in prompt
+    assert "Buy a scarf" not in prompt and "Buy Miami tickets" not in prompt